@@ -1,47 +1,73 @@
-from flask import Flask
-from app.extensions import login_manager, oauth
+from flask import Flask, session
+from app.extensions import cache, login_manager
 
 
-from app.models import db, Usuario, TipoTrabajo
+from app.models import db, IdentidadUsuario, Usuario, TipoTrabajo
 
 
 
 
-def create_app():
+def create_app(configuracion=None):
     app = Flask(__name__)
     app.config.from_object('config.Config')
 
     app.config["SECRET_KEY"] = "super-secret-key"
 
+    # Valores que reemplazan a los de config.Config (tests, scripts)
+    app.config.update(configuracion or {})
+
     # ===== EXTENSIONES =====
+    from app.base_datos import binds_motor, configurar_motores, opciones_motor
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", opciones_motor(app.config))
+    app.config.setdefault("SQLALCHEMY_BINDS", binds_motor(app.config))
+
+    # Flask-Migrate (flask db ...) y Authlib (login con Google) se cargan
+    # recién cuando se usan: ver app.comandos y app.routes.auth
     db.init_app(app)
     login_manager.init_app(app)
-    oauth.init_app(app)
+    cache.init_app(app)
+
+    configurar_motores(app)
+
+    from app.instrumentacion import instrumentar
+    from app.metricas import configurar_metricas
+    from app.perfilador import configurar_perfilador
+    from app.tareas import configurar_tareas
+    instrumentar(app)
+    configurar_metricas(app)
+    configurar_perfilador(app)
+    configurar_tareas(app)
 
     login_manager.login_view = "auth.login"
 
-    # ===== GOOGLE OAUTH =====
-    oauth.register(
-        name="google",
-        client_id=app.config["GOOGLE_CLIENT_ID"],
-        client_secret=app.config["GOOGLE_CLIENT_SECRET"],
-        server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
-        client_kwargs={
-            "scope": "openid email profile"
-        }
-    )
-
-    with app.app_context():
-        db.create_all()
-
-        # 🌱 Seed solo si está vacío
-        if TipoTrabajo.query.first() is None:
-            from app.seed import run_seed
-            run_seed()
+    # Mantiene los totales de cada trabajo al día en cada flush
+    from app import acumulados  # noqa: F401
+
+    # El esquema se maneja con `flask db upgrade` y los datos de ejemplo
+    # con `flask seed`. INICIALIZAR_DB=1 conserva el modo de desarrollo
+    # que crea las tablas y siembra al arrancar.
+    if app.config["INICIALIZAR_DB"]:
+        with app.app_context():
+            db.create_all()
+
+            # 🌱 Seed solo si está vacío
+            if TipoTrabajo.query.first() is None:
+                from app.seed import run_seed
+                run_seed()
 
     @login_manager.user_loader
     def load_user(user_id):
-        return Usuario.query.get(int(user_id))
+        # La identidad viaja en la sesión firmada desde el login: la gran
+        # mayoría de los requests se autentican sin tocar la base
+        identidad = session.get("identidad")
+        if identidad and str(identidad.get("id")) == user_id:
+            return IdentidadUsuario(identidad)
+
+        # Sesiones anteriores a este cambio
+        usuario = db.session.get(Usuario, int(user_id))
+        if usuario is not None:
+            session["identidad"] = usuario.identidad()
+        return usuario
 
     # ===== BLUEPRINTS =====
     from app.routes.auth import auth
@@ -51,6 +77,8 @@ def create_app():
     from app.routes.trabajos import trabajos
     from app.routes.movimientos import movimientos
     from app.routes.recomendaciones import recomendaciones
+    from app.routes.analitica import analitica
+    from app.routes.tareas import tareas
 
     app.register_blueprint(auth)
     app.register_blueprint(main)
@@ -59,5 +87,11 @@ def create_app():
     app.register_blueprint(trabajos)
     app.register_blueprint(movimientos)
     app.register_blueprint(recomendaciones)
+    app.register_blueprint(analitica)
+    app.register_blueprint(tareas)
+
+    # ===== COMANDOS =====
+    from app.comandos import register_commands
+    register_commands(app)
 
     return app
@@ -0,0 +1,370 @@
+from collections import defaultdict
+from datetime import datetime, timezone
+
+from sqlalchemy import Float, bindparam, event, extract, func, inspect, insert, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from flask_sqlalchemy.session import Session
+
+from app.models import db, Usuario, Trabajo, Pago, GastoTrabajo, ResumenMensual
+
+
+# =========================
+# TOTALES ACUMULADOS
+# =========================
+# Cada flush que toca pagos o gastos se traduce en deltas que se aplican
+# con UPDATE ... SET x = x + delta dentro de la misma transacción, así los
+# totales de cada trabajo y los resúmenes mensuales nunca quedan
+# desfasados de los movimientos. En el mismo flush se incrementa
+# Usuario.datos_version de cada usuario con cambios, que invalida su
+# caché de reportes.
+
+_CAMPOS = ("usuario_id", "trabajo_id", "fecha", "monto", "tiempo")
+
+_CLAVE_PENDIENTES = "acumulados_pendientes"
+
+
+def _es_movimiento(obj):
+    return isinstance(obj, (Pago, GastoTrabajo))
+
+
+def _valores_anteriores(obj):
+    """Valores tal como están en la base, antes de los cambios sin flushear."""
+    estado = inspect(obj)
+    valores = {}
+
+    for campo in _CAMPOS:
+        if campo not in estado.attrs:
+            continue
+        historia = estado.attrs[campo].history
+        if historia.deleted:
+            valores[campo] = historia.deleted[0]
+        else:
+            valores[campo] = getattr(obj, campo)
+
+    return valores
+
+
+def _valores_actuales(obj):
+    return {
+        campo: getattr(obj, campo)
+        for campo in _CAMPOS
+        if hasattr(obj, campo)
+    }
+
+
+def _movimiento(obj, valores, signo):
+    """Normaliza un pago/gasto a (signo, es_pago, valores)."""
+    return (signo, isinstance(obj, Pago), valores)
+
+
+def _pendientes(session):
+    return session.info.setdefault(_CLAVE_PENDIENTES, [])
+
+
+@event.listens_for(Session, "before_flush")
+def _restar_anteriores(session, flush_context, instances):
+    pendientes = _pendientes(session)
+
+    for obj in session.deleted:
+        if _es_movimiento(obj):
+            pendientes.append(_movimiento(obj, _valores_anteriores(obj), -1))
+
+    for obj in session.dirty:
+        if _es_movimiento(obj) and session.is_modified(obj):
+            pendientes.append(_movimiento(obj, _valores_anteriores(obj), -1))
+
+
+@event.listens_for(Session, "after_flush")
+def _aplicar_deltas(session, flush_context):
+    pendientes = session.info.pop(_CLAVE_PENDIENTES, [])
+
+    for obj in session.new:
+        if _es_movimiento(obj):
+            pendientes.append(_movimiento(obj, _valores_actuales(obj), 1))
+
+    for obj in session.dirty:
+        if _es_movimiento(obj) and session.is_modified(obj):
+            pendientes.append(_movimiento(obj, _valores_actuales(obj), 1))
+
+    if pendientes:
+        trabajos_modificados = aplicar_movimientos(session.connection(), pendientes)
+        session.info.setdefault("trabajos_a_expirar", set()).update(trabajos_modificados)
+
+    usuarios = _usuarios_modificados(session)
+    if usuarios:
+        incrementar_version(session.connection(), usuarios)
+        session.info.setdefault("usuarios_a_expirar", set()).update(usuarios)
+
+
+def _usuarios_modificados(session):
+    usuarios = set()
+
+    for obj in session.dirty:
+        if isinstance(obj, Usuario) and session.is_modified(obj):
+            usuarios.add(obj.id)
+
+    for grupo in (session.new, session.dirty, session.deleted):
+        for obj in grupo:
+            usuario_id = getattr(obj, "usuario_id", None)
+            if usuario_id is None:
+                continue
+            if grupo is session.dirty and not session.is_modified(obj):
+                continue
+            usuarios.add(usuario_id)
+
+    return usuarios
+
+
+@event.listens_for(Session, "after_flush_postexec")
+def _expirar_trabajos(session, flush_context):
+    ids = session.info.pop("trabajos_a_expirar", None) or set()
+    usuarios = session.info.pop("usuarios_a_expirar", None) or set()
+
+    if not ids and not usuarios:
+        return
+
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, Trabajo) and obj.id in ids:
+            session.expire(obj, ["ingreso_total_bruto", "gasto_total", "horas_totales"])
+        elif isinstance(obj, Usuario) and obj.id in usuarios:
+            session.expire(obj, ["datos_version"])
+
+
+@event.listens_for(Session, "after_rollback")
+def _descartar_pendientes(session):
+    session.info.pop(_CLAVE_PENDIENTES, None)
+    session.info.pop("trabajos_a_expirar", None)
+    session.info.pop("usuarios_a_expirar", None)
+
+
+def incrementar_version(conexion, usuario_ids):
+    """Marca que cambiaron los datos de estos usuarios (con None, de todos)."""
+    tabla = Usuario.__table__
+
+    stmt = update(tabla).values(
+        datos_version=tabla.c.datos_version + 1,
+        datos_modificados_en=datetime.now(timezone.utc).replace(tzinfo=None)
+    )
+    if usuario_ids is not None:
+        stmt = stmt.where(tabla.c.id.in_(sorted(usuario_ids)))
+
+    conexion.execute(stmt)
+
+
+def _usuarios_recalculados(usuario_id):
+    return None if usuario_id is None else {usuario_id}
+
+
+def aplicar_movimientos(conexion, movimientos):
+    """
+    Aplica una lista de (signo, es_pago, valores) a los totales de cada
+    trabajo y al resumen mensual de cada usuario. Devuelve los ids de
+    trabajo que cambiaron.
+    """
+    _actualizar_resumenes(conexion, movimientos)
+    return _actualizar_trabajos(conexion, movimientos)
+
+
+def _actualizar_trabajos(conexion, movimientos):
+    deltas = defaultdict(lambda: [0.0, 0.0, 0.0])  # bruto, gasto, horas
+
+    for signo, es_pago, valores in movimientos:
+        delta = deltas[valores["trabajo_id"]]
+        monto = valores.get("monto") or 0
+
+        if es_pago:
+            delta[0] += signo * monto
+        else:
+            delta[1] += signo * monto
+            delta[2] += signo * (valores.get("tiempo") or 0)
+
+    filas = [
+        {"b_id": trabajo_id, "b_bruto": bruto, "b_gasto": gasto, "b_horas": horas}
+        for trabajo_id, (bruto, gasto, horas) in deltas.items()
+        if trabajo_id is not None and (bruto != 0 or gasto != 0 or horas != 0)
+    ]
+
+    if not filas:
+        return set()
+
+    # Un solo UPDATE ejecutado en lote (executemany) para todos los trabajos
+    tabla = Trabajo.__table__
+    conexion.execute(
+        update(tabla)
+        .where(tabla.c.id == bindparam("b_id"))
+        .values(
+            ingreso_total_bruto=tabla.c.ingreso_total_bruto + bindparam("b_bruto", type_=Float),
+            gasto_total=tabla.c.gasto_total + bindparam("b_gasto", type_=Float),
+            horas_totales=tabla.c.horas_totales + bindparam("b_horas", type_=Float)
+        ),
+        filas
+    )
+
+    return {fila["b_id"] for fila in filas}
+
+
+def _actualizar_resumenes(conexion, movimientos):
+    # ingresos, gastos, horas, cantidad
+    deltas = defaultdict(lambda: [0.0, 0.0, 0.0, 0])
+
+    for signo, es_pago, valores in movimientos:
+        fecha = valores.get("fecha")
+        if fecha is None or valores.get("usuario_id") is None:
+            continue
+
+        delta = deltas[(valores["usuario_id"], fecha.year, fecha.month)]
+        monto = valores.get("monto") or 0
+
+        if es_pago:
+            delta[0] += signo * monto
+        else:
+            delta[1] += signo * monto
+            delta[2] += signo * (valores.get("tiempo") or 0)
+        delta[3] += signo
+
+    filas = [
+        dict(
+            usuario_id=usuario_id, anio=anio, mes=mes,
+            ingresos=ingresos, gastos=gastos, horas=horas, cantidad=cantidad
+        )
+        for (usuario_id, anio, mes), (ingresos, gastos, horas, cantidad) in deltas.items()
+        if ingresos != 0 or gastos != 0 or horas != 0 or cantidad != 0
+    ]
+
+    if filas:
+        _sumar_resumenes(conexion, filas)
+
+
+def _sumar_resumenes(conexion, filas):
+    """Suma los deltas a cada fila (usuario, año, mes), creándola si falta."""
+    tabla = ResumenMensual.__table__
+    campos = ("ingresos", "gastos", "horas", "cantidad")
+    dialecto = conexion.dialect.name
+
+    if dialecto in ("sqlite", "postgresql"):
+        insert_dialecto = sqlite.insert if dialecto == "sqlite" else postgresql.insert
+        stmt = insert_dialecto(tabla)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["usuario_id", "anio", "mes"],
+            set_={
+                campo: tabla.c[campo] + stmt.excluded[campo]
+                for campo in campos
+            }
+        )
+        conexion.execute(stmt, filas)
+        return
+
+    # Otros motores: UPDATE y, si no había fila, INSERT
+    for fila in filas:
+        resultado = conexion.execute(
+            update(tabla)
+            .where(
+                tabla.c.usuario_id == fila["usuario_id"],
+                tabla.c.anio == fila["anio"],
+                tabla.c.mes == fila["mes"]
+            )
+            .values(**{
+                campo: tabla.c[campo] + fila[campo]
+                for campo in campos
+            })
+        )
+        if resultado.rowcount == 0:
+            conexion.execute(insert(tabla).values(**fila))
+
+
+# =========================
+# RECÁLCULO COMPLETO
+# =========================
+def recalcular_totales_trabajos(usuario_id=None):
+    """Reconstruye los totales de los trabajos a partir de pagos y gastos."""
+    trabajos = Trabajo.__table__
+    pagos = Pago.__table__
+    gastos = GastoTrabajo.__table__
+
+    bruto = (
+        select(func.coalesce(func.sum(pagos.c.monto), 0))
+        .where(pagos.c.trabajo_id == trabajos.c.id)
+        .scalar_subquery()
+    )
+    gasto = (
+        select(func.coalesce(func.sum(gastos.c.monto), 0))
+        .where(gastos.c.trabajo_id == trabajos.c.id)
+        .scalar_subquery()
+    )
+    horas = (
+        select(func.coalesce(func.sum(gastos.c.tiempo), 0))
+        .where(gastos.c.trabajo_id == trabajos.c.id)
+        .scalar_subquery()
+    )
+
+    stmt = update(trabajos).values(
+        ingreso_total_bruto=bruto,
+        gasto_total=gasto,
+        horas_totales=horas
+    )
+
+    if usuario_id is not None:
+        stmt = stmt.where(trabajos.c.usuario_id == usuario_id)
+
+    resultado = db.session.execute(stmt)
+
+    # Como en app.importacion: lo que está en la caché de reportes y los
+    # ETag ya entregados dejan de valer
+    incrementar_version(db.session.connection(), _usuarios_recalculados(usuario_id))
+
+    db.session.commit()
+    return resultado.rowcount
+
+
+def recalcular_resumenes_mensuales(usuario_id=None):
+    """Reconstruye la tabla de resúmenes mensuales desde pagos y gastos."""
+    resumenes = defaultdict(lambda: {
+        "ingresos": 0.0, "gastos": 0.0, "horas": 0.0, "cantidad": 0
+    })
+
+    for modelo in (Pago, GastoTrabajo):
+        columnas = [
+            modelo.usuario_id,
+            extract("year", modelo.fecha).label("anio"),
+            extract("month", modelo.fecha).label("mes"),
+            func.sum(modelo.monto).label("monto"),
+            func.count().label("cantidad")
+        ]
+        if modelo is GastoTrabajo:
+            columnas.append(func.sum(modelo.tiempo).label("tiempo"))
+
+        query = (
+            db.session.query(*columnas)
+            .filter(modelo.fecha.isnot(None))
+            .group_by(modelo.usuario_id, "anio", "mes")
+        )
+        if usuario_id is not None:
+            query = query.filter(modelo.usuario_id == usuario_id)
+
+        for row in query:
+            resumen = resumenes[(row.usuario_id, int(row.anio), int(row.mes))]
+            resumen["cantidad"] += row.cantidad
+            if modelo is Pago:
+                resumen["ingresos"] += row.monto or 0
+            else:
+                resumen["gastos"] += row.monto or 0
+                resumen["horas"] += row.tiempo or 0
+
+    borrar = ResumenMensual.query
+    if usuario_id is not None:
+        borrar = borrar.filter_by(usuario_id=usuario_id)
+    borrar.delete(synchronize_session=False)
+
+    if resumenes:
+        db.session.execute(
+            insert(ResumenMensual.__table__),
+            [
+                dict(usuario_id=u, anio=a, mes=m, **valores)
+                for (u, a, m), valores in resumenes.items()
+            ]
+        )
+
+    incrementar_version(db.session.connection(), _usuarios_recalculados(usuario_id))
+
+    db.session.commit()
+    return len(resumenes)
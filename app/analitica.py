@@ -0,0 +1,290 @@
+import threading
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import func
+
+from app.cache import datos_usuario
+from app.models import db, movimientos_unificados
+
+
+# =========================
+# LIBRO COLUMNAR
+# =========================
+# Todo el historial de un usuario como arreglos de NumPy, una columna por
+# campo, cargado con una sola consulta. Los reportes son group-by
+# vectorizados (np.unique + np.bincount) sobre esas columnas en vez de
+# recorrer objetos Pago/GastoTrabajo en Python.
+#
+# Los ids nulos (trabajos sin tipo, pagos sin insumo) se guardan como 0,
+# igual que el "tipo 0" de las URLs de tipos de trabajo.
+
+SIN_ID = 0
+
+FILAS_POR_TANDA = 50000
+
+# Época de datetime64: los días y meses se cuentan desde 1970-01-01
+_ANIO_BASE = 1970
+
+
+class Libro:
+    """Movimientos de un usuario en columnas (una fila por pago o gasto)."""
+
+    def __init__(self, dias, montos, tiempos, es_pago, trabajos, tipos, insumos):
+        self.dias = dias              # int32, días desde 1970-01-01
+        self.meses = (                # int32, meses desde 1970-01
+            dias.astype("datetime64[D]").astype("datetime64[M]").astype(np.int32)
+        )
+        self.montos = montos          # float64
+        self.tiempos = tiempos        # float64, horas (0 en los pagos)
+        self.es_pago = es_pago        # bool
+        self.trabajos = trabajos      # int32
+        self.tipos = tipos            # int32, SIN_ID si el trabajo no tiene tipo
+        self.insumos = insumos        # int32, SIN_ID en los pagos
+
+    def __len__(self):
+        return len(self.montos)
+
+    @property
+    def nbytes(self):
+        return sum(
+            columna.nbytes
+            for columna in vars(self).values()
+            if isinstance(columna, np.ndarray)
+        )
+
+    # ---------- columnas derivadas ----------
+    @property
+    def ingresos(self):
+        return np.where(self.es_pago, self.montos, 0.0)
+
+    @property
+    def gastos(self):
+        return np.where(self.es_pago, 0.0, self.montos)
+
+    # ---------- reportes ----------
+    def totales_mensuales(self):
+        """
+        Ingresos, gastos, horas, neto y cantidad de movimientos por mes,
+        en orden cronológico (solo los meses con movimientos).
+        """
+        meses, (ingresos, gastos, horas, cantidad) = _agrupar(
+            self.meses, self.ingresos, self.gastos, self.tiempos, None
+        )
+
+        return [
+            {
+                "anio": _ANIO_BASE + int(m) // 12,
+                "mes": int(m) % 12 + 1,
+                "ingresos": float(i),
+                "gastos": float(g),
+                "horas": float(h),
+                "neto": float(i - g),
+                "cantidad": int(c)
+            }
+            for m, i, g, h, c in zip(meses, ingresos, gastos, horas, cantidad)
+        ]
+
+    def por_tipo(self):
+        """Bruto, gasto, neto y horas por tipo de trabajo, de mayor a menor neto."""
+        tipos, (bruto, gasto, horas) = _agrupar(
+            self.tipos, self.ingresos, self.gastos, self.tiempos
+        )
+        neto = bruto - gasto
+
+        return [
+            {
+                "tipo_id": int(tipos[i]),
+                "bruto": float(bruto[i]),
+                "gasto": float(gasto[i]),
+                "neto": float(neto[i]),
+                "horas": float(horas[i])
+            }
+            for i in np.argsort(-neto, kind="stable")
+        ]
+
+    def por_insumo(self):
+        """Monto, horas y cantidad de gastos por insumo, de mayor a menor monto."""
+        es_gasto = ~self.es_pago
+        insumos, (monto, horas, cantidad) = _agrupar(
+            self.insumos[es_gasto], self.montos[es_gasto], self.tiempos[es_gasto], None
+        )
+
+        return [
+            {
+                "insumo_id": int(insumos[i]),
+                "monto": float(monto[i]),
+                "horas": float(horas[i]),
+                "cantidad": int(cantidad[i])
+            }
+            for i in np.argsort(-monto, kind="stable")
+        ]
+
+    def valores_hora(self):
+        """
+        (trabajo_ids, valor_hora) de los trabajos con horas cargadas, con
+        el mismo cálculo que Trabajo.valor_hora: neto / horas.
+        """
+        trabajos, (bruto, gasto, horas) = _agrupar(
+            self.trabajos, self.ingresos, self.gastos, self.tiempos
+        )
+        con_horas = horas > 0
+        return trabajos[con_horas], (bruto - gasto)[con_horas] / horas[con_horas]
+
+    def distribucion_valor_hora(self, intervalos=10):
+        """Resumen e histograma del valor hora de los trabajos."""
+        _, valores = self.valores_hora()
+
+        if not len(valores):
+            return {"trabajos": 0, "promedio": 0.0, "percentiles": {}, "histograma": []}
+
+        percentiles = (10, 25, 50, 75, 90)
+        cantidades, bordes = np.histogram(valores, bins=intervalos)
+
+        return {
+            "trabajos": int(len(valores)),
+            "promedio": round(float(valores.mean()), 2),
+            "percentiles": {
+                f"p{p}": round(float(v), 2)
+                for p, v in zip(percentiles, np.percentile(valores, percentiles))
+            },
+            "histograma": [
+                {
+                    "desde": round(float(bordes[i]), 2),
+                    "hasta": round(float(bordes[i + 1]), 2),
+                    "trabajos": int(cantidades[i])
+                }
+                for i in range(len(cantidades))
+            ]
+        }
+
+    def promedio_movil(self, ventana=3):
+        """
+        Neto mensual y su promedio de los últimos `ventana` meses, mes a
+        mes desde el primero con movimientos (los meses vacíos cuentan
+        como 0). Los primeros meses promedian los que haya.
+        """
+        if not len(self):
+            return []
+
+        primero = int(self.meses.min())
+        indices = self.meses - primero
+        neto = np.bincount(
+            indices, weights=np.where(self.es_pago, self.montos, -self.montos)
+        )
+
+        acumulado = np.concatenate(([0.0], np.cumsum(neto)))
+        fin = np.arange(1, len(neto) + 1)
+        inicio = np.maximum(fin - ventana, 0)
+        promedio = (acumulado[fin] - acumulado[inicio]) / (fin - inicio)
+
+        return [
+            {
+                "anio": _ANIO_BASE + (primero + i) // 12,
+                "mes": (primero + i) % 12 + 1,
+                "neto": float(neto[i]),
+                "promedio": round(float(promedio[i]), 2)
+            }
+            for i in range(len(neto))
+        ]
+
+
+def _agrupar(claves, *pesos):
+    """
+    Group-by vectorizado: devuelve (claves únicas ordenadas, [sumas]) con
+    una suma por cada arreglo de `pesos`. None cuenta las filas.
+    """
+    unicas, inversa = np.unique(claves, return_inverse=True)
+    return unicas, [
+        np.bincount(inversa, weights=peso, minlength=len(unicas))
+        for peso in pesos
+    ]
+
+
+# =========================
+# CARGA
+# =========================
+def cargar_libro(usuario_id):
+    """Arma el Libro de un usuario leyendo los movimientos de a tandas."""
+    m = movimientos_unificados(usuario_id=usuario_id)
+
+    consulta = db.select(
+        m.c.fecha,
+        m.c.movimiento == "pago",
+        m.c.monto,
+        m.c.tiempo,
+        m.c.trabajo_id,
+        func.coalesce(m.c.tipo_id, SIN_ID),
+        func.coalesce(m.c.insumo_id, SIN_ID)
+    ).where(
+        # Sin fecha sería NaT y caería en 1970-01; ResumenMensual tampoco los cuenta
+        m.c.fecha.isnot(None)
+    )
+
+    resultado = db.session.execute(
+        consulta.execution_options(yield_per=FILAS_POR_TANDA)
+    )
+
+    tipos = ("datetime64[D]", np.bool_, np.float64, np.float64, np.int32, np.int32, np.int32)
+    tandas = [[] for _ in tipos]
+
+    try:
+        for filas in resultado.partitions():
+            for tanda, valores, tipo in zip(tandas, zip(*filas), tipos):
+                tanda.append(np.array(valores, dtype=tipo))
+    finally:
+        resultado.close()
+
+    fechas, es_pago, montos, tiempos, trabajos, tipos_trabajo, insumos = (
+        np.concatenate(tanda) if tanda else np.empty(0, dtype=tipo)
+        for tanda, tipo in zip(tandas, tipos)
+    )
+
+    return Libro(
+        dias=fechas.astype(np.int32),
+        montos=montos,
+        tiempos=tiempos,
+        es_pago=es_pago,
+        trabajos=trabajos,
+        tipos=tipos_trabajo,
+        insumos=insumos
+    )
+
+
+# =========================
+# CACHÉ DE LIBROS
+# =========================
+# Por proceso y por usuario, guardado junto con Usuario.datos_version:
+# cualquier escritura incrementa la versión en la misma transacción, así
+# que el libro se vuelve a cargar en la siguiente consulta sin tener que
+# avisarle a cada worker. Entran ANALITICA_MAX_LIBROS usuarios (LRU).
+
+_libros = OrderedDict()
+_lock_libros = threading.Lock()
+
+
+def libro_de(usuario_id):
+    version, _ = datos_usuario(usuario_id)
+
+    with _lock_libros:
+        guardado = _libros.get(usuario_id)
+        if guardado is not None and guardado[0] == version:
+            _libros.move_to_end(usuario_id)
+            return guardado[1]
+
+    libro = cargar_libro(usuario_id)
+
+    with _lock_libros:
+        _libros[usuario_id] = (version, libro)
+        _libros.move_to_end(usuario_id)
+
+        while len(_libros) > current_app.config["ANALITICA_MAX_LIBROS"]:
+            _libros.popitem(last=False)
+
+    return libro
+
+
+def olvidar_libros():
+    with _lock_libros:
+        _libros.clear()
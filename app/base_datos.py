@@ -0,0 +1,227 @@
+import threading
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.engine import make_url
+from sqlalchemy.pool import QueuePool
+
+from app.models import db
+
+
+# =========================
+# OPCIONES DEL ENGINE
+# =========================
+def opciones_motor(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS según la URL y el despliegue. El pool se
+    dimensiona por worker: cada hilo de gunicorn puede tener una conexión
+    y el total de todos los workers no pasa de DB_MAX_CONEXIONES. Los
+    valores DB_* definidos en Config/env tienen prioridad.
+    """
+    url = make_url(config["SQLALCHEMY_DATABASE_URI"])
+
+    # SQLite en memoria usa un StaticPool de Flask-SQLAlchemy
+    if url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:"):
+        return {}
+
+    pool_size, max_overflow = config["DB_POOL_SIZE"], config["DB_MAX_OVERFLOW"]
+
+    if url.get_backend_name() == "sqlite":
+        # Las conexiones a un archivo local son baratas: los valores de
+        # SQLAlchemy, salvo que se definan DB_POOL_SIZE / DB_MAX_OVERFLOW
+        pool_size = 5 if pool_size is None else pool_size
+        max_overflow = 10 if max_overflow is None else max_overflow
+    else:
+        workers = max(1, config["WEB_CONCURRENCY"])
+        # más los hilos de app.tareas, que también usan el pool
+        hilos = max(1, config["GUNICORN_THREADS"]) + max(0, config["TAREAS_HILOS"])
+        por_worker = max(1, config["DB_MAX_CONEXIONES"] // workers)
+
+        if pool_size is None:
+            pool_size = min(hilos, por_worker)
+        if max_overflow is None:
+            max_overflow = min(max(1, hilos // 2), max(0, por_worker - pool_size))
+
+    opciones = {
+        "poolclass": PoolMedido,
+        "pool_size": pool_size,
+        "max_overflow": max_overflow,
+        "pool_timeout": config["DB_POOL_TIMEOUT"],
+        # LIFO: las conexiones que sobran quedan ociosas y las recicla el
+        # servidor o pool_recycle, en vez de rotar todas
+        "pool_use_lifo": True,
+    }
+
+    if url.get_backend_name() == "postgresql":
+        opciones["pool_pre_ping"] = config["DB_POOL_PRE_PING"]
+        opciones["pool_recycle"] = config["DB_POOL_RECYCLE"]
+        if config["DB_STATEMENT_TIMEOUT_MS"]:
+            opciones["connect_args"] = {
+                "options": f"-c statement_timeout={int(config['DB_STATEMENT_TIMEOUT_MS'])}"
+            }
+
+    return opciones
+
+
+def binds_motor(config):
+    """SQLALCHEMY_BINDS con la réplica, si hay, y sus propias opciones de pool."""
+    url = config["DATABASE_REPLICA_URL"]
+    if not url:
+        return {}
+
+    from app.replica import BIND_REPLICA
+
+    return {
+        BIND_REPLICA: dict(
+            opciones_motor(dict(config, SQLALCHEMY_DATABASE_URI=url)),
+            url=url
+        )
+    }
+
+
+# =========================
+# POOL CON MÉTRICAS
+# =========================
+class PoolMedido(QueuePool):
+    """
+    QueuePool que mide cuánto se espera para obtener una conexión y
+    cuántas hay en uso. Las métricas son del proceso.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._lock_metricas = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.espera_total = 0.0
+        self.espera_max = 0.0
+        self.en_uso_max = 0
+
+    def _do_get(self):
+        inicio = time.perf_counter()
+        try:
+            conexion = super()._do_get()
+        except exc.TimeoutError:
+            with self._lock_metricas:
+                self.timeouts += 1
+            raise
+
+        espera = time.perf_counter() - inicio
+        with self._lock_metricas:
+            self.checkouts += 1
+            self.espera_total += espera
+            self.espera_max = max(self.espera_max, espera)
+            self.en_uso_max = max(self.en_uso_max, self.checkedout())
+
+        return conexion
+
+    def estadisticas(self):
+        capacidad = self.size() + self._max_overflow
+        en_uso = self.checkedout()
+        return {
+            "tamano": self.size(),
+            "max_overflow": self._max_overflow,
+            "en_uso": en_uso,
+            "en_uso_max": self.en_uso_max,
+            "ociosas": self.checkedin(),
+            "utilizacion": round(en_uso / capacidad, 4) if capacidad else 0.0,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "espera_media_ms": round(
+                self.espera_total / self.checkouts * 1000, 3
+            ) if self.checkouts else 0.0,
+            "espera_max_ms": round(self.espera_max * 1000, 3),
+            "espera_total_ms": round(self.espera_total * 1000, 3),
+        }
+
+
+def estadisticas_pools():
+    """Métricas de cada engine (bind) con PoolMedido, por nombre de bind."""
+    return {
+        nombre or "default": motor.pool.estadisticas()
+        for nombre, motor in db.engines.items()
+        if isinstance(motor.pool, PoolMedido)
+    }
+
+
+# =========================
+# AJUSTES DE CONEXIÓN
+# =========================
+# Se aplican a cada engine de la app al crearla (create_app) mediante
+# eventos de SQLAlchemy, así valen para todas las conexiones del pool.
+
+def configurar_motores(app):
+    with app.app_context():
+        for motor in db.engines.values():
+            if motor.dialect.name == "sqlite":
+                perfil_sqlite(motor, app.config["SQLITE_PRAGMAS"])
+
+
+# =========================
+# PERFIL SQLITE
+# =========================
+# Con WAL los lectores no bloquean al escritor ni al revés, y
+# busy_timeout hace que un segundo escritor espere su turno en vez de
+# fallar con "database is locked". pysqlite ya abre la transacción recién
+# en el primer INSERT/UPDATE/DELETE, así que el lock de escritura se toma
+# lo más tarde posible.
+
+def perfil_sqlite(motor, pragmas):
+    if not pragmas:
+        return
+
+    @event.listens_for(motor, "connect")
+    def _aplicar_pragmas(conexion_dbapi, registro):
+        cursor = conexion_dbapi.cursor()
+        try:
+            for nombre, valor in pragmas.items():
+                cursor.execute(f"PRAGMA {nombre}={valor}")
+        finally:
+            cursor.close()
+
+
+# =========================
+# MANTENIMIENTO
+# =========================
+def mantenimiento_sqlite(motor, completo=False, paginas=1000):
+    """
+    Mantenimiento periódico de una base SQLite (pensado para cron, p. ej.
+    `flask db-mantenimiento` una vez por día):
+
+    - siempre: PRAGMA optimize, incremental_vacuum (si auto_vacuum es
+      INCREMENTAL) y checkpoint del WAL
+    - completo: además ANALYZE de todas las tablas y VACUUM, que deja
+      auto_vacuum en INCREMENTAL para las próximas corridas
+
+    Devuelve un dict con lo que se hizo.
+    """
+    conexion = motor.raw_connection()
+    driver = conexion.driver_connection
+    aislamiento = driver.isolation_level
+
+    # VACUUM no corre dentro de una transacción
+    driver.isolation_level = None
+
+    def pragma(texto):
+        return driver.execute(f"PRAGMA {texto}").fetchone()
+
+    try:
+        resultado = {"paginas_libres_antes": pragma("freelist_count")[0]}
+
+        if completo:
+            driver.execute("ANALYZE")
+            pragma("auto_vacuum=INCREMENTAL")
+            driver.execute("VACUUM")
+        elif pragma("auto_vacuum")[0] == 2:
+            driver.execute(f"PRAGMA incremental_vacuum({int(paginas)})").fetchall()
+
+        pragma("optimize")
+        pragma("wal_checkpoint(TRUNCATE)")
+
+        resultado["paginas_libres_despues"] = pragma("freelist_count")[0]
+        resultado["auto_vacuum"] = ("NONE", "FULL", "INCREMENTAL")[pragma("auto_vacuum")[0]]
+        resultado["completo"] = completo
+        return resultado
+    finally:
+        driver.isolation_level = aislamiento
+        conexion.close()
@@ -0,0 +1,200 @@
+from datetime import date
+
+from sqlalchemy import and_, func, select
+
+from app.models import (
+    db,
+    GastoTrabajo,
+    Insumo,
+    Pago,
+    TipoTrabajo,
+    Trabajo,
+    normalizar_nombre
+)
+
+
+# =========================
+# BÚSQUEDA POR PREFIJO
+# =========================
+# Trabajos, insumos y tipos que empiezan con lo que se escribió (sin
+# importar acentos ni mayúsculas), para el formulario de movimientos, que
+# ya no carga todas las opciones: solo las recientes y el resto a medida
+# que se escribe.
+#
+# Los candidatos salen del índice (usuario_id, nombre_normalizado); si no
+# alcanzan, se completan con nombres que tienen una palabra que empieza
+# con el prefijo ("gar" -> "Casa García"). Se ordenan por uso: cuántos
+# movimientos tiene cada uno, pesados por lo reciente del último
+# (la mitad cada VIDA_MEDIA_DIAS).
+
+ENTIDADES = {
+    "trabajos": Trabajo,
+    "insumos": Insumo,
+    "tipos": TipoTrabajo,
+}
+
+VIDA_MEDIA_DIAS = 90
+
+# Sin texto: uso de los últimos N movimientos (o trabajos, para los tipos)
+VENTANA_RECIENTES = 200
+
+MAX_CANDIDATOS = 500
+
+
+def filtro_prefijo(columna, prefijo):
+    """`columna` empieza con `prefijo`, de forma que use el índice."""
+    if db.engine.dialect.name == "postgresql":
+        # el índice tiene text_pattern_ops; el prefijo normalizado no
+        # tiene % ni _
+        return columna.like(prefijo + "%")
+
+    # SQLite (collation BINARY): rango [prefijo, prefijo con el último
+    # carácter siguiente)
+    return and_(columna >= prefijo, columna < prefijo[:-1] + chr(ord(prefijo[-1]) + 1))
+
+
+def _fuentes(entidad):
+    """(columna con el id de la entidad, columna fecha, modelo) de cada tabla que la usa."""
+    if entidad == "trabajos":
+        return [
+            (Pago.trabajo_id, Pago.fecha, Pago),
+            (GastoTrabajo.trabajo_id, GastoTrabajo.fecha, GastoTrabajo)
+        ]
+    if entidad == "insumos":
+        return [(GastoTrabajo.insumo_id, GastoTrabajo.fecha, GastoTrabajo)]
+    return [(Trabajo.tipo_id, Trabajo.fecha, Trabajo)]
+
+
+def usos(entidad, usuario_id, ids=None):
+    """
+    {id: (usos, último uso)} de esos ids, o con ids=None de lo que
+    aparece en los últimos VENTANA_RECIENTES movimientos del usuario.
+    """
+    resultado = {}
+
+    for columna_id, columna_fecha, modelo in _fuentes(entidad):
+        if ids is None:
+            fuente = (
+                select(columna_id.label("id"), columna_fecha.label("fecha"))
+                .where(modelo.usuario_id == usuario_id)
+                .order_by(columna_fecha.desc())
+                .limit(VENTANA_RECIENTES)
+                .subquery()
+            )
+        else:
+            # Los ids ya son del usuario. En pagos y gastos, filtrar también
+            # por usuario_id hace que el motor elija (usuario_id, fecha) y
+            # recorra todo su historial en vez del índice por trabajo o
+            # insumo; en trabajos el índice es (usuario_id, tipo_id)
+            filtro = columna_id.in_(ids)
+            if modelo is Trabajo:
+                filtro = and_(modelo.usuario_id == usuario_id, filtro)
+
+            fuente = (
+                select(columna_id.label("id"), columna_fecha.label("fecha"))
+                .where(filtro)
+                .subquery()
+            )
+
+        filas = db.session.execute(
+            select(fuente.c.id, func.count(), func.max(fuente.c.fecha))
+            .where(fuente.c.id.isnot(None))
+            .group_by(fuente.c.id)
+        )
+
+        for id_, cantidad, ultimo in filas:
+            anterior, ultimo_anterior = resultado.get(id_, (0, None))
+            if ultimo_anterior is not None and (ultimo is None or ultimo_anterior > ultimo):
+                ultimo = ultimo_anterior
+            resultado[id_] = (anterior + cantidad, ultimo)
+
+    return resultado
+
+
+def puntaje(cantidad, ultimo, hoy):
+    if not cantidad or ultimo is None:
+        return 0.0
+    dias = max(0, (hoy - ultimo).days)
+    return cantidad * 0.5 ** (dias / VIDA_MEDIA_DIAS)
+
+
+def _fila(id_, nombre, uso):
+    cantidad, ultimo = uso
+    return {
+        "id": id_,
+        "nombre": nombre,
+        "usos": cantidad,
+        "ultimo_uso": ultimo.isoformat() if ultimo else None
+    }
+
+
+def recientes(entidad, usuario_id, limite=10):
+    """Los más usados últimamente; si no alcanzan, los creados más recientemente."""
+    modelo = ENTIDADES[entidad]
+    hoy = date.today()
+
+    uso = usos(entidad, usuario_id)
+    ids = sorted(uso, key=lambda i: -puntaje(*uso[i], hoy))[:limite]
+
+    nombres = dict(
+        db.session.query(modelo.id, modelo.nombre)
+        .filter(modelo.usuario_id == usuario_id, modelo.id.in_(ids))
+    ) if ids else {}
+
+    resultado = [_fila(i, nombres[i], uso[i]) for i in ids if i in nombres]
+
+    if len(resultado) < limite:
+        faltan = (
+            db.session.query(modelo.id, modelo.nombre)
+            .filter(modelo.usuario_id == usuario_id, modelo.id.notin_(ids))
+            .order_by(modelo.id.desc())
+            .limit(limite - len(resultado))
+        )
+        resultado += [_fila(i, nombre, (0, None)) for i, nombre in faltan]
+
+    return resultado
+
+
+def buscar(entidad, usuario_id, texto, limite=10):
+    """Los `limite` mejores que empiezan con `texto`; sin texto, los recientes."""
+    prefijo = normalizar_nombre(texto)
+    if not prefijo:
+        return recientes(entidad, usuario_id, limite)
+
+    modelo = ENTIDADES[entidad]
+    hoy = date.today()
+    base = (
+        db.session.query(modelo.id, modelo.nombre, modelo.nombre_normalizado)
+        .filter(modelo.usuario_id == usuario_id)
+    )
+
+    # id -> (empieza con el prefijo, nombre, nombre normalizado)
+    candidatos = {
+        i: (True, nombre, normalizado)
+        for i, nombre, normalizado in base
+        .filter(filtro_prefijo(modelo.nombre_normalizado, prefijo))
+        .limit(MAX_CANDIDATOS)
+    }
+
+    if len(candidatos) < limite:
+        por_palabra = (
+            base
+            .filter(modelo.nombre_normalizado.like(f"% {prefijo}%"))
+            .limit(MAX_CANDIDATOS)
+        )
+        for i, nombre, normalizado in por_palabra:
+            candidatos.setdefault(i, (False, nombre, normalizado))
+
+    if not candidatos:
+        return []
+
+    uso = usos(entidad, usuario_id, list(candidatos))
+
+    def orden(i):
+        es_prefijo, _, normalizado = candidatos[i]
+        return (not es_prefijo, -puntaje(*uso.get(i, (0, None)), hoy), normalizado)
+
+    return [
+        _fila(i, candidatos[i][1], uso.get(i, (0, None)))
+        for i in sorted(candidatos, key=orden)[:limite]
+    ]
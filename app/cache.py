@@ -0,0 +1,352 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timezone
+from functools import wraps
+
+from flask import current_app, g, make_response, request
+from flask_login import current_user
+
+from app.models import db, Usuario
+
+
+# =========================
+# BACKENDS
+# =========================
+class CacheMemoria:
+    """LRU con TTL dentro del proceso. Cada worker tiene la suya."""
+
+    def __init__(self, max_entradas=1000, ttl=300):
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._datos = OrderedDict()
+        self._lock = threading.Lock()
+        self.desalojos = 0
+
+    def get(self, clave):
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is None:
+                return None
+
+            expira, valor = entrada
+            if expira < time.monotonic():
+                del self._datos[clave]
+                self.desalojos += 1
+                return None
+
+            self._datos.move_to_end(clave)
+            return valor
+
+    def set(self, clave, valor):
+        with self._lock:
+            self._datos[clave] = (time.monotonic() + self.ttl, valor)
+            self._datos.move_to_end(clave)
+
+            while len(self._datos) > self.max_entradas:
+                self._datos.popitem(last=False)
+                self.desalojos += 1
+
+    def limpiar(self):
+        with self._lock:
+            self._datos.clear()
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheSQLite:
+    """
+    Caché en un archivo SQLite local, compartida por todos los workers de
+    gunicorn de la máquina. El LRU es aproximado: el último acceso se
+    actualiza como mucho una vez por décima de TTL.
+    """
+
+    _CADA_CUANTOS_SET = 100
+
+    def __init__(self, ruta, max_entradas=10000, ttl=300):
+        self.ruta = ruta
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self.desalojos = 0
+        self._local = threading.local()
+        self._sets = 0
+
+        with self._conexion() as conexion:
+            conexion.execute("""
+                CREATE TABLE IF NOT EXISTS cache (
+                    clave TEXT PRIMARY KEY,
+                    valor BLOB NOT NULL,
+                    expira REAL NOT NULL,
+                    accedido REAL NOT NULL
+                )
+            """)
+            conexion.execute(
+                "CREATE INDEX IF NOT EXISTS ix_cache_accedido ON cache (accedido)"
+            )
+
+    def _conexion(self):
+        # Una conexión por hilo y por proceso (los workers se forkean)
+        conexion = getattr(self._local, "conexion", None)
+        if conexion is None or self._local.pid != os.getpid():
+            conexion = sqlite3.connect(self.ruta, timeout=5, isolation_level=None)
+            conexion.execute("PRAGMA journal_mode=WAL")
+            conexion.execute("PRAGMA synchronous=NORMAL")
+            self._local.conexion = conexion
+            self._local.pid = os.getpid()
+        return conexion
+
+    def get(self, clave):
+        ahora = time.time()
+        fila = self._conexion().execute(
+            "SELECT valor, expira, accedido FROM cache WHERE clave = ?",
+            (clave,)
+        ).fetchone()
+
+        if fila is None:
+            return None
+
+        valor, expira, accedido = fila
+        if expira < ahora:
+            self._conexion().execute("DELETE FROM cache WHERE clave = ?", (clave,))
+            self.desalojos += 1
+            return None
+
+        if ahora - accedido > self.ttl / 10:
+            self._conexion().execute(
+                "UPDATE cache SET accedido = ? WHERE clave = ?", (ahora, clave)
+            )
+
+        return pickle.loads(valor)
+
+    def set(self, clave, valor):
+        ahora = time.time()
+        conexion = self._conexion()
+        conexion.execute(
+            "INSERT OR REPLACE INTO cache (clave, valor, expira, accedido) "
+            "VALUES (?, ?, ?, ?)",
+            (clave, pickle.dumps(valor), ahora + self.ttl, ahora)
+        )
+
+        self._sets += 1
+        if self._sets % self._CADA_CUANTOS_SET == 0:
+            self._desalojar(conexion, ahora)
+
+    def _desalojar(self, conexion, ahora):
+        borradas = conexion.execute(
+            "DELETE FROM cache WHERE expira < ?", (ahora,)
+        ).rowcount
+
+        sobrantes = len(self) - self.max_entradas
+        if sobrantes > 0:
+            borradas += conexion.execute(
+                "DELETE FROM cache WHERE clave IN "
+                "(SELECT clave FROM cache ORDER BY accedido LIMIT ?)",
+                (sobrantes,)
+            ).rowcount
+
+        self.desalojos += borradas
+
+    def limpiar(self):
+        self._conexion().execute("DELETE FROM cache")
+
+    def __len__(self):
+        return self._conexion().execute("SELECT COUNT(*) FROM cache").fetchone()[0]
+
+
+class CacheNula:
+    """Backend que no guarda nada (CACHE_BACKEND = "ninguno")."""
+
+    desalojos = 0
+
+    def get(self, clave):
+        return None
+
+    def set(self, clave, valor):
+        pass
+
+    def limpiar(self):
+        pass
+
+    def __len__(self):
+        return 0
+
+
+# =========================
+# CACHÉ DE REPORTES
+# =========================
+class CacheReportes:
+    """
+    Guarda las respuestas de los reportes por usuario. La clave incluye
+    Usuario.datos_version, que se incrementa con cada escritura, así que
+    un cambio invalida todo lo del usuario sin borrar nada: las entradas
+    viejas salen por LRU/TTL.
+    """
+
+    def __init__(self):
+        self.backend = CacheNula()
+        self.aciertos = 0
+        self.fallos = 0
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        tipo = app.config["CACHE_BACKEND"]
+        ttl = app.config["CACHE_TTL"]
+        max_entradas = app.config["CACHE_MAX_ENTRADAS"]
+
+        if tipo == "memoria":
+            self.backend = CacheMemoria(max_entradas=max_entradas, ttl=ttl)
+        elif tipo == "sqlite":
+            self.backend = CacheSQLite(
+                app.config["CACHE_RUTA"],
+                max_entradas=max_entradas,
+                ttl=ttl
+            )
+        elif tipo == "ninguno":
+            self.backend = CacheNula()
+        else:
+            raise ValueError(f"CACHE_BACKEND desconocido: {tipo!r}")
+
+        app.extensions["cache_reportes"] = self
+
+    def _contar(self, acierto):
+        # Con hilos de gunicorn `+= 1` sin lock pierde incrementos
+        with self._lock:
+            if acierto:
+                self.aciertos += 1
+            else:
+                self.fallos += 1
+
+    def estadisticas(self):
+        with self._lock:
+            aciertos, fallos = self.aciertos, self.fallos
+
+        consultas = aciertos + fallos
+        return {
+            "backend": type(self.backend).__name__,
+            "entradas": len(self.backend),
+            "aciertos": aciertos,
+            "fallos": fallos,
+            "desalojos": self.backend.desalojos,
+            "tasa_aciertos": round(aciertos / consultas, 4) if consultas else 0.0
+        }
+
+    def cacheado(self, view=None, *, por_dia=False):
+        """
+        Decorador para vistas GET que solo dependen de los datos del
+        usuario. Con por_dia=True la entrada también cambia con la fecha
+        (vistas que muestran "el mes actual").
+        """
+        if view is None:
+            return lambda view: self.cacheado(view, por_dia=por_dia)
+
+        @wraps(view)
+        def envoltura(*args, **kwargs):
+            version, _ = datos_usuario(current_user.id)
+            # APP_VERSION como en el ETag: con CACHE_BACKEND=sqlite el
+            # archivo sobrevive a un deploy y serviría HTML viejo
+            clave = (
+                f"{current_user.id}:{version}:"
+                f"{current_app.config['APP_VERSION']}:{_variante(por_dia)}"
+            )
+
+            guardado = self.backend.get(clave)
+            if guardado is not None:
+                self._contar(acierto=True)
+                cuerpo, status, mimetype = guardado
+                return make_response(cuerpo, status, {"Content-Type": mimetype})
+
+            self._contar(acierto=False)
+            respuesta = make_response(view(*args, **kwargs))
+
+            if respuesta.status_code == 200 and not respuesta.direct_passthrough:
+                self.backend.set(
+                    clave,
+                    (respuesta.get_data(), respuesta.status_code, respuesta.content_type)
+                )
+
+            return respuesta
+
+        return envoltura
+
+
+def _variante(por_dia):
+    """Lo que distingue una respuesta de otra para el mismo usuario y versión."""
+    if por_dia:
+        return f"{request.full_path}|{date.today().isoformat()}"
+    return request.full_path
+
+
+def datos_usuario(usuario_id):
+    """(datos_version, datos_modificados_en) leídos una vez por request."""
+    versiones = g.setdefault("versiones_datos", {})
+
+    if usuario_id not in versiones:
+        versiones[usuario_id] = tuple(
+            db.session.query(Usuario.datos_version, Usuario.datos_modificados_en)
+            .filter(Usuario.id == usuario_id)
+            .one()
+        )
+
+    return versiones[usuario_id]
+
+
+# =========================
+# GET CONDICIONAL
+# =========================
+def condicional(view=None, *, por_dia=False):
+    """
+    Agrega ETag (fuerte, derivado de la versión de datos del usuario) y
+    Last-Modified a la respuesta, y contesta 304 sin ejecutar la vista
+    cuando el cliente ya tiene esa versión.
+    """
+    if view is None:
+        return lambda view: condicional(view, por_dia=por_dia)
+
+    @wraps(view)
+    def envoltura(*args, **kwargs):
+        version, modificado = datos_usuario(current_user.id)
+
+        firma = hashlib.sha1(
+            f"{current_app.config['APP_VERSION']}|{_variante(por_dia)}".encode()
+        ).hexdigest()[:16]
+        etag = f"{current_user.id}-{version}-{firma}"
+
+        # Las vistas "del día" no pueden validarse por fecha de modificación
+        if modificado is not None and not por_dia:
+            modificado = modificado.replace(tzinfo=timezone.utc, microsecond=0)
+        else:
+            modificado = None
+
+        if _sin_cambios(etag, modificado):
+            respuesta = make_response("", 304)
+        else:
+            respuesta = make_response(view(*args, **kwargs))
+            if respuesta.status_code != 200:
+                return respuesta
+
+        respuesta.set_etag(etag)
+        if modificado is not None:
+            respuesta.last_modified = modificado
+        respuesta.cache_control.private = True
+        respuesta.cache_control.no_cache = True
+        respuesta.vary.add("Cookie")
+
+        return respuesta
+
+    return envoltura
+
+
+def _sin_cambios(etag, modificado):
+    # If-None-Match tiene prioridad sobre If-Modified-Since (RFC 9110)
+    if request.if_none_match:
+        return request.if_none_match.contains(etag)
+
+    if modificado is not None and request.if_modified_since is not None:
+        return modificado <= request.if_modified_since
+
+    return False
@@ -0,0 +1,250 @@
+import time
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command("recalcular-totales")
+@click.option("--usuario", "usuario_id", type=int, default=None,
+              help="Recalcular solo los datos de este usuario.")
+@with_appcontext
+def recalcular_totales(usuario_id):
+    """Reconstruye los totales de cada trabajo y los resúmenes mensuales."""
+    from app.acumulados import (
+        recalcular_resumenes_mensuales,
+        recalcular_totales_trabajos
+    )
+
+    cantidad = recalcular_totales_trabajos(usuario_id)
+    click.echo(f"Totales recalculados en {cantidad} trabajos.")
+
+    cantidad = recalcular_resumenes_mensuales(usuario_id)
+    click.echo(f"Resúmenes mensuales reconstruidos: {cantidad} meses.")
+
+
+@click.command("importar")
+@click.argument("archivo", type=click.File("rb"))
+@click.option("--email", required=True, help="Usuario dueño de los movimientos.")
+@click.option("--formato", type=click.Choice(["csv", "ndjson"]), default=None,
+              help="Por defecto se deduce de la extensión.")
+@click.option("--lote", type=int, default=5000, show_default=True,
+              help="Filas por transacción.")
+@with_appcontext
+def importar(archivo, email, formato, lote):
+    """Importa movimientos desde un CSV o NDJSON."""
+    from app.importacion import detectar_formato, importar_archivo
+    from app.models import Usuario
+
+    usuario = Usuario.query.filter_by(email=email).first()
+    if usuario is None:
+        raise click.ClickException(f"No existe el usuario {email}")
+
+    def progreso(procesadas, insertadas):
+        click.echo(f"  {procesadas} filas leídas, {insertadas} insertadas")
+
+    resumen = importar_archivo(
+        archivo,
+        formato or detectar_formato(archivo.name),
+        usuario.id,
+        tamano_lote=lote,
+        progreso=progreso
+    )
+
+    for error in resumen["errores"]:
+        click.echo(f"  fila {error['fila']}: {error['error']}", err=True)
+
+    click.echo(
+        f"{resumen['insertadas']} movimientos importados, "
+        f"{resumen['con_error']} filas con error."
+    )
+
+    if "error" in resumen:
+        raise click.ClickException(f"fila {resumen['fila']}: {resumen['error']}")
+
+
+@click.command("exportar")
+@click.option("--email", required=True, help="Usuario dueño de los movimientos.")
+@click.option("--formato", type=click.Choice(["csv", "ndjson"]), default="csv",
+              show_default=True)
+@click.option("--desde", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Fecha inicial (inclusive).")
+@click.option("--hasta", type=click.DateTime(["%Y-%m-%d"]), default=None,
+              help="Fecha final (exclusive).")
+@click.option("--trabajo", "trabajo_id", type=int, default=None,
+              help="Exportar solo los movimientos de este trabajo.")
+@click.option("--salida", type=click.File("w", encoding="utf-8"), default="-",
+              help="Archivo de salida (por defecto, la salida estándar).")
+@with_appcontext
+def exportar(email, formato, desde, hasta, trabajo_id, salida):
+    """Exporta los movimientos de un usuario a CSV o NDJSON."""
+    from app.exportacion import generar, iterar_movimientos
+    from app.models import Usuario
+
+    usuario = Usuario.query.filter_by(email=email).first()
+    if usuario is None:
+        raise click.ClickException(f"No existe el usuario {email}")
+
+    filas = iterar_movimientos(
+        usuario.id,
+        desde=desde.date() if desde else None,
+        hasta=hasta.date() if hasta else None,
+        trabajo_id=trabajo_id
+    )
+
+    for trozo in generar(formato, filas):
+        salida.write(trozo)
+
+
+@click.command("seed")
+@with_appcontext
+def seed():
+    """Carga los datos de ejemplo si la base está vacía."""
+    from app.models import TipoTrabajo
+    from app.seed import run_seed
+
+    if TipoTrabajo.query.first() is not None:
+        click.echo("La base ya tiene datos, no se siembra nada.")
+        return
+
+    run_seed()
+    click.echo("Datos de ejemplo cargados.")
+
+
+@click.command("db-mantenimiento")
+@click.option("--completo", is_flag=True,
+              help="Además ANALYZE y VACUUM (bloquea la base mientras corre).")
+@click.option("--paginas", type=int, default=1000, show_default=True,
+              help="Páginas libres a devolver con incremental_vacuum.")
+@with_appcontext
+def db_mantenimiento(completo, paginas):
+    """Mantenimiento periódico de la base (optimize, vacuum incremental)."""
+    from app.base_datos import mantenimiento_sqlite
+    from app.models import db
+
+    if db.engine.dialect.name != "sqlite":
+        with db.engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conexion:
+            conexion.exec_driver_sql("ANALYZE")
+        click.echo("ANALYZE completo.")
+        return
+
+    resultado = mantenimiento_sqlite(db.engine, completo=completo, paginas=paginas)
+    click.echo(
+        f"Páginas libres: {resultado['paginas_libres_antes']} -> "
+        f"{resultado['paginas_libres_despues']} "
+        f"(auto_vacuum {resultado['auto_vacuum']})"
+    )
+
+
+@click.group("perfilador")
+def perfilador():
+    """Perfiles de requests puntuales (requiere PERFILADOR=1)."""
+
+
+@perfilador.command("activar")
+@click.option("--usuario", "usuarios", type=int, multiple=True,
+              help="Id de usuario a perfilar (se puede repetir).")
+@click.option("--endpoint", "endpoints", multiple=True,
+              help="Endpoint a perfilar, p. ej. trabajos.index (se puede repetir).")
+@click.option("--minutos", type=int, default=30, show_default=True)
+@click.option("--modo", type=click.Choice(["cprofile", "muestreo"]), default="cprofile",
+              show_default=True)
+@with_appcontext
+def perfilador_activar(usuarios, endpoints, minutos, modo):
+    """Perfila los requests de esos usuarios y/o endpoints durante un rato."""
+    from app.perfilador import guardar_objetivos
+
+    if not usuarios and not endpoints:
+        raise click.UsageError("Indicar al menos un --usuario o un --endpoint.")
+
+    guardar_objetivos(
+        current_app.config["PERFILADOR_DIR"],
+        usuarios=usuarios,
+        endpoints=endpoints,
+        minutos=minutos,
+        modo=modo
+    )
+    click.echo(f"Perfilando durante {minutos} minutos en {current_app.config['PERFILADOR_DIR']}.")
+
+
+@perfilador.command("desactivar")
+@with_appcontext
+def perfilador_desactivar():
+    from app.perfilador import borrar_objetivos
+
+    borrar_objetivos(current_app.config["PERFILADOR_DIR"])
+    click.echo("Perfilador desactivado.")
+
+
+@perfilador.command("listar")
+@with_appcontext
+def perfilador_listar():
+    """Perfiles guardados, del más nuevo al más viejo."""
+    from app.perfilador import describir, listar_archivos
+
+    for nombre in listar_archivos(current_app.config["PERFILADOR_DIR"]):
+        perfil = describir(nombre)
+        click.echo(
+            f"{perfil['fecha']}  {perfil['endpoint']:<32} usuario {perfil['usuario']:<6} "
+            f"{perfil['status']}  {perfil['ms']:>6} ms  {nombre}"
+        )
+
+
+@click.group("tareas")
+def tareas():
+    """Reportes en segundo plano (ver app.tareas)."""
+
+
+@tareas.command("procesar")
+@click.option("--hilos", type=int, default=2, show_default=True)
+@with_appcontext
+def tareas_procesar(hilos):
+    """Calcula tareas pendientes hasta que se corte con Ctrl+C."""
+    from app.tareas import Ejecutor
+
+    ejecutor = Ejecutor(current_app._get_current_object(), hilos)
+    ejecutor.iniciar()
+    click.echo(f"Procesando tareas con {hilos} hilos ({ejecutor.nombre}).")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        click.echo("Esperando que terminen las tareas en curso...")
+        ejecutor.detener()
+
+
+class GrupoMigraciones(click.Group):
+    """
+    `flask db ...` sin importar Flask-Migrate (ni alembic) al crear la app:
+    el grupo real se registra recién cuando se invoca el comando.
+    """
+
+    def __init__(self, app):
+        super().__init__("db", help="Migraciones de la base (Flask-Migrate).")
+        self._app = app
+        self._grupo = None
+
+    def grupo(self):
+        if self._grupo is None:
+            from flask_migrate import Migrate
+            from app.models import db
+
+            # init_app reemplaza este grupo por el de Flask-Migrate en app.cli
+            Migrate().init_app(self._app, db)
+            self._grupo = self._app.cli.commands["db"]
+        return self._grupo
+
+    def make_context(self, info_name, args, parent=None, **extra):
+        return self.grupo().make_context(info_name, args, parent=parent, **extra)
+
+
+def register_commands(app):
+    app.cli.add_command(GrupoMigraciones(app))
+    app.cli.add_command(seed)
+    app.cli.add_command(db_mantenimiento)
+    app.cli.add_command(recalcular_totales)
+    app.cli.add_command(importar)
+    app.cli.add_command(exportar)
+    app.cli.add_command(perfilador)
+    app.cli.add_command(tareas)
@@ -0,0 +1,119 @@
+import csv
+import io
+import json
+
+from app.models import db, Trabajo, TipoTrabajo, Insumo, movimientos_unificados
+
+
+# =========================
+# EXPORTACIÓN
+# =========================
+# Mismas columnas que acepta app.importacion, así un archivo exportado se
+# puede volver a importar tal cual.
+
+COLUMNAS = (
+    "tipo", "fecha", "trabajo", "fecha_trabajo",
+    "tipo_trabajo", "insumo", "monto", "tiempo"
+)
+
+FORMATOS = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+}
+
+FILAS_POR_TANDA = 1000
+
+
+def consulta_exportacion(usuario_id, desde=None, hasta=None, trabajo_id=None):
+    """Una sola consulta con los movimientos y los nombres que referencian."""
+    m = movimientos_unificados(
+        usuario_id=usuario_id,
+        desde=desde,
+        hasta=hasta,
+        trabajo_id=trabajo_id
+    )
+
+    return (
+        db.select(
+            m.c.movimiento,
+            m.c.fecha,
+            Trabajo.nombre.label("trabajo"),
+            Trabajo.fecha.label("fecha_trabajo"),
+            TipoTrabajo.nombre.label("tipo_trabajo"),
+            Insumo.nombre.label("insumo"),
+            m.c.monto,
+            m.c.tiempo
+        )
+        .join(Trabajo, Trabajo.id == m.c.trabajo_id)
+        .outerjoin(TipoTrabajo, TipoTrabajo.id == m.c.tipo_id)
+        .outerjoin(Insumo, Insumo.id == m.c.insumo_id)
+        .order_by(m.c.fecha, m.c.movimiento.desc(), m.c.id)
+    )
+
+
+def iterar_movimientos(usuario_id, desde=None, hasta=None, trabajo_id=None):
+    """
+    Recorre los movimientos como dicts con cursor del lado del servidor
+    (donde el motor lo permite) y de a FILAS_POR_TANDA filas, sin cargar
+    todo el historial en memoria.
+    """
+    consulta = consulta_exportacion(usuario_id, desde, hasta, trabajo_id)
+    resultado = db.session.execute(
+        consulta.execution_options(yield_per=FILAS_POR_TANDA)
+    )
+
+    try:
+        for row in resultado:
+            es_pago = row.movimiento == "pago"
+            yield {
+                "tipo": "ingreso" if es_pago else "gasto",
+                "fecha": row.fecha.isoformat() if row.fecha else "",
+                "trabajo": row.trabajo,
+                "fecha_trabajo": row.fecha_trabajo.isoformat() if row.fecha_trabajo else "",
+                "tipo_trabajo": row.tipo_trabajo or "",
+                "insumo": row.insumo or "",
+                "monto": row.monto,
+                "tiempo": "" if es_pago else row.tiempo
+            }
+    finally:
+        resultado.close()
+
+
+def generar_csv(movimientos):
+    """Texto CSV en trozos de FILAS_POR_TANDA filas."""
+    buffer = io.StringIO()
+    escritor = csv.DictWriter(buffer, fieldnames=COLUMNAS, lineterminator="\n")
+    escritor.writeheader()
+
+    for numero, movimiento in enumerate(movimientos, start=1):
+        escritor.writerow(movimiento)
+
+        if numero % FILAS_POR_TANDA == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    yield buffer.getvalue()
+
+
+def generar_ndjson(movimientos):
+    """Un objeto JSON por línea, en trozos de FILAS_POR_TANDA filas."""
+    tanda = []
+
+    for movimiento in movimientos:
+        tanda.append(json.dumps(movimiento, ensure_ascii=False))
+
+        if len(tanda) == FILAS_POR_TANDA:
+            yield "\n".join(tanda) + "\n"
+            tanda = []
+
+    if tanda:
+        yield "\n".join(tanda) + "\n"
+
+
+def generar(formato, movimientos):
+    if formato == "csv":
+        return generar_csv(movimientos)
+    if formato == "ndjson":
+        return generar_ndjson(movimientos)
+    raise ValueError(f"Formato inválido: {formato!r}")
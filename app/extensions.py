@@ -1,5 +1,9 @@
 from flask_login import LoginManager
-from authlib.integrations.flask_client import OAuth
+from app.cache import CacheReportes
+
+# Flask-Migrate y Authlib no se instancian acá: importarlos cuesta más que
+# el resto de la app junta y solo se usan en `flask db` y en el login con
+# Google (ver app.comandos y app.routes.auth).
 
 login_manager = LoginManager()
-oauth = OAuth()
+cache = CacheReportes()
@@ -0,0 +1,323 @@
+import csv
+import io
+import json
+import re
+from datetime import date
+
+from sqlalchemy import insert
+
+from app.acumulados import aplicar_movimientos, incrementar_version
+from app.models import db, TipoTrabajo, Trabajo, Pago, Insumo, GastoTrabajo
+
+
+# =========================
+# IMPORTACIÓN MASIVA
+# =========================
+# Formato de cada fila (CSV con encabezado o un objeto JSON por línea):
+#   tipo          "ingreso" | "gasto"
+#   fecha         YYYY-MM-DD
+#   trabajo       nombre; si no existe se crea
+#   fecha_trabajo YYYY-MM-DD, opcional (solo al crear el trabajo)
+#   tipo_trabajo  nombre, opcional (solo al crear el trabajo)
+#   insumo        nombre, requerido en gastos; si no existe se crea
+#   monto         número
+#   tiempo        horas, opcional (gastos)
+
+FORMATOS = ("csv", "ndjson")
+
+MAX_ERRORES = 1000
+
+
+class FilaInvalida(ValueError):
+    pass
+
+
+class ArchivoIlegible(FilaInvalida):
+    """El archivo deja de ser UTF-8 en `fila`: de ahí en más no se lee."""
+
+    def __init__(self, fila):
+        super().__init__("El archivo no está en UTF-8 (guardarlo como UTF-8 y reintentar desde esta fila)")
+        self.fila = fila
+
+
+# Bytes que no son UTF-8, tal como quedan con errors="surrogateescape"
+_NO_UTF8 = re.compile("[\udc80-\udcff]")
+
+
+def detectar_formato(nombre_archivo):
+    extension = nombre_archivo.rsplit(".", 1)[-1].lower()
+    if extension in ("json", "jsonl", "ndjson"):
+        return "ndjson"
+    return "csv"
+
+
+def leer_filas(archivo, formato):
+    """
+    Itera las filas de un archivo binario sin cargarlo entero en memoria.
+    Devuelve (número de fila, dict) o (número de fila, FilaInvalida).
+    Corta con ArchivoIlegible en la primera fila que no es UTF-8.
+    """
+    # Con "strict" el error saltaría al decodificar un bloque entero, sin
+    # saber en qué fila; así cada byte inválido queda marcado en su línea
+    texto = io.TextIOWrapper(
+        archivo, encoding="utf-8-sig", errors="surrogateescape", newline=""
+    )
+
+    if formato == "csv":
+        numero = 0
+        try:
+            for numero, fila in enumerate(csv.DictReader(_lineas_utf8(texto)), start=2):
+                yield numero, fila
+        except UnicodeError:
+            raise ArchivoIlegible(numero + 1)
+        return
+
+    for numero, linea in enumerate(texto, start=1):
+        if _NO_UTF8.search(linea):
+            raise ArchivoIlegible(numero)
+        if not linea.strip():
+            continue
+        try:
+            yield numero, json.loads(linea)
+        except ValueError:
+            yield numero, FilaInvalida("JSON inválido")
+
+
+def _lineas_utf8(texto):
+    for linea in texto:
+        if _NO_UTF8.search(linea):
+            raise UnicodeError
+        yield linea
+
+
+def _texto(fila, campo):
+    valor = fila.get(campo)
+    if valor is None:
+        return ""
+    return str(valor).strip()
+
+
+def _fecha(fila, campo, requerida=True):
+    valor = _texto(fila, campo)
+    if not valor:
+        if requerida:
+            raise FilaInvalida(f"Falta {campo}")
+        return None
+    try:
+        # fromisoformat es mucho más rápido que strptime en lotes grandes
+        if len(valor) != 10:
+            raise ValueError
+        return date.fromisoformat(valor)
+    except ValueError:
+        raise FilaInvalida(f"{campo} inválida, se espera YYYY-MM-DD")
+
+
+def _nombre(fila, campo, modelo, requerido=True):
+    valor = _texto(fila, campo)
+    if not valor:
+        if requerido:
+            raise FilaInvalida(f"Falta {campo}")
+        return ""
+    if len(valor) > modelo.nombre.type.length:
+        raise FilaInvalida(f"{campo} tiene más de {modelo.nombre.type.length} caracteres")
+    return valor
+
+
+def _numero(fila, campo, requerido=True):
+    valor = _texto(fila, campo)
+    if not valor:
+        if requerido:
+            raise FilaInvalida(f"Falta {campo}")
+        return 0.0
+    try:
+        return float(valor)
+    except ValueError:
+        raise FilaInvalida(f"{campo} no es un número")
+
+
+class Importador:
+    """
+    Inserta movimientos en lotes. Los nombres de trabajos, tipos e
+    insumos se resuelven contra un mapa en memoria que se carga una vez y
+    crea cada faltante una sola vez. Cada lote es una transacción que
+    también actualiza los totales, los resúmenes mensuales y la versión
+    de datos del usuario.
+    """
+
+    def __init__(self, usuario_id, tamano_lote=5000, progreso=None):
+        self.usuario_id = usuario_id
+        self.tamano_lote = tamano_lote
+        self.progreso = progreso
+
+        self.procesadas = 0
+        self.insertadas = 0
+        self.errores = []
+        self.cantidad_errores = 0
+        self.ilegible = None
+
+        self._pagos = []
+        self._gastos = []
+
+        self._tipos = self._mapa(TipoTrabajo)
+        self._trabajos = self._mapa(Trabajo)
+        self._insumos = self._mapa(Insumo)
+
+    def _mapa(self, modelo):
+        return dict(
+            db.session.query(modelo.nombre, modelo.id)
+            .filter(modelo.usuario_id == self.usuario_id)
+            .all()
+        )
+
+    # ---------- resolución de nombres ----------
+    # Crean lo que falta: se llaman recién con la fila entera validada,
+    # para que una fila rechazada no deje trabajos, tipos o insumos sueltos
+    def _tipo_id(self, nombre):
+        if not nombre:
+            return None
+        if nombre not in self._tipos:
+            tipo = TipoTrabajo(nombre=nombre, usuario_id=self.usuario_id)
+            db.session.add(tipo)
+            db.session.flush()
+            self._tipos[nombre] = tipo.id
+        return self._tipos[nombre]
+
+    def _trabajo_id(self, nombre, fecha, tipo):
+        if nombre not in self._trabajos:
+            trabajo = Trabajo(
+                nombre=nombre,
+                fecha=fecha,
+                tipo_id=self._tipo_id(tipo),
+                usuario_id=self.usuario_id
+            )
+            db.session.add(trabajo)
+            db.session.flush()
+            self._trabajos[nombre] = trabajo.id
+
+        return self._trabajos[nombre]
+
+    def _insumo_id(self, nombre):
+        if nombre not in self._insumos:
+            insumo = Insumo(nombre=nombre, usuario_id=self.usuario_id)
+            db.session.add(insumo)
+            db.session.flush()
+            self._insumos[nombre] = insumo.id
+
+        return self._insumos[nombre]
+
+    # ---------- filas ----------
+    def agregar(self, numero, fila):
+        self.procesadas += 1
+
+        try:
+            if isinstance(fila, Exception):
+                raise fila
+            if not isinstance(fila, dict):
+                raise FilaInvalida("La fila debe ser un objeto")
+
+            self._agregar(fila)
+        except FilaInvalida as e:
+            self.cantidad_errores += 1
+            if len(self.errores) < MAX_ERRORES:
+                self.errores.append({"fila": numero, "error": str(e)})
+
+        if len(self._pagos) + len(self._gastos) >= self.tamano_lote:
+            self.confirmar_lote()
+
+    def _agregar(self, fila):
+        tipo = _texto(fila, "tipo").lower()
+        if tipo not in ("ingreso", "gasto"):
+            raise FilaInvalida("tipo debe ser ingreso o gasto")
+
+        fecha = _fecha(fila, "fecha")
+        trabajo = _nombre(fila, "trabajo", Trabajo)
+        fecha_trabajo = _fecha(fila, "fecha_trabajo", requerida=False) or fecha
+        tipo_trabajo = _nombre(fila, "tipo_trabajo", TipoTrabajo, requerido=False)
+
+        if tipo == "ingreso":
+            monto = _numero(fila, "monto")
+        else:
+            monto = _numero(fila, "monto", requerido=False)
+            tiempo = _numero(fila, "tiempo", requerido=False)
+            insumo = _nombre(fila, "insumo", Insumo)
+
+        # La fila es válida: recién ahora se crean los nombres nuevos
+        movimiento = {
+            "fecha": fecha,
+            "monto": monto,
+            "trabajo_id": self._trabajo_id(trabajo, fecha_trabajo, tipo_trabajo),
+            "usuario_id": self.usuario_id
+        }
+
+        if tipo == "ingreso":
+            self._pagos.append(movimiento)
+        else:
+            movimiento["tiempo"] = tiempo
+            movimiento["insumo_id"] = self._insumo_id(insumo)
+            self._gastos.append(movimiento)
+
+    def confirmar_lote(self):
+        if not self._pagos and not self._gastos:
+            db.session.commit()
+            return
+
+        conexion = db.session.connection()
+
+        if self._pagos:
+            db.session.execute(insert(Pago.__table__), self._pagos)
+        if self._gastos:
+            db.session.execute(insert(GastoTrabajo.__table__), self._gastos)
+
+        # Los INSERT masivos no pasan por el flush del ORM: se aplican a
+        # mano los mismos deltas que calcula app.acumulados
+        aplicar_movimientos(
+            conexion,
+            [(1, True, p) for p in self._pagos]
+            + [(1, False, g) for g in self._gastos]
+        )
+        incrementar_version(conexion, {self.usuario_id})
+
+        db.session.commit()
+
+        self.insertadas += len(self._pagos) + len(self._gastos)
+        self._pagos = []
+        self._gastos = []
+
+        if self.progreso:
+            self.progreso(self.procesadas, self.insertadas)
+
+    def importar(self, filas):
+        try:
+            try:
+                for numero, fila in filas:
+                    self.agregar(numero, fila)
+            except ArchivoIlegible as e:
+                # Lo leído hasta esa fila se guarda igual: el resumen dice
+                # desde dónde reintentar
+                self.ilegible = e
+            self.confirmar_lote()
+        except Exception:
+            db.session.rollback()
+            raise
+
+        return self.resumen()
+
+    def resumen(self):
+        resumen = {
+            "procesadas": self.procesadas,
+            "insertadas": self.insertadas,
+            "con_error": self.cantidad_errores,
+            "errores": self.errores
+        }
+        if self.ilegible is not None:
+            resumen["error"] = str(self.ilegible)
+            resumen["fila"] = self.ilegible.fila
+        return resumen
+
+
+def importar_archivo(archivo, formato, usuario_id, tamano_lote=5000, progreso=None):
+    if formato not in FORMATOS:
+        raise ValueError(f"Formato inválido: {formato!r}")
+
+    importador = Importador(usuario_id, tamano_lote=tamano_lote, progreso=progreso)
+    return importador.importar(leer_filas(archivo, formato))
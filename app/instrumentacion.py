@@ -0,0 +1,164 @@
+import hashlib
+import json
+import logging
+import re
+import time
+
+from flask import g, has_app_context, request
+from sqlalchemy import event
+
+from app.models import db
+
+
+# =========================
+# INSTRUMENTACIÓN SQL
+# =========================
+# Con SQL_INSTRUMENTACION=1 cada request mide cuántas sentencias ejecuta,
+# cuánto tiempo pasa en la base y cuántas veces repite cada "forma" de
+# sentencia (el SQL sin los valores de los parámetros). Lo informa en el
+# header Server-Timing y en una línea JSON del logger "<app>.sql", y avisa
+# con un WARNING cuando una misma forma se repite más de
+# SQL_N_MAS_1_UMBRAL veces: casi siempre una relación lazy recorrida en
+# un loop o en un template (N+1).
+#
+# Las métricas (app.metricas) usan la misma medición, sin agrupar por
+# forma, para el tiempo en la base de cada request. Con las dos apagadas
+# no se registra ningún listener, así que no cuesta nada.
+
+_PARAMETROS = re.compile(r"%\(\w+\)s|\$\d+|:\w+|\?")
+_LISTAS = re.compile(r"\?(?:\s*,\s*\?)+")
+_NUMEROS = re.compile(r"\b\d+\b")
+_ESPACIOS = re.compile(r"\s+")
+
+def forma_sentencia(sql):
+    """SQL normalizado: parámetros y listas IN como ?, números como N."""
+    sql = _PARAMETROS.sub("?", sql)
+    sql = _LISTAS.sub("?", sql)
+    sql = _NUMEROS.sub("N", sql)
+    return _ESPACIOS.sub(" ", sql).strip()
+
+
+class MedicionSQL:
+    """Sentencias de un request; con `detallada`, también agrupadas por forma."""
+
+    def __init__(self, detallada=True):
+        self.inicio = time.perf_counter()
+        self.detallada = detallada
+        self.consultas = 0
+        self.tiempo = 0.0
+        self.por_forma = {}  # huella -> [veces, segundos, sql]
+
+    def registrar(self, sql, duracion):
+        self.consultas += 1
+        self.tiempo += duracion
+
+        if not self.detallada:
+            return
+
+        forma = forma_sentencia(sql)
+        huella = hashlib.sha1(forma.encode()).hexdigest()[:12]
+
+        entrada = self.por_forma.get(huella)
+        if entrada is None:
+            self.por_forma[huella] = [1, duracion, forma]
+        else:
+            entrada[0] += 1
+            entrada[1] += duracion
+
+    def repetidas(self, minimo=2):
+        """Formas ejecutadas al menos `minimo` veces, de más a menos."""
+        return sorted(
+            (
+                {"huella": huella, "veces": veces, "ms": round(segundos * 1000, 2), "sql": sql}
+                for huella, (veces, segundos, sql) in self.por_forma.items()
+                if veces >= minimo
+            ),
+            key=lambda r: -r["veces"]
+        )
+
+
+def medicion_actual():
+    """La MedicionSQL del request en curso, o None."""
+    return g.get("medicion_sql") if has_app_context() else None
+
+
+# El inicio va en el contexto de ejecución de la sentencia, no en la
+# conexión: si la sentencia falla no hay after_cursor_execute, y el valor
+# se descarta con el contexto en vez de quedar para la siguiente.
+def _antes(conexion, cursor, sql, parametros, contexto, executemany):
+    if contexto is not None:
+        contexto._inicio_instrumentacion = time.perf_counter()
+
+
+def _despues(conexion, cursor, sql, parametros, contexto, executemany):
+    inicio = getattr(contexto, "_inicio_instrumentacion", None)
+    if inicio is None:
+        return
+
+    medicion = medicion_actual()
+    if medicion is not None:
+        medicion.registrar(sql, time.perf_counter() - inicio)
+
+
+def instrumentar(app):
+    """Registra los listeners y hooks si SQL_INSTRUMENTACION o METRICAS están activas."""
+    detallada = app.config["SQL_INSTRUMENTACION"]
+    if not (detallada or app.config["METRICAS"]):
+        return
+
+    with app.app_context():
+        for motor in db.engines.values():
+            event.listen(motor, "before_cursor_execute", _antes)
+            event.listen(motor, "after_cursor_execute", _despues)
+
+    @app.before_request
+    def _iniciar_medicion():
+        g.medicion_sql = MedicionSQL(detallada)
+
+    if detallada:
+        _informar(app)
+
+
+def _informar(app):
+    umbral = app.config["SQL_N_MAS_1_UMBRAL"]
+    logger = app.logger.getChild("sql")
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+
+    @app.after_request
+    def _informar_medicion(respuesta):
+        medicion = g.get("medicion_sql")
+        if medicion is None:
+            return respuesta
+
+        total = (time.perf_counter() - medicion.inicio) * 1000
+        db_ms = medicion.tiempo * 1000
+        n_mas_1 = [r for r in medicion.repetidas() if r["veces"] > umbral]
+
+        respuesta.headers.add(
+            "Server-Timing", f'db;dur={db_ms:.2f};desc="{medicion.consultas} consultas"'
+        )
+        respuesta.headers.add("Server-Timing", f"app;dur={total:.2f}")
+
+        registro = {
+            "metodo": request.method,
+            "ruta": request.endpoint,
+            "path": request.path,
+            "status": respuesta.status_code,
+            "consultas": medicion.consultas,
+            "db_ms": round(db_ms, 2),
+            "total_ms": round(total, 2),
+            "repetidas": medicion.repetidas(),
+        }
+        logger.info(json.dumps(registro, ensure_ascii=False))
+
+        for r in n_mas_1:
+            logger.warning(json.dumps({
+                "posible_n_mas_1": request.endpoint,
+                "path": request.path,
+                "veces": r["veces"],
+                "huella": r["huella"],
+                "sql": r["sql"][:300],
+            }, ensure_ascii=False))
+
+        return respuesta
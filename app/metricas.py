@@ -0,0 +1,234 @@
+import os
+import threading
+import time
+
+from flask import Response, abort, current_app, g, request
+
+from app.base_datos import estadisticas_pools
+from app.extensions import cache
+from app.instrumentacion import medicion_actual
+
+
+# =========================
+# MÉTRICAS (PROMETHEUS)
+# =========================
+# /metrics en formato de texto de Prometheus:
+#
+#   gestion_http_request_duration_seconds{endpoint,status}   histograma
+#   gestion_http_requests_in_progress                        gauge
+#   gestion_db_request_seconds{endpoint}                     histograma
+#   gestion_db_request_statements{endpoint}                  histograma
+#   gestion_db_pool_connections{bind,state}                  gauge
+#   gestion_db_pool_{checkouts,timeouts}_total{bind}         contadores
+#   gestion_db_pool_wait_seconds_total{bind}                 contador
+#   gestion_cache_{hits,misses}_total                        contadores
+#
+# Con varios workers de gunicorn hay que definir PROMETHEUS_MULTIPROC_DIR
+# (un directorio vacío, el mismo para todos): cada proceso escribe sus
+# valores en archivos ahí y /metrics los suma, sin importar qué worker
+# atienda el scrape. gunicorn.conf.py limpia el directorio al arrancar y
+# da de baja los workers que terminan.
+#
+# Las estadísticas del pool y de la caché son contadores en memoria de
+# cada proceso; se copian a las métricas como mucho una vez por segundo.
+
+BUCKETS_DURACION = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+BUCKETS_CONSULTAS = (1, 2, 3, 5, 10, 20, 50, 100)
+
+INTERVALO_SINCRONIZACION = 1.0
+
+_metricas = None
+
+
+class Metricas:
+    def __init__(self):
+        from prometheus_client import Counter, Gauge, Histogram
+
+        self.duracion = Histogram(
+            "gestion_http_request_duration_seconds",
+            "Duración de cada request por endpoint y status.",
+            ["endpoint", "status"],
+            buckets=BUCKETS_DURACION
+        )
+        self.en_curso = Gauge(
+            "gestion_http_requests_in_progress",
+            "Requests que se están atendiendo.",
+            multiprocess_mode="livesum"
+        )
+        self.db_tiempo = Histogram(
+            "gestion_db_request_seconds",
+            "Tiempo en la base de datos por request.",
+            ["endpoint"],
+            buckets=BUCKETS_DURACION
+        )
+        self.db_consultas = Histogram(
+            "gestion_db_request_statements",
+            "Sentencias SQL por request.",
+            ["endpoint"],
+            buckets=BUCKETS_CONSULTAS
+        )
+        self.pool_conexiones = Gauge(
+            "gestion_db_pool_connections",
+            "Conexiones del pool por estado.",
+            ["bind", "state"],
+            multiprocess_mode="livesum"
+        )
+        self.pool_checkouts = Counter(
+            "gestion_db_pool_checkouts", "Conexiones obtenidas del pool.", ["bind"]
+        )
+        self.pool_timeouts = Counter(
+            "gestion_db_pool_timeouts", "Esperas del pool que vencieron.", ["bind"]
+        )
+        self.pool_espera = Counter(
+            "gestion_db_pool_wait_seconds", "Tiempo esperando una conexión.", ["bind"]
+        )
+        self.cache_aciertos = Counter(
+            "gestion_cache_hits", "Aciertos de la caché de reportes."
+        )
+        self.cache_fallos = Counter(
+            "gestion_cache_misses", "Fallos de la caché de reportes."
+        )
+
+        self._series_por_clave = {}
+        self._ultima_sincronizacion = 0.0
+        self._copiados = {}
+        self._lock_sincronizacion = threading.Lock()
+
+    # ---------- requests ----------
+    def iniciar(self):
+        g.metricas_inicio = time.perf_counter()
+        self.en_curso.inc()
+
+    def registrar(self, respuesta):
+        inicio = g.get("metricas_inicio")
+        if inicio is None:
+            return
+
+        duracion, db_tiempo, db_consultas = self._series(
+            request.endpoint or "sin_ruta", respuesta.status_code
+        )
+        duracion.observe(time.perf_counter() - inicio)
+
+        medicion = medicion_actual()
+        if medicion is not None:
+            db_tiempo.observe(medicion.tiempo)
+            db_consultas.observe(medicion.consultas)
+
+        if inicio - self._ultima_sincronizacion > INTERVALO_SINCRONIZACION:
+            self.sincronizar(esperar=False)
+
+    def _series(self, endpoint, status):
+        # .labels() arma y busca la serie en cada llamada; se guarda por
+        # (endpoint, status), que son pocos
+        clave = (endpoint, status)
+        series = self._series_por_clave.get(clave)
+        if series is None:
+            series = self._series_por_clave[clave] = (
+                self.duracion.labels(endpoint, str(status)),
+                self.db_tiempo.labels(endpoint),
+                self.db_consultas.labels(endpoint)
+            )
+        return series
+
+    def terminar(self):
+        if g.pop("metricas_inicio", None) is not None:
+            self.en_curso.dec()
+
+    # ---------- pool y caché ----------
+    def sincronizar(self, esperar=True):
+        """
+        Copia a las métricas lo que cambió en el pool y la caché. Con
+        esperar=False (desde los requests) no hace nada si otro hilo ya
+        está copiando: dos copias a la vez sumarían dos veces el mismo delta.
+        """
+        if not self._lock_sincronizacion.acquire(blocking=esperar):
+            return
+        try:
+            self._sincronizar()
+        finally:
+            self._lock_sincronizacion.release()
+
+    def _sincronizar(self):
+        self._ultima_sincronizacion = time.perf_counter()
+
+        for bind, estado in estadisticas_pools().items():
+            self.pool_conexiones.labels(bind, "in_use").set(estado["en_uso"])
+            self.pool_conexiones.labels(bind, "idle").set(estado["ociosas"])
+            self._sumar(self.pool_checkouts.labels(bind), ("checkouts", bind), estado["checkouts"])
+            self._sumar(self.pool_timeouts.labels(bind), ("timeouts", bind), estado["timeouts"])
+            self._sumar(
+                self.pool_espera.labels(bind), ("espera", bind), estado["espera_total_ms"] / 1000
+            )
+
+        self._sumar(self.cache_aciertos, "aciertos", cache.aciertos)
+        self._sumar(self.cache_fallos, "fallos", cache.fallos)
+
+    def _sumar(self, contador, clave, total):
+        """Pasa al contador lo que creció `total` desde la última copia."""
+        delta = total - self._copiados.get(clave, 0)
+        if delta > 0:
+            contador.inc(delta)
+        self._copiados[clave] = total
+
+
+def metricas():
+    """Las métricas del proceso (se crean una sola vez por proceso)."""
+    global _metricas
+    if _metricas is None:
+        _metricas = Metricas()
+    return _metricas
+
+
+def autorizar():
+    """
+    Corta el request si no trae "Authorization: Bearer <METRICAS_TOKEN>".
+    Sin token configurado /metrics y las estadísticas no existen (404):
+    muestran tráfico y carga de toda la app, no solo del usuario.
+    """
+    token = current_app.config["METRICAS_TOKEN"]
+    if not token:
+        abort(404)
+
+    if request.headers.get("Authorization") != f"Bearer {token}":
+        abort(401)
+
+
+def exponer():
+    autorizar()
+
+    from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, generate_latest
+
+    metricas().sincronizar()
+
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        registro = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registro)
+    else:
+        registro = REGISTRY
+
+    return Response(generate_latest(registro), content_type=CONTENT_TYPE_LATEST)
+
+
+def configurar_metricas(app):
+    """Mide cada request y expone /metrics si METRICAS está activa."""
+    if not app.config["METRICAS"]:
+        return
+
+    medidas = metricas()
+
+    @app.before_request
+    def _iniciar_metricas():
+        medidas.iniciar()
+
+    @app.after_request
+    def _registrar_metricas(respuesta):
+        medidas.registrar(respuesta)
+        return respuesta
+
+    @app.teardown_request
+    def _terminar_metricas(error):
+        medidas.terminar()
+
+    app.add_url_rule("/metrics", endpoint="metricas", view_func=exponer)
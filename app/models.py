@@ -1,8 +1,48 @@
+import re
+import unicodedata
+
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import UserMixin
 from datetime import date
+from sqlalchemy import event, literal, null, union_all
+from app.replica import SesionEnrutada
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": SesionEnrutada})
+
+
+# =========================
+# NOMBRES NORMALIZADOS
+# =========================
+# Trabajos, insumos y tipos guardan también el nombre sin acentos ni
+# mayúsculas y con la puntuación como espacios, indexado con el usuario:
+# la búsqueda por prefijo del formulario (app.busqueda) es un range scan
+# sobre ese índice.
+
+_NO_ALFANUMERICO = re.compile(r"[\W_]+")
+
+
+def normalizar_nombre(texto):
+    """'  Casa García-López ' -> 'casa garcia lopez'."""
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.casefold()).strip()
+
+
+def _nombre_normalizado_por_defecto(contexto):
+    # INSERT hechos con Core (importación y benchmarks); con el ORM el
+    # valor ya lo puso _normalizar_al_asignar
+    return normalizar_nombre(contexto.get_current_parameters().get("nombre"))
+
+
+def _indice_nombre(nombre):
+    # text_pattern_ops: en Postgres, LIKE 'prefijo%' usa el índice con
+    # cualquier collation
+    return db.Index(
+        nombre, 'usuario_id', 'nombre_normalizado',
+        postgresql_ops={'nombre_normalizado': 'text_pattern_ops'}
+    )
 
 
 # =========================
@@ -24,6 +64,28 @@ class Usuario(db.Model, UserMixin):
 
     foto_url = db.Column(db.String(300))
 
+    # Se incrementa en cada flush que cambia datos del usuario (ver
+    # app.acumulados); las claves de la caché de reportes y los ETag la
+    # incluyen. datos_modificados_en (UTC) alimenta Last-Modified.
+    datos_version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    datos_modificados_en = db.Column(db.DateTime)
+
+    def identidad(self):
+        """Lo que se guarda en la sesión firmada (ver IdentidadUsuario)."""
+        return {"id": self.id, "nombre": self.nombre, "foto_url": self.foto_url}
+
+
+class IdentidadUsuario(UserMixin):
+    """
+    current_user armado desde la sesión firmada, sin consultar la base.
+    Tiene solo lo que usan las vistas y templates: id, nombre y foto_url.
+    """
+
+    def __init__(self, identidad):
+        self.id = identidad["id"]
+        self.nombre = identidad["nombre"]
+        self.foto_url = identidad.get("foto_url")
+
 
 # =========================
 # TIPO TRABAJO
@@ -33,10 +95,14 @@ class TipoTrabajo(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('usuario_id', 'nombre', name='uq_tipo_trabajo_usuario'),
+        _indice_nombre('ix_tipos_trabajo_usuario_nombre'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(100), nullable=False)
+    nombre_normalizado = db.Column(
+        db.String(100), nullable=False, default=_nombre_normalizado_por_defecto
+    )
 
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
 
@@ -51,10 +117,15 @@ class Trabajo(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('usuario_id', 'nombre', name='uq_trabajo_usuario'),
+        db.Index('ix_trabajos_usuario_tipo', 'usuario_id', 'tipo_id'),
+        _indice_nombre('ix_trabajos_usuario_nombre'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(150), nullable=False)
+    nombre_normalizado = db.Column(
+        db.String(150), nullable=False, default=_nombre_normalizado_por_defecto
+    )
     fecha = db.Column(db.Date, default=date.today)
 
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
@@ -76,22 +147,17 @@ class Trabajo(db.Model):
         cascade="all, delete-orphan"
     )
 
-    @property
-    def ingreso_total_bruto(self):
-        return sum(p.monto for p in self.pagos)
-
-    @property
-    def gasto_total(self):
-        return sum(g.monto for g in self.gastos)
+    # Totales acumulados: los mantiene app.acumulados en cada flush que
+    # inserta, edita o borra pagos/gastos; `flask recalcular-totales`
+    # los reconstruye desde cero.
+    ingreso_total_bruto = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    gasto_total = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    horas_totales = db.Column(db.Float, nullable=False, default=0, server_default='0')
 
     @property
     def ingreso_total_neto(self):
         return self.ingreso_total_bruto - self.gasto_total
 
-    @property
-    def horas_totales(self):
-        return sum(g.tiempo or 0 for g in self.gastos)
-
     @property
     def valor_hora(self):
         if self.horas_totales > 0:
@@ -109,6 +175,12 @@ class Trabajo(db.Model):
 class Pago(db.Model):
     __tablename__ = 'pagos'
 
+    # Índices de los reportes: por usuario y mes, y el detalle de cada trabajo
+    __table_args__ = (
+        db.Index('ix_pagos_usuario_fecha', 'usuario_id', 'fecha'),
+        db.Index('ix_pagos_trabajo', 'trabajo_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.Date, default=date.today)
     monto = db.Column(db.Float, nullable=False)
@@ -125,10 +197,14 @@ class Insumo(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('usuario_id', 'nombre', name='uq_insumo_usuario'),
+        _indice_nombre('ix_insumos_usuario_nombre'),
     )
 
     id = db.Column(db.Integer, primary_key=True)
     nombre = db.Column(db.String(150), nullable=False)
+    nombre_normalizado = db.Column(
+        db.String(150), nullable=False, default=_nombre_normalizado_por_defecto
+    )
 
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
 
@@ -141,6 +217,14 @@ class Insumo(db.Model):
 class GastoTrabajo(db.Model):
     __tablename__ = 'gastos_trabajo'
 
+    # Índices de los reportes: por usuario y mes, por insumo y mes,
+    # y el detalle de cada trabajo
+    __table_args__ = (
+        db.Index('ix_gastos_usuario_fecha', 'usuario_id', 'fecha'),
+        db.Index('ix_gastos_insumo_fecha', 'insumo_id', 'fecha'),
+        db.Index('ix_gastos_trabajo', 'trabajo_id'),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     fecha = db.Column(db.Date, default=date.today)
     monto = db.Column(db.Float, nullable=False, default=0)
@@ -149,3 +233,140 @@ class GastoTrabajo(db.Model):
     usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
     trabajo_id = db.Column(db.Integer, db.ForeignKey('trabajos.id'), nullable=False)
     insumo_id = db.Column(db.Integer, db.ForeignKey('insumos.id'), nullable=False)
+
+
+def _normalizar_al_asignar(objeto, valor, anterior, iniciador):
+    objeto.nombre_normalizado = normalizar_nombre(valor)
+
+
+for _modelo in (TipoTrabajo, Trabajo, Insumo):
+    event.listen(_modelo.nombre, "set", _normalizar_al_asignar)
+
+
+# =========================
+# RESUMEN MENSUAL
+# =========================
+class ResumenMensual(db.Model):
+    """
+    Totales por usuario y mes. Los mantiene app.acumulados junto con los
+    totales de cada trabajo, así los resúmenes no recorren el historial.
+    """
+    __tablename__ = 'resumenes_mensuales'
+
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), primary_key=True)
+    anio = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    mes = db.Column(db.Integer, primary_key=True, autoincrement=False)
+
+    ingresos = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    gastos = db.Column(db.Float, nullable=False, default=0, server_default='0')
+    horas = db.Column(db.Float, nullable=False, default=0, server_default='0')
+
+    # cantidad de pagos + gastos del mes; en 0 el mes no se muestra
+    cantidad = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    @property
+    def neto(self):
+        return self.ingresos - self.gastos
+
+
+# =========================
+# TAREA DE REPORTE
+# =========================
+class TareaReporte(db.Model):
+    """
+    Reporte pedido para calcular en segundo plano (ver app.tareas). La
+    tabla es la cola: los hilos de cada proceso reclaman las pendientes
+    con un UPDATE condicional y guardan acá el resultado hasta vence_en.
+    """
+    __tablename__ = 'tareas_reporte'
+
+    __table_args__ = (
+        db.Index('ix_tareas_reporte_estado', 'estado', 'id'),
+        db.Index('ix_tareas_reporte_usuario', 'usuario_id', 'estado'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    usuario_id = db.Column(db.Integer, db.ForeignKey('usuarios.id'), nullable=False)
+
+    reporte = db.Column(db.String(50), nullable=False)
+    parametros = db.Column(db.Text, nullable=False, default='{}', server_default='{}')
+
+    # pendiente -> en_curso -> terminada | fallida
+    estado = db.Column(db.String(20), nullable=False, default='pendiente', server_default='pendiente')
+    intentos = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    worker = db.Column(db.String(100))
+
+    resultado = db.Column(db.Text)
+    error = db.Column(db.Text)
+
+    # UTC
+    creada_en = db.Column(db.DateTime, nullable=False)
+    iniciada_en = db.Column(db.DateTime)
+    terminada_en = db.Column(db.DateTime)
+    vence_en = db.Column(db.DateTime)
+
+
+
+# =========================
+# MOVIMIENTOS UNIFICADOS
+# =========================
+def movimientos_unificados(usuario_id=None, desde=None, hasta=None, trabajo_id=None):
+    """
+    Pagos y gastos como una sola relación (UNION ALL), para que cada
+    reporte sea una única consulta agrupada y ordenada en SQL.
+
+    Columnas: id, usuario_id, trabajo_id, tipo_id, insumo_id, fecha,
+    movimiento ('pago' | 'gasto'), monto, monto_signado (gastos en
+    negativo) y tiempo.
+
+    Los filtros por usuario, por rango [desde, hasta) y por trabajo se
+    aplican en cada rama para que usen los índices (usuario_id, fecha) y
+    (trabajo_id).
+    """
+    pagos = (
+        db.select(
+            Pago.id.label('id'),
+            Pago.usuario_id.label('usuario_id'),
+            Pago.trabajo_id.label('trabajo_id'),
+            Trabajo.tipo_id.label('tipo_id'),
+            null().label('insumo_id'),
+            Pago.fecha.label('fecha'),
+            literal('pago').label('movimiento'),
+            Pago.monto.label('monto'),
+            Pago.monto.label('monto_signado'),
+            literal(0.0).label('tiempo')
+        )
+        .join(Trabajo, Pago.trabajo_id == Trabajo.id)
+    )
+
+    gastos = (
+        db.select(
+            GastoTrabajo.id,
+            GastoTrabajo.usuario_id,
+            GastoTrabajo.trabajo_id,
+            Trabajo.tipo_id,
+            GastoTrabajo.insumo_id,
+            GastoTrabajo.fecha,
+            literal('gasto'),
+            GastoTrabajo.monto,
+            -GastoTrabajo.monto,
+            GastoTrabajo.tiempo
+        )
+        .join(Trabajo, GastoTrabajo.trabajo_id == Trabajo.id)
+    )
+
+    def filtrar(consulta, modelo):
+        if usuario_id is not None:
+            consulta = consulta.where(modelo.usuario_id == usuario_id)
+        if desde is not None:
+            consulta = consulta.where(modelo.fecha >= desde)
+        if hasta is not None:
+            consulta = consulta.where(modelo.fecha < hasta)
+        if trabajo_id is not None:
+            consulta = consulta.where(modelo.trabajo_id == trabajo_id)
+        return consulta
+
+    return union_all(
+        filtrar(pagos, Pago),
+        filtrar(gastos, GastoTrabajo)
+    ).subquery('movimientos')
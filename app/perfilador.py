@@ -0,0 +1,302 @@
+import cProfile
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+from flask import abort, current_app, g, jsonify, request, send_from_directory
+from flask_login import current_user
+
+
+# =========================
+# PERFILADOR POR REQUEST
+# =========================
+# Con PERFILADOR=1 se puede perfilar un request puntual:
+#
+#   - header "X-Perfilar: <PERFILADOR_TOKEN>" en el request (y, opcional,
+#     "X-Perfilar-Modo: muestreo")
+#   - `flask perfilador activar --usuario 3 --endpoint trabajos.index`,
+#     que perfila los requests de ese usuario y/o endpoint durante un rato
+#     en todos los workers de la máquina (ver objetivos.json)
+#
+# Modos: "cprofile" guarda un .pstats; "muestreo" toma la pila del hilo
+# cada PERFILADOR_INTERVALO_MS y guarda un .folded (pilas colapsadas, para
+# flamegraph.pl o speedscope). Los archivos van a PERFILADOR_DIR, que
+# guarda solo los últimos PERFILADOR_MAX_ARCHIVOS. /perfiles/ los lista.
+#
+# Sin PERFILADOR no se registra nada. Con PERFILADOR y sin objetivos
+# activos, un request sin el header solo paga un par de comparaciones.
+
+MODOS = ("cprofile", "muestreo")
+EXTENSIONES = {"cprofile": ".pstats", "muestreo": ".folded"}
+
+ARCHIVO_OBJETIVOS = "objetivos.json"
+
+_objetivos = {"leido": 0.0, "mtime": None, "valor": None}
+
+# cProfile admite un solo perfil activo por proceso (desde 3.12 un segundo
+# enable() lanza ValueError): con varios hilos, el request que lo encuentra
+# ocupado se atiende sin perfilar
+_cprofile_ocupado = threading.Lock()
+
+
+# =========================
+# OBJETIVOS
+# =========================
+def guardar_objetivos(directorio, usuarios=(), endpoints=(), minutos=30, modo="cprofile"):
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, ARCHIVO_OBJETIVOS)
+
+    with open(ruta + ".tmp", "w") as archivo:
+        json.dump({
+            "usuarios": sorted(set(usuarios)),
+            "endpoints": sorted(set(endpoints)),
+            "hasta": time.time() + minutos * 60,
+            "modo": modo,
+        }, archivo)
+    os.replace(ruta + ".tmp", ruta)
+
+
+def borrar_objetivos(directorio):
+    try:
+        os.remove(os.path.join(directorio, ARCHIVO_OBJETIVOS))
+    except FileNotFoundError:
+        pass
+
+
+def leer_objetivos(directorio):
+    """Objetivos vigentes, o None. Relee el archivo como mucho una vez por segundo."""
+    ahora = time.time()
+
+    if ahora - _objetivos["leido"] > 1:
+        _objetivos["leido"] = ahora
+        ruta = os.path.join(directorio, ARCHIVO_OBJETIVOS)
+
+        try:
+            mtime = os.stat(ruta).st_mtime
+        except FileNotFoundError:
+            _objetivos["mtime"] = _objetivos["valor"] = None
+        else:
+            if mtime != _objetivos["mtime"]:
+                with open(ruta) as archivo:
+                    valor = json.load(archivo)
+                valor["usuarios"] = set(valor["usuarios"])
+                valor["endpoints"] = set(valor["endpoints"])
+                _objetivos["mtime"], _objetivos["valor"] = mtime, valor
+
+    valor = _objetivos["valor"]
+    if valor is None or valor["hasta"] < ahora:
+        return None
+    return valor
+
+
+def _modo_del_request(config):
+    token = config["PERFILADOR_TOKEN"]
+    if token and request.headers.get("X-Perfilar") == token:
+        modo = request.headers.get("X-Perfilar-Modo", "cprofile")
+        return modo if modo in MODOS else "cprofile"
+
+    objetivos = leer_objetivos(config["PERFILADOR_DIR"])
+    if objetivos is None:
+        return None
+
+    if objetivos["endpoints"] and request.endpoint not in objetivos["endpoints"]:
+        return None
+    if objetivos["usuarios"]:
+        if not current_user.is_authenticated or current_user.id not in objetivos["usuarios"]:
+            return None
+
+    return objetivos["modo"]
+
+
+# =========================
+# CAPTURA
+# =========================
+class Muestreador:
+    """Toma la pila de un hilo a intervalos fijos y cuenta las pilas iguales."""
+
+    def __init__(self, intervalo):
+        self.intervalo = intervalo
+        self.hilo = threading.get_ident()
+        self.pilas = Counter()
+        self._parar = threading.Event()
+        self._muestreo = threading.Thread(target=self._muestrear, daemon=True)
+
+    def enable(self):
+        self._muestreo.start()
+
+    def disable(self):
+        self._parar.set()
+        self._muestreo.join()
+
+    def _muestrear(self):
+        while not self._parar.wait(self.intervalo):
+            frame = sys._current_frames().get(self.hilo)
+            pila = []
+            while frame is not None:
+                codigo = frame.f_code
+                pila.append(
+                    f"{codigo.co_name} ({os.path.basename(codigo.co_filename)}:{codigo.co_firstlineno})"
+                )
+                frame = frame.f_back
+            if pila:
+                self.pilas[";".join(reversed(pila))] += 1
+
+    def dump_stats(self, ruta):
+        with open(ruta, "w") as archivo:
+            for pila, cantidad in self.pilas.most_common():
+                archivo.write(f"{pila} {cantidad}\n")
+
+
+def _iniciar(modo, config):
+    if modo == "muestreo":
+        perfil = Muestreador(config["PERFILADOR_INTERVALO_MS"] / 1000)
+    elif _cprofile_ocupado.acquire(blocking=False):
+        perfil = cProfile.Profile()
+    else:
+        return
+
+    try:
+        perfil.enable()
+    except ValueError:
+        # otro perfilador fuera de este módulo (p. ej. `python -m cProfile`)
+        _cprofile_ocupado.release()
+        return
+
+    g.perfil = (modo, perfil, time.perf_counter())
+
+
+def _detener(modo, perfil):
+    perfil.disable()
+    if modo == "cprofile":
+        _cprofile_ocupado.release()
+
+
+def _terminar(respuesta, config):
+    modo, perfil, inicio = g.pop("perfil")
+    _detener(modo, perfil)
+
+    milisegundos = int((time.perf_counter() - inicio) * 1000)
+    usuario = current_user.id if current_user.is_authenticated else 0
+
+    # fecha_usuario_status_ms_endpoint.ext: ordena por fecha y se lista sin abrirlo
+    nombre = (
+        f"{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}_{usuario}_"
+        f"{respuesta.status_code}_{milisegundos}ms_{request.endpoint}{EXTENSIONES[modo]}"
+    )
+
+    directorio = config["PERFILADOR_DIR"]
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, nombre)
+
+    perfil.dump_stats(ruta + ".tmp")
+    os.replace(ruta + ".tmp", ruta)
+
+    _recortar(directorio, config["PERFILADOR_MAX_ARCHIVOS"])
+    respuesta.headers["X-Perfil"] = nombre
+
+
+def _recortar(directorio, maximo):
+    """Deja solo los `maximo` perfiles más nuevos."""
+    for nombre in listar_archivos(directorio)[maximo:]:
+        try:
+            os.remove(os.path.join(directorio, nombre))
+        except FileNotFoundError:
+            pass  # lo borró otro worker
+
+
+def listar_archivos(directorio):
+    """Nombres de los perfiles guardados, del más nuevo al más viejo."""
+    try:
+        nombres = os.listdir(directorio)
+    except FileNotFoundError:
+        return []
+
+    extensiones = tuple(EXTENSIONES.values())
+    return sorted((n for n in nombres if n.endswith(extensiones)), reverse=True)
+
+
+def describir(nombre):
+    base, extension = os.path.splitext(nombre)
+    fecha, usuario, status, duracion, endpoint = base.split("_", 4)
+
+    return {
+        "nombre": nombre,
+        "fecha": datetime.strptime(fecha, "%Y%m%dT%H%M%S%f")
+                         .replace(tzinfo=timezone.utc).isoformat(),
+        "usuario": int(usuario),
+        "status": int(status),
+        "ms": int(duracion.removesuffix("ms")),
+        "endpoint": endpoint,
+        "formato": extension.lstrip("."),
+    }
+
+
+# =========================
+# VISTAS
+# =========================
+def _autorizar():
+    token = current_app.config["PERFILADOR_TOKEN"]
+    if not token:
+        abort(404)
+    if request.headers.get("Authorization") != f"Bearer {token}":
+        abort(401)
+
+
+def listado():
+    _autorizar()
+    directorio = current_app.config["PERFILADOR_DIR"]
+    return jsonify([describir(nombre) for nombre in listar_archivos(directorio)])
+
+
+def descargar(nombre):
+    """El archivo tal cual, o con ?top=N un resumen de texto de un .pstats."""
+    _autorizar()
+    directorio = current_app.config["PERFILADOR_DIR"]
+
+    if nombre not in listar_archivos(directorio):
+        abort(404)
+
+    top = request.args.get("top", type=int)
+    if top and nombre.endswith(EXTENSIONES["cprofile"]):
+        salida = io.StringIO()
+        pstats.Stats(os.path.join(directorio, nombre), stream=salida) \
+            .sort_stats("cumulative").print_stats(top)
+        return salida.getvalue(), 200, {"Content-Type": "text/plain; charset=utf-8"}
+
+    return send_from_directory(directorio, nombre, as_attachment=True)
+
+
+def configurar_perfilador(app):
+    """Registra los hooks y las vistas si PERFILADOR está activo."""
+    if not app.config["PERFILADOR"]:
+        return
+
+    config = app.config
+
+    @app.before_request
+    def _iniciar_perfil():
+        modo = _modo_del_request(config)
+        if modo is not None:
+            _iniciar(modo, config)
+
+    @app.after_request
+    def _guardar_perfil(respuesta):
+        if "perfil" in g:
+            _terminar(respuesta, config)
+        return respuesta
+
+    @app.teardown_request
+    def _descartar_perfil(error):
+        # Si la vista lanzó una excepción sin manejar no pasó por after_request
+        if "perfil" in g:
+            modo, perfil, _ = g.pop("perfil")
+            _detener(modo, perfil)
+
+    app.add_url_rule("/perfiles/", endpoint="perfiles", view_func=listado)
+    app.add_url_rule("/perfiles/<nombre>", endpoint="perfil", view_func=descargar)
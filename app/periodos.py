@@ -0,0 +1,174 @@
+from datetime import date, timedelta
+
+from sqlalchemy import Date, cast, func, literal
+
+from app.models import db
+
+
+# =========================
+# PERIODOS
+# =========================
+# Los reportes filtran siempre con rangos semiabiertos
+# `fecha >= inicio AND fecha < fin`, que los índices (usuario_id, fecha)
+# e (insumo_id, fecha) resuelven como range scans, y agrupan con una
+# expresión que devuelve el primer día del período en cada motor.
+
+PERIODOS = ("dia", "semana", "mes", "trimestre", "anio")
+
+_DATE_TRUNC = {
+    "dia": "day",
+    "semana": "week",
+    "mes": "month",
+    "trimestre": "quarter",
+    "anio": "year",
+}
+
+
+def _validar(periodo):
+    if periodo not in PERIODOS:
+        raise ValueError(f"Período inválido: {periodo!r}")
+
+
+def inicio_periodo(fecha, periodo="mes"):
+    """Primer día del período que contiene a `fecha` (semanas de lunes)."""
+    _validar(periodo)
+
+    if periodo == "dia":
+        return fecha
+    if periodo == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if periodo == "mes":
+        return date(fecha.year, fecha.month, 1)
+    if periodo == "trimestre":
+        return date(fecha.year, (fecha.month - 1) // 3 * 3 + 1, 1)
+    return date(fecha.year, 1, 1)
+
+
+def siguiente_periodo(inicio, periodo="mes"):
+    """Primer día del período que sigue al que empieza en `inicio`."""
+    _validar(periodo)
+
+    if periodo == "dia":
+        return inicio + timedelta(days=1)
+    if periodo == "semana":
+        return inicio + timedelta(days=7)
+    if periodo == "anio":
+        return date(inicio.year + 1, 1, 1)
+
+    meses = 1 if periodo == "mes" else 3
+    indice = inicio.month - 1 + meses
+    return date(inicio.year + indice // 12, indice % 12 + 1, 1)
+
+
+def rango(fecha, periodo="mes"):
+    """(inicio, fin) semiabierto del período que contiene a `fecha`."""
+    inicio = inicio_periodo(fecha, periodo)
+    return inicio, siguiente_periodo(inicio, periodo)
+
+
+def rango_mes(anio, mes):
+    return rango(date(anio, mes, 1), "mes")
+
+
+def meses_hacia_atras(anio, mes, cantidad):
+    """Los `cantidad` meses terminando en (anio, mes), del más reciente al más viejo."""
+    indice = anio * 12 + mes - 1
+    return [
+        ((indice - i) // 12, (indice - i) % 12 + 1)
+        for i in range(cantidad)
+    ]
+
+
+# =========================
+# NOMBRES DE MESES
+# =========================
+# Tabla fija en vez de strftime("%B"): no depende del locale del proceso
+# (setlocale es global y no es seguro entre hilos).
+
+MESES = (
+    "enero", "febrero", "marzo", "abril", "mayo", "junio", "julio",
+    "agosto", "septiembre", "octubre", "noviembre", "diciembre",
+)
+
+
+def nombre_mes(anio, mes, separador=" "):
+    """(2025, 1) -> 'Enero 2025' (o 'Enero de 2025' con separador=' de ')."""
+    return f"{MESES[mes - 1].capitalize()}{separador}{anio}"
+
+
+# =========================
+# CLAVES "MM-YYYY"
+# =========================
+# Formato que usan las URLs y el JS de insumos y tipos de trabajo.
+
+def etiqueta_mes(fecha):
+    return fecha.strftime("%m-%Y")
+
+
+def parsear_mes(texto):
+    """'MM-YYYY' -> (anio, mes). Lanza ValueError si el formato no es válido."""
+    mes, anio = (int(parte) for parte in texto.split("-"))
+    date(anio, mes, 1)
+    return anio, mes
+
+
+# =========================
+# SQL
+# =========================
+def expresion_periodo(columna, periodo="mes", dialecto=None):
+    """
+    Expresión SQL con el primer día del período de `columna`, apta para
+    GROUP BY y ORDER BY. El valor se normaliza con `a_fecha`.
+    """
+    _validar(periodo)
+
+    if dialecto is None:
+        dialecto = db.session.get_bind().dialect.name
+
+    if dialecto == "sqlite":
+        if periodo == "dia":
+            return func.date(columna)
+        if periodo == "semana":
+            return func.date(columna, "weekday 0", "-6 days")
+        if periodo == "mes":
+            return func.date(columna, "start of month")
+        if periodo == "trimestre":
+            meses_atras = (
+                (cast(func.strftime("%m", columna), db.Integer) - 1) % 3
+            )
+            return func.date(
+                columna,
+                "start of month",
+                literal("-") + cast(meses_atras, db.String) + literal(" months")
+            )
+        return func.date(columna, "start of year")
+
+    # Postgres y la mayoría de los motores con date_trunc
+    return cast(func.date_trunc(_DATE_TRUNC[periodo], columna), Date)
+
+
+def a_fecha(valor):
+    """Normaliza el resultado de `expresion_periodo` (str en SQLite) a date."""
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(str(valor)[:10])
+
+
+def rellenar(por_inicio, periodo="mes", desde=None, hasta=None, vacio=None):
+    """
+    Recorre los períodos entre `desde` y `hasta` (por defecto, el primero
+    y el último de `por_inicio`) y devuelve [(inicio, valor)], usando
+    `vacio` para los períodos sin datos.
+    """
+    if not por_inicio and (desde is None or hasta is None):
+        return []
+
+    inicio = inicio_periodo(desde or min(por_inicio), periodo)
+    ultimo = inicio_periodo(hasta or max(por_inicio), periodo)
+
+    resultado = []
+    while inicio <= ultimo:
+        resultado.append((inicio, por_inicio.get(inicio, vacio)))
+        inicio = siguiente_periodo(inicio, periodo)
+
+    return resultado
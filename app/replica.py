@@ -0,0 +1,86 @@
+import time
+from functools import wraps
+
+from flask import current_app, g, has_app_context, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+
+
+# =========================
+# RÉPLICA DE LECTURA
+# =========================
+# Si DATABASE_REPLICA_URL está definida, las vistas marcadas con
+# @solo_lectura leen del bind "replica". Las escrituras (flush) siempre van
+# a la base principal.
+#
+# Leer lo propio: cada commit que escribe algo durante un request guarda
+# la hora en la sesión firmada del usuario, y durante
+# REPLICA_VENTANA_SEGUNDOS sus vistas de solo lectura siguen yendo a la
+# principal, así no ve datos anteriores a su última escritura mientras la
+# réplica se pone al día.
+
+BIND_REPLICA = "replica"
+
+_CLAVE_ESCRITURA = "ultima_escritura"
+
+
+class SesionEnrutada(Session):
+    """Session de Flask-SQLAlchemy que manda las lecturas a la réplica cuando corresponde."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and _leer_de_replica():
+            replica = self._db.engines.get(BIND_REPLICA)
+            if replica is not None:
+                return replica
+
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _leer_de_replica():
+    return has_app_context() and g.get("leer_de_replica", False)
+
+
+def solo_lectura(view):
+    """
+    Marca una vista GET que no escribe para que lea de la réplica, salvo
+    que el usuario haya escrito hace menos de REPLICA_VENTANA_SEGUNDOS.
+    Va debajo de @login_required y antes de @condicional/@cache.cacheado,
+    así la versión de datos del ETag sale de la misma base que la vista.
+    """
+    @wraps(view)
+    def envoltura(*args, **kwargs):
+        g.leer_de_replica = not escribio_hace_poco()
+        return view(*args, **kwargs)
+
+    return envoltura
+
+
+def escribio_hace_poco():
+    ultima = session.get(_CLAVE_ESCRITURA)
+    if ultima is None:
+        return False
+    return time.time() - ultima < current_app.config["REPLICA_VENTANA_SEGUNDOS"]
+
+
+@event.listens_for(SesionEnrutada, "after_flush")
+def _marcar_escritura(db_session, flush_context):
+    if db_session.new or db_session.dirty or db_session.deleted:
+        db_session.info["escribio"] = True
+
+
+@event.listens_for(SesionEnrutada, "do_orm_execute")
+def _marcar_dml(estado):
+    # INSERT/UPDATE/DELETE ejecutados sin pasar por el flush (importación)
+    if estado.is_insert or estado.is_update or estado.is_delete:
+        estado.session.info["escribio"] = True
+
+
+@event.listens_for(SesionEnrutada, "after_commit")
+def _recordar_escritura(db_session):
+    if db_session.info.pop("escribio", False) and has_request_context():
+        session[_CLAVE_ESCRITURA] = time.time()
+
+
+@event.listens_for(SesionEnrutada, "after_rollback")
+def _olvidar_escritura(db_session):
+    db_session.info.pop("escribio", None)
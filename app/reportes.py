@@ -0,0 +1,195 @@
+from sqlalchemy import case, extract, func
+
+from app.models import db, Insumo, ResumenMensual, TipoTrabajo, movimientos_unificados
+from app.periodos import nombre_mes
+
+
+# =========================
+# REPORTES PESADOS
+# =========================
+# Reportes sobre todo el historial de un usuario que pueden tardar más que
+# el timeout de gunicorn. No se calculan en el request: se encolan con
+# POST /jobs/ y los calcula app.tareas en segundo plano. Cada uno recibe
+# el usuario y sus parámetros ya validados y devuelve algo serializable a
+# JSON.
+
+
+def _redondear(fila, campos=("ingresos", "gastos", "neto", "horas")):
+    for campo in campos:
+        fila[campo] = round(fila[campo], 2)
+    fila["valor_hora"] = round(fila["neto"] / fila["horas"], 2) if fila["horas"] > 0 else 0
+    return fila
+
+
+def _rango_anios(columna, desde, hasta):
+    filtros = []
+    if desde is not None:
+        filtros.append(columna >= desde)
+    if hasta is not None:
+        filtros.append(columna <= hasta)
+    return filtros
+
+
+# ===========================
+# RESUMEN ANUAL CON MESES
+# ===========================
+def resumen_anual(usuario_id, desde=None, hasta=None):
+    """
+    Lo mismo que /movimientos/resumen-anual, pero con horas, valor hora y
+    el detalle de cada mes de cada año.
+    """
+    filas = (
+        db.session.query(ResumenMensual)
+        .filter(
+            ResumenMensual.usuario_id == usuario_id,
+            ResumenMensual.cantidad > 0,
+            *_rango_anios(ResumenMensual.anio, desde, hasta)
+        )
+        .order_by(ResumenMensual.anio, ResumenMensual.mes)
+        .all()
+    )
+
+    anios = {}
+
+    for fila in filas:
+        anio = anios.get(fila.anio)
+        if anio is None:
+            anio = anios[fila.anio] = {
+                "anio": fila.anio,
+                "ingresos": 0.0, "gastos": 0.0, "neto": 0.0, "horas": 0.0,
+                "cantidad": 0,
+                "meses": []
+            }
+
+        anio["ingresos"] += fila.ingresos
+        anio["gastos"] += fila.gastos
+        anio["neto"] += fila.neto
+        anio["horas"] += fila.horas
+        anio["cantidad"] += fila.cantidad
+
+        anio["meses"].append(_redondear({
+            "mes": fila.mes,
+            "nombre": nombre_mes(fila.anio, fila.mes),
+            "ingresos": fila.ingresos,
+            "gastos": fila.gastos,
+            "neto": fila.neto,
+            "horas": fila.horas,
+            "cantidad": fila.cantidad
+        }))
+
+    return [_redondear(anio) for anio in anios.values()]
+
+
+# ===========================
+# DESGLOSE POR TIPO E INSUMO
+# ===========================
+def desglose_historial(usuario_id, desde=None, hasta=None):
+    """Todo el historial por tipo de trabajo y por insumo, con el detalle de cada año."""
+    mov = movimientos_unificados(usuario_id=usuario_id)
+    anio = extract("year", mov.c.fecha).label("anio")
+    rango = _rango_anios(anio, desde, hasta)
+
+    por_tipo = (
+        db.session.query(
+            mov.c.tipo_id,
+            anio,
+            func.sum(case((mov.c.movimiento == 'pago', mov.c.monto), else_=0)).label("ingresos"),
+            func.sum(case((mov.c.movimiento == 'gasto', mov.c.monto), else_=0)).label("gastos"),
+            func.sum(mov.c.tiempo).label("horas"),
+            func.count().label("cantidad")
+        )
+        .filter(mov.c.fecha.isnot(None), *rango)
+        .group_by(mov.c.tipo_id, anio)
+        .order_by(mov.c.tipo_id, anio)
+    )
+
+    por_insumo = (
+        db.session.query(
+            mov.c.insumo_id,
+            anio,
+            func.sum(mov.c.monto).label("gastos"),
+            func.sum(mov.c.tiempo).label("horas"),
+            func.count().label("cantidad")
+        )
+        .filter(mov.c.movimiento == 'gasto', mov.c.fecha.isnot(None), *rango)
+        .group_by(mov.c.insumo_id, anio)
+        .order_by(mov.c.insumo_id, anio)
+    )
+
+    nombres_tipo = dict(
+        db.session.query(TipoTrabajo.id, TipoTrabajo.nombre)
+        .filter(TipoTrabajo.usuario_id == usuario_id)
+    )
+    nombres_insumo = dict(
+        db.session.query(Insumo.id, Insumo.nombre)
+        .filter(Insumo.usuario_id == usuario_id)
+    )
+
+    tipos = {}
+    for row in por_tipo:
+        fila = {
+            "ingresos": float(row.ingresos or 0),
+            "gastos": float(row.gastos or 0),
+            "horas": float(row.horas or 0),
+            "cantidad": row.cantidad
+        }
+        fila["neto"] = fila["ingresos"] - fila["gastos"]
+
+        tipo = tipos.get(row.tipo_id)
+        if tipo is None:
+            tipo = tipos[row.tipo_id] = {
+                "tipo_id": row.tipo_id,
+                "tipo": nombres_tipo.get(row.tipo_id, "Sin tipo"),
+                "ingresos": 0.0, "gastos": 0.0, "neto": 0.0, "horas": 0.0,
+                "cantidad": 0,
+                "anios": []
+            }
+
+        for campo in ("ingresos", "gastos", "neto", "horas", "cantidad"):
+            tipo[campo] += fila[campo]
+        tipo["anios"].append(_redondear(dict(fila, anio=int(row.anio))))
+
+    insumos = {}
+    for row in por_insumo:
+        fila = {
+            "gastos": float(row.gastos or 0),
+            "horas": float(row.horas or 0),
+            "cantidad": row.cantidad
+        }
+
+        insumo = insumos.get(row.insumo_id)
+        if insumo is None:
+            insumo = insumos[row.insumo_id] = {
+                "insumo_id": row.insumo_id,
+                "insumo": nombres_insumo.get(row.insumo_id),
+                "gastos": 0.0, "horas": 0.0, "cantidad": 0,
+                "anios": []
+            }
+
+        for campo in ("gastos", "horas", "cantidad"):
+            insumo[campo] += fila[campo]
+        insumo["anios"].append(dict(
+            fila,
+            anio=int(row.anio),
+            gastos=round(fila["gastos"], 2),
+            horas=round(fila["horas"], 2)
+        ))
+
+    for insumo in insumos.values():
+        insumo["gastos"] = round(insumo["gastos"], 2)
+        insumo["horas"] = round(insumo["horas"], 2)
+
+    return {
+        "tipos": sorted(
+            (_redondear(tipo) for tipo in tipos.values()),
+            key=lambda t: -t["neto"]
+        ),
+        "insumos": sorted(insumos.values(), key=lambda i: -i["gastos"])
+    }
+
+
+# Nombre -> (función, parámetros aceptados y su tipo)
+REPORTES = {
+    "resumen_anual": (resumen_anual, {"desde": int, "hasta": int}),
+    "desglose_historial": (desglose_historial, {"desde": int, "hasta": int}),
+}
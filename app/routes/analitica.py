@@ -0,0 +1,111 @@
+from flask import Blueprint, request, jsonify
+from flask_login import login_required, current_user
+from app.extensions import cache
+from app.cache import condicional
+from app.replica import solo_lectura
+from app.models import db, Insumo, TipoTrabajo
+
+analitica = Blueprint(
+    'analitica',
+    __name__,
+    url_prefix='/analitica'
+)
+
+MAX_VENTANA = 24
+MAX_INTERVALOS = 50
+
+
+def _libro():
+    # NumPy se importa con el primer reporte, no al arrancar la app
+    from app.analitica import libro_de
+    return libro_de(current_user.id)
+
+
+def _nombres(modelo):
+    return dict(
+        db.session.query(modelo.id, modelo.nombre)
+        .filter(modelo.usuario_id == current_user.id)
+        .all()
+    )
+
+
+def _entero_param(nombre, defecto, maximo):
+    try:
+        valor = int(request.args.get(nombre, defecto))
+    except ValueError:
+        valor = defecto
+    return min(max(valor, 1), maximo)
+
+
+# ===========================
+# TOTALES POR MES
+# ===========================
+@analitica.route('/mensual')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def mensual():
+    return jsonify(_libro().totales_mensuales())
+
+
+# ===========================
+# POR TIPO DE TRABAJO
+# ===========================
+@analitica.route('/tipos')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def por_tipo():
+    nombres = _nombres(TipoTrabajo)
+
+    resultado = _libro().por_tipo()
+    for fila in resultado:
+        fila["tipo"] = nombres.get(fila["tipo_id"], "Sin tipo")
+
+    return jsonify(resultado)
+
+
+# ===========================
+# POR INSUMO
+# ===========================
+@analitica.route('/insumos')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def por_insumo():
+    nombres = _nombres(Insumo)
+
+    resultado = _libro().por_insumo()
+    for fila in resultado:
+        fila["insumo"] = nombres.get(fila["insumo_id"])
+
+    return jsonify(resultado)
+
+
+# ===========================
+# VALOR HORA
+# ===========================
+@analitica.route('/valor-hora')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def valor_hora():
+    intervalos = _entero_param('intervalos', 10, MAX_INTERVALOS)
+    return jsonify(_libro().distribucion_valor_hora(intervalos))
+
+
+# ===========================
+# PROMEDIO MÓVIL
+# ===========================
+@analitica.route('/promedio-movil')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def promedio_movil():
+    ventana = _entero_param('ventana', 3, MAX_VENTANA)
+    return jsonify(_libro().promedio_movil(ventana))
@@ -1,12 +1,44 @@
-from flask import Blueprint, redirect, render_template, url_for
+import threading
+
+from flask import Blueprint, current_app, redirect, render_template, session, url_for
 from flask_login import login_user
 from app.models import Usuario, db
-from app.extensions import oauth
 
 
 auth = Blueprint("auth", __name__, url_prefix="/auth")
 
 
+# ===== GOOGLE OAUTH =====
+_lock_oauth = threading.Lock()
+
+
+def google():
+    """
+    Cliente OAuth de Google. Authlib se importa y se registra en el primer
+    login, no al crear la app.
+    """
+    cliente = current_app.extensions.get("google_oauth")
+    if cliente is not None:
+        return cliente
+
+    with _lock_oauth:
+        if "google_oauth" not in current_app.extensions:
+            from authlib.integrations.flask_client import OAuth
+
+            oauth = OAuth(current_app._get_current_object())
+            current_app.extensions["google_oauth"] = oauth.register(
+                name="google",
+                client_id=current_app.config["GOOGLE_CLIENT_ID"],
+                client_secret=current_app.config["GOOGLE_CLIENT_SECRET"],
+                server_metadata_url="https://accounts.google.com/.well-known/openid-configuration",
+                client_kwargs={
+                    "scope": "openid email profile"
+                }
+            )
+
+    return current_app.extensions["google_oauth"]
+
+
 @auth.route("/login")
 def login():
     return render_template("login.html")
@@ -15,13 +47,13 @@ def login():
 @auth.route("/login/google")
 def login_google():
     redirect_uri = url_for("auth.google_callback", _external=True)
-    return oauth.google.authorize_redirect(redirect_uri)
+    return google().authorize_redirect(redirect_uri)
 
 
 
 @auth.route("/login/google/callback")
 def google_callback():
-    token = oauth.google.authorize_access_token()
+    token = google().authorize_access_token()
     user_info = token["userinfo"]
 
     email = user_info["email"]
@@ -43,6 +75,9 @@ def google_callback():
     db.session.commit()
     login_user(usuario)
 
+    # Nombre y foto actualizados para el user_loader
+    session["identidad"] = usuario.identidad()
+
     return redirect(url_for("main.index"))
 
 
@@ -52,4 +87,5 @@ from flask_login import logout_user, login_required
 @login_required
 def logout():
     logout_user()
+    session.pop("identidad", None)
     return redirect(url_for("auth.login"))
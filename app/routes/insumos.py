@@ -1,5 +1,8 @@
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
+from app.extensions import cache
+from app.cache import condicional
+from app.replica import solo_lectura
 from app.models import GastoTrabajo, TipoTrabajo, Trabajo, db, Insumo
 
 insumos = Blueprint(
@@ -11,6 +14,7 @@ insumos = Blueprint(
 
 @insumos.route('/')
 @login_required
+@condicional
 def index():
     insumos = (
         Insumo.query
@@ -102,15 +106,27 @@ def eliminar(insumo_id):
 
 
 
-from sqlalchemy import func, extract
-from datetime import datetime
+from sqlalchemy import func
+from app.periodos import (
+    a_fecha,
+    etiqueta_mes,
+    expresion_periodo,
+    parsear_mes,
+    rango_mes,
+    rellenar
+)
 
 @insumos.route('/<int:insumo_id>/resumen')
 @login_required
+@solo_lectura
+@condicional
+@cache.cacheado
 def resumen_por_mes(insumo_id):
+    mes = expresion_periodo(GastoTrabajo.fecha, "mes").label('mes')
+
     rows = (
         db.session.query(
-            func.strftime('%m-%Y', GastoTrabajo.fecha).label('mes'),
+            mes,
             func.sum(GastoTrabajo.monto).label('total'),
             func.sum(GastoTrabajo.tiempo).label('tiempo')
         )
@@ -118,43 +134,57 @@ def resumen_por_mes(insumo_id):
             GastoTrabajo.insumo_id == insumo_id,
             GastoTrabajo.usuario_id == current_user.id
         )
-        .group_by('mes')
-        .order_by('mes')
+        .group_by(mes)
         .all()
     )
 
+    por_mes = {a_fecha(r.mes): r for r in rows}
+
+    # Meses sin gastos entre el primero y el último aparecen en cero
     return jsonify([
         {
-            "mes": r.mes,
-            "total": int(r.total or 0),
-            "tiempo": float(r.tiempo or 0)
+            "mes": etiqueta_mes(inicio),
+            "total": int(r.total or 0) if r else 0,
+            "tiempo": float(r.tiempo or 0) if r else 0.0
         }
-        for r in rows
+        for inicio, r in rellenar(por_mes, "mes")
     ])
 
 
 
 @insumos.route('/<int:insumo_id>/detalle/<mes>')
 @login_required
+@solo_lectura
+@condicional
+@cache.cacheado
 def detalle_mes(insumo_id, mes):
-    mes_num, anio = mes.split("-")
+    try:
+        desde, hasta = rango_mes(*parsear_mes(mes))
+    except ValueError:
+        return jsonify({'error': 'Mes inválido, se espera MM-YYYY'}), 400
 
     gastos = (
-        GastoTrabajo.query
-        .join(Trabajo)
+        db.session.query(
+            GastoTrabajo.fecha,
+            GastoTrabajo.tiempo,
+            GastoTrabajo.monto,
+            Trabajo.nombre.label('trabajo')
+        )
+        .join(Trabajo, GastoTrabajo.trabajo_id == Trabajo.id)
         .filter(
             GastoTrabajo.insumo_id == insumo_id,
             GastoTrabajo.usuario_id == current_user.id,
-            extract('month', GastoTrabajo.fecha) == int(mes_num),
-            extract('year', GastoTrabajo.fecha) == int(anio)
+            GastoTrabajo.fecha >= desde,
+            GastoTrabajo.fecha < hasta
         )
+        .order_by(GastoTrabajo.fecha)
         .all()
     )
 
     return jsonify([
         {
             "fecha": g.fecha.strftime("%d/%m"),
-            "trabajo": g.trabajo.nombre,
+            "trabajo": g.trabajo,
             "tiempo": float(g.tiempo),
             "monto": int(g.monto)
         }
@@ -1,80 +1,176 @@
-from datetime import datetime
-from flask import Blueprint, render_template
+from datetime import date
+from flask import Blueprint, current_app, jsonify, render_template, request
 from flask_login import current_user, login_required
-from app.models import db, Pago, GastoTrabajo
-from sqlalchemy import extract
+from app.extensions import cache
+from app.cache import condicional
+from app.replica import solo_lectura
+from app.base_datos import estadisticas_pools
+from app.metricas import autorizar as autorizar_metricas
+from app.models import (
+    db,
+    Pago,
+    GastoTrabajo,
+    ResumenMensual,
+    Trabajo,
+    Insumo,
+    movimientos_unificados
+)
+from app.periodos import nombre_mes, rango_mes
+from sqlalchemy import and_, or_
 from collections import defaultdict
 
 main = Blueprint('main', __name__)
 
-@main.route('/')
-@login_required
-def index():
-    pagos = (
-        Pago.query
-        .filter_by(usuario_id=current_user.id)
-        .order_by(Pago.fecha.desc())
-        .all()
-    )
 
+def meses_del_dashboard(usuario_id, antes=None):
+    """
+    Devuelve (meses, siguiente): los N meses con movimientos anteriores a
+    `antes` (año, mes), ya armados para el template, y la clave "YYYY-MM"
+    para pedir la página siguiente (None si no hay más).
+    """
+    limite = current_app.config["DASHBOARD_MESES_POR_PAGINA"]
 
-    gastos = (
-        GastoTrabajo.query
-        .join(GastoTrabajo.trabajo)
-        .filter_by(usuario_id=current_user.id)
-        .order_by(GastoTrabajo.id.desc())
+    query = ResumenMensual.query.filter(
+        ResumenMensual.usuario_id == usuario_id,
+        ResumenMensual.cantidad > 0
+    )
+
+    if antes is not None:
+        anio, mes = antes
+        query = query.filter(or_(
+            ResumenMensual.anio < anio,
+            and_(ResumenMensual.anio == anio, ResumenMensual.mes < mes)
+        ))
+
+    resumenes = (
+        query
+        .order_by(ResumenMensual.anio.desc(), ResumenMensual.mes.desc())
+        .limit(limite + 1)
         .all()
     )
 
+    hay_mas = len(resumenes) > limite
+    resumenes = resumenes[:limite]
 
-    resumen = defaultdict(lambda: {
-        "pagos": [],
-        "gastos": [],
-        "total_ingresos": 0,
-        "total_gastos": 0
-    })
+    if not resumenes:
+        return [], None
 
-    for p in pagos:
-        key = p.fecha.strftime("%Y-%m")
-        resumen[key]["pagos"].append(p)
-        resumen[key]["total_ingresos"] += p.monto
+    # Rango de fechas que cubren los meses de la página: [desde, hasta)
+    desde, _ = rango_mes(resumenes[-1].anio, resumenes[-1].mes)
+    _, hasta = rango_mes(resumenes[0].anio, resumenes[0].mes)
 
-    for g in gastos:
-        key = g.fecha.strftime("%Y-%m")
-        resumen[key]["gastos"].append(g)
-        resumen[key]["total_gastos"] += g.monto
+    # Pagos y gastos de la página en una sola consulta, ya ordenados
+    mov = movimientos_unificados(usuario_id=usuario_id, desde=desde, hasta=hasta)
 
-    resumen_ordenado = dict(
-        sorted(resumen.items(), reverse=True)
+    filas = (
+        db.session.query(
+            mov.c.id,
+            mov.c.movimiento,
+            mov.c.fecha,
+            mov.c.monto,
+            Trabajo.nombre.label("trabajo"),
+            Trabajo.fecha.label("fecha_trabajo"),
+            Insumo.nombre.label("insumo")
+        )
+        .join(Trabajo, mov.c.trabajo_id == Trabajo.id)
+        .outerjoin(Insumo, mov.c.insumo_id == Insumo.id)
+        .order_by(mov.c.fecha.desc(), mov.c.id.desc())
+        .all()
     )
 
+    movimientos_por_mes = defaultdict(lambda: {"pagos": [], "gastos": []})
+
+    for f in filas:
+        mes = movimientos_por_mes[(f.fecha.year, f.fecha.month)]
 
+        if f.movimiento == "pago":
+            mes["pagos"].append({
+                "id": f.id,
+                "fecha": f.fecha.strftime("%d/%m"),
+                "trabajo": f.trabajo,
+                "monto": f.monto
+            })
+        else:
+            mes["gastos"].append({
+                "id": f.id,
+                "fecha": f.fecha_trabajo.strftime("%d/%m") if f.fecha_trabajo else "",
+                "insumo": f.insumo,
+                "monto": f.monto
+            })
 
-    resumen_final = []
+    meses = []
 
-    for key, data in resumen_ordenado.items():
-        year, month = key.split("-")
-        fecha = datetime(int(year), int(month), 1)
+    for r in resumenes:
+        movimientos_mes = movimientos_por_mes[(r.anio, r.mes)]
 
-        resumen_final.append({
-            "label": fecha.strftime("%B %Y").capitalize(),  # "Enero 2025"
-            "pagos": data["pagos"],
-            "gastos": data["gastos"],
-            "total_ingresos": data["total_ingresos"],
-            "total_gastos": data["total_gastos"],
-            "neto": data["total_ingresos"] - data["total_gastos"]
-         })
+        meses.append({
+            "clave": f"{r.anio:04d}-{r.mes:02d}",
+            "label": nombre_mes(r.anio, r.mes),  # "Enero 2025"
+            "pagos": movimientos_mes["pagos"],
+            "gastos": movimientos_mes["gastos"],
+            "total_ingresos": r.ingresos,
+            "total_gastos": r.gastos,
+            "neto": r.neto
+        })
 
+    siguiente = meses[-1]["clave"] if hay_mas else None
+
+    return meses, siguiente
+
+
+@main.route('/')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def index():
+    # Solo los meses más recientes; el resto se pide a main.meses al scrollear
+    meses, siguiente = meses_del_dashboard(current_user.id)
 
     return render_template(
         "index.html",
-        meses=resumen_final
+        meses=meses,
+        siguiente=siguiente
     )
 
 
+@main.route('/meses')
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def meses():
+    antes = request.args.get("before")
+
+    try:
+        anio, mes = (int(parte) for parte in antes.split("-"))
+        date(anio, mes, 1)
+    except (AttributeError, ValueError):
+        return jsonify(error="Parámetro before inválido, se espera YYYY-MM"), 400
+
+    meses, siguiente = meses_del_dashboard(current_user.id, antes=(anio, mes))
+
+    return jsonify(meses=meses, siguiente=siguiente)
+
+
+
+
+
+@main.route('/cache/estadisticas')
+def estadisticas_cache():
+    # Contadores del proceso que atiende el request. Son de toda la app,
+    # no del usuario: solo con el token de /metrics
+    autorizar_metricas()
+    return jsonify(cache.estadisticas())
+
+
+@main.route('/db/estadisticas')
+def estadisticas_db():
+    # Espera y uso del pool de conexiones de este proceso; igual que la
+    # caché, solo con el token de /metrics
+    autorizar_metricas()
+    return jsonify(estadisticas_pools())
 
-from flask import Blueprint, jsonify
-from app.models import db, Pago, GastoTrabajo
 
 
 @main.route("/eliminar/pago/<int:id>", methods=["DELETE"])
@@ -1,13 +1,23 @@
-from flask import Blueprint, jsonify, render_template, request, redirect, url_for
+from flask import (
+    Blueprint, Response, current_app, jsonify, render_template, request, redirect,
+    stream_with_context, url_for
+)
 from flask_login import login_required, current_user
+from app.extensions import cache
+from app import busqueda, exportacion
+from app.importacion import FORMATOS, detectar_formato, importar_archivo
+from app.cache import condicional
+from app.replica import solo_lectura
 from datetime import date, datetime
+from sqlalchemy.exc import DataError, IntegrityError
 from app.models import (
     TipoTrabajo,
     db,
     Trabajo,
     Pago,
     GastoTrabajo,
-    Insumo
+    Insumo,
+    ResumenMensual
 )
 
 movimientos = Blueprint(
@@ -23,36 +33,41 @@ movimientos = Blueprint(
 @movimientos.route("/nuevo")
 @login_required
 def nuevo():
-    trabajos = (
-        Trabajo.query
-        .filter_by(usuario_id=current_user.id)
-        .order_by(Trabajo.fecha.desc())
-        .all()
-    )
-
-    insumos = (
-        Insumo.query
-        .filter_by(usuario_id=current_user.id)
-        .order_by(Insumo.nombre)
-        .all()
-    )
-
-    tipos_trabajo = (
-        TipoTrabajo.query
-        .filter_by(usuario_id=current_user.id)
-        .order_by(TipoTrabajo.nombre)
-        .all()
-    )
+    # Solo los más usados últimamente; el resto se busca mientras se
+    # escribe (ver buscar)
+    recientes = current_app.config["FORMULARIO_RECIENTES"]
 
     return render_template(
         "nuevo_movimiento.html",
-        trabajos=trabajos,
-        insumos=insumos,
-        tipos_trabajo=tipos_trabajo,
+        trabajos=busqueda.recientes("trabajos", current_user.id, recientes),
+        insumos=busqueda.recientes("insumos", current_user.id, recientes),
+        tipos_trabajo=busqueda.recientes("tipos", current_user.id, recientes),
         hoy=date.today().isoformat()
     )
 
 
+# ===========================
+# BUSCAR (FORMULARIO)
+# ===========================
+MAX_RESULTADOS_BUSQUEDA = 25
+
+
+@movimientos.route("/buscar/<entidad>")
+@login_required
+@solo_lectura
+def buscar(entidad):
+    """Trabajos, insumos o tipos que empiezan con ?q=, los más usados primero."""
+    if entidad not in busqueda.ENTIDADES:
+        return jsonify(error="Se espera trabajos, insumos o tipos"), 404
+
+    limite = request.args.get("limite", 10, type=int)
+    limite = min(max(limite, 1), MAX_RESULTADOS_BUSQUEDA)
+
+    return jsonify(
+        busqueda.buscar(entidad, current_user.id, request.args.get("q", ""), limite)
+    )
+
+
 # ===========================
 # GUARDAR MOVIMIENTO
 # ===========================
@@ -172,60 +187,398 @@ def guardar():
 
 
 # ===========================
-# RESUMEN ANUAL
+# GUARDAR VARIOS MOVIMIENTOS
 # ===========================
-@movimientos.route("/resumen-anual")
+# Mismo formato y semántica que /guardar, pero con una lista. Los
+# trabajos, tipos e insumos referenciados se resuelven con una consulta IN
+# por entidad, un mismo nombre nuevo dentro del lote crea una sola
+# entidad (o reusa la existente, salvo trabajos: los nombres son únicos
+# por usuario) y todo se inserta con un único commit. Los movimientos
+# inválidos se informan en su posición y no impiden guardar el resto; si
+# la base rechaza el lote (p. ej. otro request creó el mismo nombre en el
+# medio), no se guarda ninguno y se contesta 409.
+
+MAX_MOVIMIENTOS_LOTE = 1000
+
+
+class MovimientoInvalido(Exception):
+    def __init__(self, mensaje, status=400):
+        super().__init__(mensaje)
+        self.status = status
+
+
+@movimientos.route("/guardar-lote", methods=["POST"])
 @login_required
-def resumen_anual():
-    # ---------------------------
-    # INGRESOS POR AÑO
-    # ---------------------------
-    ingresos_por_anio = (
-        db.session.query(
-            db.extract("year", Pago.fecha).label("anio"),
-            db.func.sum(Pago.monto).label("ingreso_bruto")
-        )
-        .filter(Pago.usuario_id == current_user.id)
-        .group_by("anio")
-        .all()
+def guardar_lote():
+    data = request.get_json(silent=True)
+
+    if isinstance(data, dict):
+        data = data.get("movimientos")
+
+    if not isinstance(data, list) or not data:
+        return jsonify(error="Se espera una lista de movimientos"), 400
+
+    if len(data) > MAX_MOVIMIENTOS_LOTE:
+        return jsonify(
+            error=f"Máximo {MAX_MOVIMIENTOS_LOTE} movimientos por lote"
+        ), 413
+
+    referencias = _cargar_referencias(data)
+
+    resultados = []
+    guardados = []
+
+    for indice, item in enumerate(data):
+        try:
+            movimiento = _armar_movimiento(item, referencias)
+        except MovimientoInvalido as e:
+            resultados.append({
+                "indice": indice,
+                "ok": False,
+                "status": e.status,
+                "error": str(e)
+            })
+            continue
+
+        resultado = {
+            "indice": indice,
+            "ok": True,
+            "tipo": "ingreso" if isinstance(movimiento, Pago) else "gasto"
+        }
+        resultados.append(resultado)
+        guardados.append((resultado, movimiento))
+
+    if guardados:
+        try:
+            db.session.add_all(movimiento for _, movimiento in guardados)
+            db.session.flush()
+
+            # Los ids se leen antes del commit para no recargar cada objeto
+            for resultado, movimiento in guardados:
+                resultado["id"] = movimiento.id
+                resultado["trabajo_id"] = movimiento.trabajo.id
+
+            db.session.commit()
+        except (IntegrityError, DataError) as e:
+            db.session.rollback()
+            current_app.logger.warning("Lote rechazado por la base: %s", e.orig)
+
+            if isinstance(e, IntegrityError):
+                motivo, status = "otro cambio entró en conflicto con el lote, volver a enviarlo", 409
+            else:
+                motivo, status = "hay valores que la base no acepta", 400
+
+            return jsonify(
+                error=f"No se guardó ningún movimiento: {motivo}",
+                guardados=0
+            ), status
+
+    return jsonify(
+        guardados=len(guardados),
+        con_error=len(resultados) - len(guardados),
+        resultados=resultados
     )
 
-    ingresos_dict = {
-        int(row.anio): row.ingreso_bruto or 0
-        for row in ingresos_por_anio
+
+def _id_o_none(valor):
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
+
+
+def _cargar_referencias(data):
+    """Trae en pocas consultas todo lo que referencia el lote."""
+    trabajo_ids = set()
+    tipo_ids = set()
+    insumo_ids = set()
+    trabajos_nuevos = set()
+    tipos_nuevos = set()
+    insumos_nuevos = set()
+
+    for item in data:
+        if not isinstance(item, dict):
+            continue
+
+        if item.get("trabajo_id") == "nuevo":
+            if item.get("nuevo_trabajo"):
+                trabajos_nuevos.add(item["nuevo_trabajo"])
+            if item.get("tipo_trabajo_id") != "nuevo":
+                tipo_ids.add(_id_o_none(item.get("tipo_trabajo_id")))
+            elif item.get("nuevo_tipo_trabajo"):
+                tipos_nuevos.add(item["nuevo_tipo_trabajo"])
+        else:
+            trabajo_ids.add(_id_o_none(item.get("trabajo_id")))
+
+        if item.get("tipo") != "ingreso":
+            if item.get("insumo_id") == "nuevo":
+                if item.get("nuevo_insumo"):
+                    insumos_nuevos.add(item["nuevo_insumo"])
+            else:
+                insumo_ids.add(_id_o_none(item.get("insumo_id")))
+
+    def por_id(modelo, ids):
+        ids.discard(None)
+        if not ids:
+            return {}
+        return {
+            obj.id: obj
+            for obj in modelo.query.filter(
+                modelo.id.in_(ids),
+                modelo.usuario_id == current_user.id
+            )
+        }
+
+    def por_nombre(modelo, nombres):
+        if not nombres:
+            return {}
+        return {
+            obj.nombre: obj
+            for obj in modelo.query.filter(
+                modelo.nombre.in_(nombres),
+                modelo.usuario_id == current_user.id
+            )
+        }
+
+    # evitar duplicados: si ya existe un tipo o insumo con ese nombre, se usa
+    return {
+        "trabajos": por_id(Trabajo, trabajo_ids),
+        "tipos": por_id(TipoTrabajo, tipo_ids),
+        "insumos": por_id(Insumo, insumo_ids),
+        "trabajos_existentes": set(por_nombre(Trabajo, trabajos_nuevos)),
+        "tipos_por_nombre": por_nombre(TipoTrabajo, tipos_nuevos),
+        "insumos_por_nombre": por_nombre(Insumo, insumos_nuevos),
+        "trabajos_nuevos": {}
     }
 
-    # ---------------------------
-    # GASTOS POR AÑO
-    # ---------------------------
-    gastos_por_anio = (
-        db.session.query(
-            db.extract("year", GastoTrabajo.fecha).label("anio"),
-            db.func.sum(GastoTrabajo.monto).label("gastos")
+
+def _fecha_item(item, campo):
+    try:
+        return datetime.strptime(item[campo], "%Y-%m-%d").date()
+    except (KeyError, TypeError, ValueError):
+        raise MovimientoInvalido(f"{campo} inválida, se espera YYYY-MM-DD")
+
+
+def _numero_item(item, campo, requerido=False):
+    # 0 es un monto válido: falta solo si no vino o vino vacío
+    if campo not in item or item[campo] in (None, ""):
+        if requerido:
+            raise MovimientoInvalido(f"{campo} requerido")
+        return 0
+    try:
+        return float(item[campo])
+    except (TypeError, ValueError):
+        raise MovimientoInvalido(f"{campo} no es un número")
+
+
+def _armar_movimiento(item, referencias):
+    """
+    Valida un movimiento y devuelve el Pago o GastoTrabajo sin agregarlo
+    a la sesión. Las entidades nuevas se crean solo si el movimiento es
+    válido y se guardan en cascada con él.
+    """
+    if not isinstance(item, dict):
+        raise MovimientoInvalido("El movimiento debe ser un objeto")
+
+    if not item.get("tipo"):
+        raise MovimientoInvalido("Tipo de movimiento requerido")
+
+    es_ingreso = item["tipo"] == "ingreso"
+    fecha_mov = _fecha_item(item, "fecha")
+
+    if es_ingreso:
+        monto = _numero_item(item, "monto", requerido=True)
+    else:
+        monto = _numero_item(item, "monto")
+        tiempo = _numero_item(item, "tiempo")
+
+    # ================= VALIDAR REFERENCIAS =================
+    if item.get("trabajo_id") == "nuevo":
+        if not item.get("nuevo_trabajo"):
+            raise MovimientoInvalido("Nombre de trabajo requerido")
+        if item["nuevo_trabajo"] in referencias["trabajos_existentes"]:
+            raise MovimientoInvalido("Ya existe un trabajo con ese nombre", 409)
+        fecha_trabajo = _fecha_item(item, "fecha_trabajo")
+    else:
+        trabajo = referencias["trabajos"].get(_id_o_none(item.get("trabajo_id")))
+        if trabajo is None:
+            raise MovimientoInvalido("Trabajo no encontrado", 404)
+
+    if not es_ingreso:
+        if item.get("insumo_id") == "nuevo":
+            if not item.get("nuevo_insumo"):
+                raise MovimientoInvalido("Nombre de insumo requerido")
+        elif _id_o_none(item.get("insumo_id")) not in referencias["insumos"]:
+            raise MovimientoInvalido("Insumo no encontrado", 404)
+
+    # ================= TRABAJO =================
+    if item.get("trabajo_id") == "nuevo":
+        trabajo = referencias["trabajos_nuevos"].get(item["nuevo_trabajo"])
+
+        if trabajo is None:
+            trabajo = Trabajo(
+                nombre=item["nuevo_trabajo"],
+                fecha=fecha_trabajo,
+                tipo=_tipo_de_trabajo(item, referencias),
+                usuario_id=current_user.id
+            )
+            referencias["trabajos_nuevos"][trabajo.nombre] = trabajo
+
+    # ================= INGRESO =================
+    if es_ingreso:
+        return Pago(
+            fecha=fecha_mov,
+            monto=monto,
+            trabajo=trabajo,
+            usuario_id=current_user.id
         )
-        .filter(GastoTrabajo.usuario_id == current_user.id)
-        .group_by("anio")
-        .all()
+
+    # ================= GASTO =================
+    if item.get("insumo_id") == "nuevo":
+        insumo = referencias["insumos_por_nombre"].get(item["nuevo_insumo"])
+
+        if insumo is None:
+            insumo = Insumo(
+                nombre=item["nuevo_insumo"],
+                usuario_id=current_user.id
+            )
+            referencias["insumos_por_nombre"][insumo.nombre] = insumo
+    else:
+        insumo = referencias["insumos"][int(item["insumo_id"])]
+
+    return GastoTrabajo(
+        fecha=fecha_mov,
+        monto=monto,
+        tiempo=tiempo,
+        trabajo=trabajo,
+        insumo=insumo,
+        usuario_id=current_user.id
     )
 
-    gastos_dict = {
-        int(row.anio): row.gastos or 0
-        for row in gastos_por_anio
-    }
 
+def _tipo_de_trabajo(item, referencias):
+    # eligió crear tipo nuevo
+    if item.get("tipo_trabajo_id") == "nuevo":
+        nombre = item.get("nuevo_tipo_trabajo")
+        if not nombre:
+            return None
+
+        if nombre not in referencias["tipos_por_nombre"]:
+            referencias["tipos_por_nombre"][nombre] = TipoTrabajo(
+                nombre=nombre,
+                usuario_id=current_user.id
+            )
+        return referencias["tipos_por_nombre"][nombre]
+
+    # eligió un tipo existente (si no es del usuario, queda sin tipo)
+    return referencias["tipos"].get(_id_o_none(item.get("tipo_trabajo_id")))
+
+
+
+# ===========================
+# IMPORTAR (CSV / NDJSON)
+# ===========================
+@movimientos.route("/importar", methods=["POST"])
+@login_required
+def importar():
+    archivo = request.files.get("archivo")
+
+    if archivo is None or not archivo.filename:
+        return jsonify(error="Archivo requerido"), 400
+
+    formato = request.args.get("formato") or detectar_formato(archivo.filename)
+
+    if formato not in FORMATOS:
+        return jsonify(error="Formato inválido, se espera csv o ndjson"), 400
+
+    resumen = importar_archivo(archivo.stream, formato, current_user.id)
+
+    # Archivo que deja de ser UTF-8: las filas anteriores ya se guardaron
+    if "error" in resumen:
+        return jsonify(resumen), 400
+
+    return jsonify(resumen)
+
+
+
+# ===========================
+# EXPORTAR (CSV / NDJSON)
+# ===========================
+@movimientos.route("/export.<formato>")
+@login_required
+@solo_lectura
+def exportar(formato):
+    if formato not in exportacion.FORMATOS:
+        return jsonify(error="Formato inválido, se espera csv o ndjson"), 404
+
+    try:
+        desde = _fecha_param("desde")
+        hasta = _fecha_param("hasta")
+        trabajo_id = request.args.get("trabajo", type=int)
+    except ValueError:
+        return jsonify(error="Fecha inválida, se espera YYYY-MM-DD"), 400
+
+    filas = exportacion.iterar_movimientos(
+        current_user.id,
+        desde=desde,
+        hasta=hasta,
+        trabajo_id=trabajo_id
+    )
+
+    # El cuerpo se genera mientras se envía: nunca está entero en memoria
+    return Response(
+        stream_with_context(exportacion.generar(formato, filas)),
+        content_type=exportacion.FORMATOS[formato],
+        headers={
+            "Content-Disposition": f'attachment; filename="movimientos.{formato}"'
+        }
+    )
+
+
+def _fecha_param(nombre):
+    """Fecha YYYY-MM-DD opcional de la query string (hasta es exclusivo)."""
+    valor = request.args.get(nombre)
+    if not valor:
+        return None
+    return datetime.strptime(valor, "%Y-%m-%d").date()
+
+
+
+# ===========================
+# RESUMEN ANUAL
+# ===========================
+@movimientos.route("/resumen-anual")
+@login_required
+@solo_lectura
+@condicional
+@cache.cacheado
+def resumen_anual():
     # ---------------------------
-    # UNIR AÑOS
+    # TOTALES POR AÑO (desde el resumen mensual)
     # ---------------------------
-    anios = sorted(set(ingresos_dict.keys()) | set(gastos_dict.keys()))
+    por_anio = (
+        db.session.query(
+            ResumenMensual.anio.label("anio"),
+            db.func.sum(ResumenMensual.ingresos).label("ingreso_bruto"),
+            db.func.sum(ResumenMensual.gastos).label("gastos")
+        )
+        .filter(
+            ResumenMensual.usuario_id == current_user.id,
+            ResumenMensual.cantidad > 0
+        )
+        .group_by(ResumenMensual.anio)
+        .order_by(ResumenMensual.anio)
+        .all()
+    )
 
     resumen_anual = []
 
-    for anio in anios:
-        ingreso_bruto = ingresos_dict.get(anio, 0)
-        gastos = gastos_dict.get(anio, 0)
+    for row in por_anio:
+        ingreso_bruto = row.ingreso_bruto or 0
+        gastos = row.gastos or 0
 
         resumen_anual.append({
-            "anio": anio,
+            "anio": int(row.anio),
             "ingreso_bruto": round(ingreso_bruto, 2),
             "gastos": round(gastos, 2),
             "ingreso_neto": round(ingreso_bruto - gastos, 2)
@@ -1,9 +1,10 @@
-from flask import Blueprint, render_template
+from flask import Blueprint, current_app, render_template, request
 from flask_login import login_required, current_user
+from app.extensions import cache
+from app.cache import condicional
+from app.replica import solo_lectura
 from datetime import date
-from calendar import monthrange
 from app.models import db
-import locale
 
 recomendaciones = Blueprint(
     'recomendaciones',
@@ -11,81 +12,99 @@ recomendaciones = Blueprint(
     url_prefix='/recomendaciones'
 )
 
-from app.models import Pago, GastoTrabajo
-from sqlalchemy import func
+from app.models import ResumenMensual
+from app.periodos import meses_hacia_atras, nombre_mes
 
-def total_neto_mes(usuario_id, year, month):
-    inicio = date(year, month, 1)
-    fin = date(year, month, monthrange(year, month)[1])
-
-    total_ingresos = db.session.query(
-        func.coalesce(func.sum(Pago.monto), 0)
-    ).filter(
-        Pago.usuario_id == usuario_id,
-        Pago.fecha.between(inicio, fin)
-    ).scalar()
+# Porcentaje del neto mensual que se sugiere ahorrar en cada escenario
+ESCENARIOS = (
+    ("Conservador", 10),
+    ("Equilibrado", 20),
+    ("Ambicioso", 30),
+)
 
-    total_gastos = db.session.query(
-        func.coalesce(func.sum(GastoTrabajo.monto), 0)
-    ).filter(
-        GastoTrabajo.usuario_id == usuario_id,
-        GastoTrabajo.fecha.between(inicio, fin)
-    ).scalar()
+MAX_MESES = 24
+
+
+def netos_por_mes(usuario_id, meses):
+    """{(anio, mes): neto} de los meses pedidos, en una sola consulta."""
+    (anio_fin, mes_fin), (anio_ini, mes_ini) = meses[0], meses[-1]
+    indice = ResumenMensual.anio * 12 + ResumenMensual.mes
+
+    filas = (
+        db.session.query(
+            ResumenMensual.anio,
+            ResumenMensual.mes,
+            ResumenMensual.ingresos,
+            ResumenMensual.gastos
+        )
+        .filter(
+            ResumenMensual.usuario_id == usuario_id,
+            indice.between(anio_ini * 12 + mes_ini, anio_fin * 12 + mes_fin)
+        )
+        .all()
+    )
 
-    return total_ingresos - total_gastos
+    return {(f.anio, f.mes): f.ingresos - f.gastos for f in filas}
 
 
 
 @recomendaciones.route('/')
 @login_required
+@solo_lectura
+@condicional(por_dia=True)
+@cache.cacheado(por_dia=True)
 def index():
     hoy = date.today()
 
-    # locale en español
-    locale.setlocale(locale.LC_TIME, "es_ES.UTF-8")
-
-    # mes actual y anterior
-    meses = []
-
-    meses.append((hoy.year, hoy.month))
+    # horizonte: ?meses=N (1 a 24), del mes actual hacia atrás
+    cantidad = request.args.get(
+        "meses",
+        current_app.config["RECOMENDACIONES_MESES"],
+        type=int
+    )
+    cantidad = min(max(cantidad or 1, 1), MAX_MESES)
 
-    if hoy.month == 1:
-        meses.append((hoy.year - 1, 12))
-    else:
-        meses.append((hoy.year, hoy.month - 1))
+    meses = meses_hacia_atras(hoy.year, hoy.month, cantidad)
+    netos = netos_por_mes(current_user.id, meses)
 
     datos = []
+    totales = {nombre: 0.0 for nombre, _ in ESCENARIOS}
 
     for year, month in meses:
-        total = total_neto_mes(current_user.id, year, month)
+        total = netos.get((year, month), 0)
 
         total_ahorrable = max(total, 0)
 
-        fecha = date(year, month, 1)
+        ahorros = {}
+        for nombre, porcentaje in ESCENARIOS:
+            monto = round(total_ahorrable * porcentaje / 100, 2)
+            ahorros[nombre] = {"porcentaje": porcentaje, "monto": monto}
+            totales[nombre] += monto
 
         datos.append({
             "year": year,
             "month": month,
-            "mes_formateado": fecha.strftime("%B de %Y").capitalize(),
+            "mes_formateado": nombre_mes(year, month, separador=" de "),
             "total": total,
-            "ahorros": {
-                "Conservador": {
-                    "porcentaje": 10,
-                    "monto": round(total_ahorrable * 0.10, 2)
-                },
-                "Equilibrado": {
-                    "porcentaje": 20,
-                    "monto": round(total_ahorrable * 0.20, 2)
-                },
-                "Ambicioso": {
-                    "porcentaje": 30,
-                    "monto": round(total_ahorrable * 0.30, 2)
-                }
-            }
+            "ahorros": ahorros
         })
 
+    # Proyección: lo ahorrado en el horizonte y, a ese ritmo, en un año
+    proyeccion = [
+        {
+            "nombre": nombre,
+            "porcentaje": porcentaje,
+            "total": round(totales[nombre], 2),
+            "promedio_mensual": round(totales[nombre] / cantidad, 2),
+            "proximos_12_meses": round(totales[nombre] / cantidad * 12, 2)
+        }
+        for nombre, porcentaje in ESCENARIOS
+    ]
 
     return render_template(
         "recomendaciones.html",
-        datos=datos
+        datos=datos,
+        proyeccion=proyeccion,
+        cantidad_meses=cantidad,
+        opciones_meses=(2, 6, 12, 24)
     )
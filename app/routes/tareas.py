@@ -0,0 +1,96 @@
+from flask import Blueprint, Response, jsonify, request, url_for
+from flask_login import login_required, current_user
+from app.tareas import (
+    EN_CURSO,
+    FALLIDA,
+    PENDIENTE,
+    TERMINADA,
+    LimiteTareas,
+    ParametrosInvalidos,
+    describir,
+    encolar,
+    tarea_de,
+    tareas_de
+)
+
+tareas = Blueprint(
+    'tareas',
+    __name__,
+    url_prefix='/jobs'
+)
+
+
+def _con_urls(tarea):
+    tarea["url"] = url_for('tareas.estado', tarea_id=tarea["id"])
+    tarea["resultado_url"] = url_for('tareas.resultado', tarea_id=tarea["id"])
+    return tarea
+
+
+# ===========================
+# ENCOLAR REPORTE
+# ===========================
+@tareas.route('/', methods=['POST'])
+@login_required
+def crear():
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get("reporte"):
+        return jsonify(error="Se espera {\"reporte\": ..., \"parametros\": {...}}"), 400
+
+    try:
+        tarea_id = encolar(current_user.id, data["reporte"], data.get("parametros"))
+    except ParametrosInvalidos as e:
+        return jsonify(error=str(e)), 400
+    except LimiteTareas as e:
+        return jsonify(error=str(e)), 429
+
+    tarea = _con_urls(describir(tarea_de(current_user.id, tarea_id)))
+    return jsonify(tarea), 202, {"Location": tarea["url"]}
+
+
+# ===========================
+# LISTADO
+# ===========================
+@tareas.route('/')
+@login_required
+def listado():
+    return jsonify([_con_urls(describir(fila)) for fila in tareas_de(current_user.id)])
+
+
+# ===========================
+# ESTADO
+# ===========================
+@tareas.route('/<int:tarea_id>')
+@login_required
+def estado(tarea_id):
+    fila = tarea_de(current_user.id, tarea_id)
+    if fila is None:
+        return jsonify(error="Tarea no encontrada o vencida"), 404
+
+    respuesta = jsonify(_con_urls(describir(fila)))
+    if fila.estado in (PENDIENTE, EN_CURSO):
+        respuesta.headers["Retry-After"] = "2"
+    return respuesta
+
+
+# ===========================
+# RESULTADO
+# ===========================
+@tareas.route('/<int:tarea_id>/resultado')
+@login_required
+def resultado(tarea_id):
+    fila = tarea_de(current_user.id, tarea_id, con_resultado=True)
+    if fila is None:
+        return jsonify(error="Tarea no encontrada o vencida"), 404
+
+    if fila.estado == FALLIDA:
+        return jsonify(estado=fila.estado, error=fila.error), 409
+    if fila.estado != TERMINADA:
+        return jsonify(estado=fila.estado), 409, {"Retry-After": "2"}
+
+    # El resultado ya está serializado: se manda tal cual
+    respuesta = Response(fila.resultado, content_type="application/json")
+    if request.args.get("descargar"):
+        respuesta.headers["Content-Disposition"] = (
+            f'attachment; filename="{fila.reporte}_{fila.id}.json"'
+        )
+    return respuesta
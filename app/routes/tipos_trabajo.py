@@ -1,8 +1,19 @@
 from flask import Blueprint, render_template, request, jsonify
 from flask_login import login_required, current_user
+from app.extensions import cache
+from app.cache import condicional
+from app.replica import solo_lectura
 from app.models import db, TipoTrabajo
-from sqlalchemy import func, extract
-from app.models import Trabajo, Pago, GastoTrabajo
+from sqlalchemy import case, func
+from app.models import Trabajo, movimientos_unificados
+from app.periodos import (
+    a_fecha,
+    etiqueta_mes,
+    expresion_periodo,
+    parsear_mes,
+    rango_mes,
+    rellenar
+)
 
 
 tipos_trabajo = Blueprint(
@@ -17,6 +28,7 @@ tipos_trabajo = Blueprint(
 # ===========================
 @tipos_trabajo.route('/')
 @login_required
+@condicional
 def index():
     tipos = (
         TipoTrabajo.query
@@ -135,72 +147,48 @@ def eliminar(tipo_id):
 
 @tipos_trabajo.route('/<int:tipo_id>/resumen')
 @login_required
+@solo_lectura
+@condicional
+@cache.cacheado
 def resumen_por_mes(tipo_id):
 
+    # Ingresos por fecha del PAGO y gastos por fecha del GASTO, en una
+    # sola consulta sobre los movimientos unificados
+    mov = movimientos_unificados(usuario_id=current_user.id)
+
     # -------- FILTRO DINÁMICO --------
     if tipo_id == 0:
-        filtro_tipo = Trabajo.tipo_id.is_(None)
+        filtro_tipo = mov.c.tipo_id.is_(None)
     else:
-        filtro_tipo = Trabajo.tipo_id == tipo_id
+        filtro_tipo = mov.c.tipo_id == tipo_id
 
-    # -------- INGRESOS (por fecha del PAGO) --------
-    ingresos = (
-        db.session.query(
-            func.strftime('%m-%Y', Pago.fecha).label('mes'),
-            func.sum(Pago.monto).label('bruto')
-        )
-        .join(Trabajo, Pago.trabajo_id == Trabajo.id)
-        .filter(
-            filtro_tipo,
-            Trabajo.usuario_id == current_user.id
-        )
-        .group_by('mes')
-        .all()
-    )
+    mes = expresion_periodo(mov.c.fecha, "mes").label('mes')
 
-    # -------- GASTOS (por fecha del GASTO) --------
-    gastos = (
+    rows = (
         db.session.query(
-            func.strftime('%m-%Y', GastoTrabajo.fecha).label('mes'),
-            func.sum(GastoTrabajo.monto).label('gasto')
-        )
-        .join(Trabajo, GastoTrabajo.trabajo_id == Trabajo.id)
-        .filter(
-            filtro_tipo,
-            Trabajo.usuario_id == current_user.id
+            mes,
+            func.sum(
+                case((mov.c.movimiento == 'pago', mov.c.monto), else_=0)
+            ).label('bruto'),
+            func.sum(
+                case((mov.c.movimiento == 'gasto', mov.c.monto), else_=0)
+            ).label('gasto')
         )
-        .group_by('mes')
+        .filter(filtro_tipo)
+        .group_by(mes)
         .all()
     )
 
-    # -------- UNIR RESULTADOS --------
-    resumen = {}
+    resumen = {
+        a_fecha(r.mes): (float(r.bruto or 0), float(r.gasto or 0))
+        for r in rows
+    }
 
-    for r in ingresos:
-        resumen[r.mes] = {
-            "mes": r.mes,
-            "bruto": float(r.bruto or 0),
-            "gasto": 0.0
-        }
-
-    for g in gastos:
-        if g.mes not in resumen:
-            resumen[g.mes] = {
-                "mes": g.mes,
-                "bruto": 0.0,
-                "gasto": float(g.gasto or 0)
-            }
-        else:
-            resumen[g.mes]["gasto"] = float(g.gasto or 0)
-
-    # Calcular neto y ordenar por mes
+    # Calcular neto, en orden cronológico y con los meses vacíos en cero
     resultado = []
-    for mes in sorted(resumen.keys()):
-        bruto = resumen[mes]["bruto"]
-        gasto = resumen[mes]["gasto"]
-
+    for inicio, (bruto, gasto) in rellenar(resumen, "mes", vacio=(0.0, 0.0)):
         resultado.append({
-            "mes": mes,
+            "mes": etiqueta_mes(inicio),
             "bruto": bruto,
             "gasto": gasto,
             "neto": bruto - gasto
@@ -211,67 +199,55 @@ def resumen_por_mes(tipo_id):
 
 @tipos_trabajo.route('/<int:tipo_id>/detalle/<mes>')
 @login_required
+@solo_lectura
+@condicional
+@cache.cacheado
 def detalle_mes(tipo_id, mes):
 
-    mes_num, anio = mes.split("-")
+    try:
+        desde, hasta = rango_mes(*parsear_mes(mes))
+    except ValueError:
+        return jsonify({'error': 'Mes inválido, se espera MM-YYYY'}), 400
+
+    mov = movimientos_unificados(
+        usuario_id=current_user.id,
+        desde=desde,
+        hasta=hasta
+    )
 
     # -------- FILTRO DINÁMICO --------
     if tipo_id == 0:
-        filtro_tipo = Trabajo.tipo_id.is_(None)
+        filtro_tipo = mov.c.tipo_id.is_(None)
     else:
-        filtro_tipo = Trabajo.tipo_id == tipo_id
-
-    # -------- PAGOS DEL MES --------
-    pagos = (
-        db.session.query(Pago, Trabajo)
-        .join(Trabajo, Pago.trabajo_id == Trabajo.id)
-        .filter(
-            filtro_tipo,
-            Trabajo.usuario_id == current_user.id,
-            extract('month', Pago.fecha) == int(mes_num),
-            extract('year', Pago.fecha) == int(anio)
-        )
-        .all()
-    )
+        filtro_tipo = mov.c.tipo_id == tipo_id
 
-    # -------- GASTOS DEL MES --------
-    gastos = (
-        db.session.query(GastoTrabajo, Trabajo)
-        .join(Trabajo, GastoTrabajo.trabajo_id == Trabajo.id)
-        .filter(
-            filtro_tipo,
-            Trabajo.usuario_id == current_user.id,
-            extract('month', GastoTrabajo.fecha) == int(mes_num),
-            extract('year', GastoTrabajo.fecha) == int(anio)
+    # -------- PAGOS Y GASTOS DEL MES, ORDENADOS POR FECHA --------
+    rows = (
+        db.session.query(
+            mov.c.fecha,
+            mov.c.movimiento,
+            mov.c.monto,
+            mov.c.monto_signado,
+            Trabajo.nombre.label('trabajo'),
+            TipoTrabajo.nombre.label('tipo')
         )
+        .join(Trabajo, mov.c.trabajo_id == Trabajo.id)
+        .outerjoin(TipoTrabajo, mov.c.tipo_id == TipoTrabajo.id)
+        .filter(filtro_tipo)
+        .order_by(mov.c.fecha, mov.c.movimiento.desc(), mov.c.id)
         .all()
     )
 
-    data = []
-
-    # Agregar pagos
-    for pago, trabajo in pagos:
-        data.append({
-            "fecha": pago.fecha.strftime("%d/%m"),
-            "tipo": trabajo.tipo.nombre if trabajo.tipo else "Sin tipo",
-            "trabajo": trabajo.nombre,
-            "bruto": float(pago.monto),
-            "gasto": 0.0,
-            "neto": float(pago.monto)
-        })
-
-    # Agregar gastos
-    for gasto, trabajo in gastos:
-        data.append({
-            "fecha": gasto.fecha.strftime("%d/%m"),
-            "tipo": trabajo.tipo.nombre if trabajo.tipo else "Sin tipo",
-            "trabajo": trabajo.nombre,
-            "bruto": 0.0,
-            "gasto": float(gasto.monto),
-            "neto": -float(gasto.monto)
-        })
-
-    # Ordenar por fecha
-    data.sort(key=lambda x: x["fecha"])
+    data = [
+        {
+            "fecha": r.fecha.strftime("%d/%m"),
+            "tipo": r.tipo or "Sin tipo",
+            "trabajo": r.trabajo,
+            "bruto": float(r.monto) if r.movimiento == 'pago' else 0.0,
+            "gasto": float(r.monto) if r.movimiento == 'gasto' else 0.0,
+            "neto": float(r.monto_signado)
+        }
+        for r in rows
+    ]
 
-    return jsonify(data)
\ No newline at end of file
+    return jsonify(data)
@@ -1,6 +1,9 @@
 from flask import Blueprint, render_template, jsonify, request
 from app.models import GastoTrabajo, Pago, TipoTrabajo, db, Trabajo
 from flask_login import login_required, current_user
+from app.extensions import cache
+from app.cache import condicional
+from sqlalchemy.orm import contains_eager, joinedload, selectinload
 
 
 trabajos = Blueprint(
@@ -12,15 +15,26 @@ trabajos = Blueprint(
 
 @trabajos.route('/')
 @login_required
+@condicional
+@cache.cacheado
 def index():
+    # Una sola consulta: el tipo viene en el mismo JOIN y los totales
+    # son columnas del trabajo, así el template no dispara lazy loads.
     trabajos = (
         Trabajo.query
-        .filter_by(usuario_id=current_user.id)
+        .outerjoin(Trabajo.tipo)
+        .options(contains_eager(Trabajo.tipo))
+        .filter(Trabajo.usuario_id == current_user.id)
         .order_by(Trabajo.fecha.desc())
         .all()
     )
 
-    tipos = TipoTrabajo.query.all()
+    tipos = (
+        TipoTrabajo.query
+        .filter_by(usuario_id=current_user.id)
+        .order_by(TipoTrabajo.nombre)
+        .all()
+    )
 
     tipos_serializados = [
         {"id": t.id, "nombre": t.nombre}
@@ -38,9 +52,15 @@ def index():
 
 @trabajos.route('/detalle/<int:trabajo_id>')
 @login_required
+@condicional
+@cache.cacheado
 def detalle(trabajo_id):
     trabajo = (
         Trabajo.query
+        .options(
+            selectinload(Trabajo.pagos),
+            selectinload(Trabajo.gastos).joinedload(GastoTrabajo.insumo)
+        )
         .filter_by(id=trabajo_id, usuario_id=current_user.id)
         .first_or_404()
     )
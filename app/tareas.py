@@ -0,0 +1,438 @@
+import json
+import os
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+from flask import current_app
+from sqlalchemy import and_, delete, func, insert, select, text, update
+
+from app.models import db, TareaReporte, Usuario
+from app.reportes import REPORTES
+
+
+# =========================
+# TAREAS EN SEGUNDO PLANO
+# =========================
+# Cola de reportes pesados (app.reportes) sin broker: la tabla
+# tareas_reporte. POST /jobs/ inserta una tarea pendiente y cada proceso
+# web tiene TAREAS_HILOS hilos que reclaman pendientes y guardan el
+# resultado en la misma fila; el cliente consulta /jobs/<id> hasta que
+# termina. `flask tareas procesar` corre los mismos hilos en un proceso
+# aparte (con TAREAS_HILOS=0 en la web, solo calcula ese proceso).
+#
+# - Reclamar es un UPDATE ... WHERE id = <pendiente> AND estado =
+#   'pendiente' RETURNING ..., así dos hilos o workers nunca toman la
+#   misma tarea (en Postgres la pendiente se elige salteando las filas
+#   bloqueadas con SKIP LOCKED).
+# - Límites por usuario: TAREAS_ACTIVAS_POR_USUARIO pendientes + en curso
+#   al encolar (429 si se pasa) y TAREAS_EN_CURSO_POR_USUARIO a la vez al
+#   reclamar, para que un usuario no ocupe todos los hilos. Contar y
+#   escribir van en una transacción serializada por usuario
+#   (_transaccion_por_usuario); si no, dos requests o dos hilos a la vez
+#   ven lugar y se pasan los dos.
+# - El resultado se guarda TAREAS_TTL_HORAS y después se borra.
+# - Una tarea en curso hace más de TAREAS_TIMEOUT_MINUTOS se da por
+#   abandonada (el worker se reinició): vuelve a pendiente hasta
+#   TAREAS_MAX_INTENTOS y después queda fallida.
+#
+# Las filas se escriben con conexiones propias, fuera de db.session: no
+# cuentan como cambios de datos del usuario (no invalidan su caché).
+
+PENDIENTE = "pendiente"
+EN_CURSO = "en_curso"
+TERMINADA = "terminada"
+FALLIDA = "fallida"
+
+ACTIVAS = (PENDIENTE, EN_CURSO)
+
+INTERVALO_MANTENIMIENTO = 60
+
+_tabla = TareaReporte.__table__
+
+
+class ParametrosInvalidos(ValueError):
+    pass
+
+
+class LimiteTareas(Exception):
+    def __init__(self, maximo):
+        super().__init__(f"Máximo {maximo} reportes pendientes por usuario")
+        self.maximo = maximo
+
+
+def _ahora():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+# =========================
+# ENCOLAR Y CONSULTAR
+# =========================
+def validar(reporte, parametros):
+    """Parámetros del reporte convertidos a su tipo; ParametrosInvalidos si no."""
+    if reporte not in REPORTES:
+        raise ParametrosInvalidos(f"Reporte desconocido: {reporte!r}")
+
+    if parametros is None:
+        parametros = {}
+    if not isinstance(parametros, dict):
+        raise ParametrosInvalidos("Los parámetros deben ser un objeto")
+
+    _, aceptados = REPORTES[reporte]
+
+    desconocidos = set(parametros) - set(aceptados)
+    if desconocidos:
+        raise ParametrosInvalidos(
+            f"Parámetros desconocidos: {', '.join(sorted(desconocidos))}"
+        )
+
+    validos = {}
+    for nombre, valor in parametros.items():
+        if valor is None:
+            continue
+        try:
+            validos[nombre] = aceptados[nombre](valor)
+        except (TypeError, ValueError):
+            raise ParametrosInvalidos(f"{nombre} inválido")
+
+    return validos
+
+
+@contextmanager
+def _transaccion_por_usuario():
+    """
+    Transacción para contar las tareas de un usuario y después escribir.
+    En SQLite empieza con BEGIN IMMEDIATE: el lock de escritura se toma
+    antes de contar y nadie más escribe hasta el commit. En Postgres cada
+    uso bloquea además la fila del usuario (_bloquear_usuario).
+    """
+    with db.engine.connect() as conexion:
+        if conexion.dialect.name == "sqlite":
+            conexion.exec_driver_sql("BEGIN IMMEDIATE")
+
+        try:
+            yield conexion
+        except BaseException:
+            conexion.rollback()
+            raise
+        conexion.commit()
+
+
+def _bloquear_usuario(conexion, usuario_id):
+    # SELECT ... FOR UPDATE: otra transacción del mismo usuario espera acá
+    # hasta el commit y recién entonces cuenta. En SQLite ya alcanza con
+    # BEGIN IMMEDIATE.
+    if conexion.dialect.name != "sqlite":
+        usuarios = Usuario.__table__
+        conexion.execute(
+            select(usuarios.c.id)
+            .where(usuarios.c.id == usuario_id)
+            .with_for_update()
+        )
+
+
+def encolar(usuario_id, reporte, parametros=None):
+    """Crea una tarea pendiente y devuelve su id."""
+    parametros = validar(reporte, parametros)
+    maximo = current_app.config["TAREAS_ACTIVAS_POR_USUARIO"]
+
+    with _transaccion_por_usuario() as conexion:
+        _bloquear_usuario(conexion, usuario_id)
+
+        activas = conexion.execute(
+            select(func.count())
+            .select_from(_tabla)
+            .where(_tabla.c.usuario_id == usuario_id, _tabla.c.estado.in_(ACTIVAS))
+        ).scalar()
+
+        if activas >= maximo:
+            raise LimiteTareas(maximo)
+
+        tarea_id = conexion.execute(
+            insert(_tabla).values(
+                usuario_id=usuario_id,
+                reporte=reporte,
+                parametros=json.dumps(parametros),
+                estado=PENDIENTE,
+                creada_en=_ahora()
+            )
+        ).inserted_primary_key[0]
+
+    # Si este proceso tiene hilos, que no esperen al próximo intervalo
+    ejecutor = current_app.extensions.get("tareas")
+    if ejecutor is not None:
+        ejecutor.avisar()
+
+    return tarea_id
+
+
+_COLUMNAS_ESTADO = (
+    _tabla.c.id, _tabla.c.reporte, _tabla.c.parametros, _tabla.c.estado,
+    _tabla.c.intentos, _tabla.c.error, _tabla.c.creada_en, _tabla.c.iniciada_en,
+    _tabla.c.terminada_en, _tabla.c.vence_en
+)
+
+
+def describir(fila):
+    """Estado de una tarea como dict para JSON (sin el resultado)."""
+    tarea = {
+        "id": fila.id,
+        "reporte": fila.reporte,
+        "parametros": json.loads(fila.parametros),
+        "estado": fila.estado,
+        "intentos": fila.intentos,
+        "error": fila.error,
+    }
+    for campo in ("creada_en", "iniciada_en", "terminada_en", "vence_en"):
+        valor = getattr(fila, campo)
+        tarea[campo] = valor.replace(tzinfo=timezone.utc).isoformat() if valor else None
+    return tarea
+
+
+def _vigente():
+    return (_tabla.c.vence_en.is_(None)) | (_tabla.c.vence_en > _ahora())
+
+
+def tareas_de(usuario_id, limite=50):
+    """Las últimas tareas del usuario, sin el resultado."""
+    with db.engine.connect() as conexion:
+        return conexion.execute(
+            select(*_COLUMNAS_ESTADO)
+            .where(_tabla.c.usuario_id == usuario_id, _vigente())
+            .order_by(_tabla.c.id.desc())
+            .limit(limite)
+        ).all()
+
+
+def tarea_de(usuario_id, tarea_id, con_resultado=False):
+    """La tarea si es del usuario y no venció, o None."""
+    columnas = _COLUMNAS_ESTADO + ((_tabla.c.resultado,) if con_resultado else ())
+
+    with db.engine.connect() as conexion:
+        return conexion.execute(
+            select(*columnas)
+            .where(
+                _tabla.c.id == tarea_id,
+                _tabla.c.usuario_id == usuario_id,
+                _vigente()
+            )
+        ).first()
+
+
+# =========================
+# RECLAMAR Y EJECUTAR
+# =========================
+def reclamar(worker, en_curso_por_usuario):
+    """Pasa la pendiente más vieja a en curso y la devuelve, o None si no hay."""
+    ocupados = (
+        select(_tabla.c.usuario_id)
+        .where(_tabla.c.estado == EN_CURSO)
+        .group_by(_tabla.c.usuario_id)
+        .having(func.count() >= en_curso_por_usuario)
+    )
+
+    with _transaccion_por_usuario() as conexion:
+        siguiente = conexion.execute(
+            select(_tabla.c.id, _tabla.c.usuario_id)
+            .where(_tabla.c.estado == PENDIENTE, _tabla.c.usuario_id.not_in(ocupados))
+            .order_by(_tabla.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+
+        if siguiente is None:
+            return None
+
+        # En Postgres `ocupados` se leyó antes de bloquear al usuario: se
+        # vuelve a contar con el lock, en el mismo UPDATE
+        _bloquear_usuario(conexion, siguiente.usuario_id)
+        en_curso = (
+            select(func.count())
+            .select_from(_tabla)
+            .where(_tabla.c.usuario_id == siguiente.usuario_id, _tabla.c.estado == EN_CURSO)
+            .scalar_subquery()
+        )
+
+        return conexion.execute(
+            update(_tabla)
+            .where(
+                _tabla.c.id == siguiente.id,
+                _tabla.c.estado == PENDIENTE,
+                en_curso < en_curso_por_usuario
+            )
+            .values(
+                estado=EN_CURSO,
+                worker=worker,
+                iniciada_en=_ahora(),
+                intentos=_tabla.c.intentos + 1
+            )
+            .returning(_tabla.c.id, _tabla.c.usuario_id, _tabla.c.reporte, _tabla.c.parametros)
+        ).first()
+
+
+def ejecutar(tarea, worker):
+    """Calcula el reporte de una tarea reclamada y guarda el resultado o el error."""
+    config = current_app.config
+
+    try:
+        funcion, _ = REPORTES[tarea.reporte]
+        _limitar_sentencias(config["TAREAS_STATEMENT_TIMEOUT_MS"])
+
+        resultado = funcion(tarea.usuario_id, **json.loads(tarea.parametros))
+        valores = {
+            "estado": TERMINADA,
+            "resultado": json.dumps(resultado, ensure_ascii=False),
+            "error": None
+        }
+    except Exception as e:
+        current_app.logger.exception("Falló la tarea %s (%s)", tarea.id, tarea.reporte)
+        valores = {"estado": FALLIDA, "error": f"{type(e).__name__}: {e}"[:500]}
+    finally:
+        db.session.remove()
+
+    ahora = _ahora()
+
+    # Si se dio por abandonada y la reclamó otro, gana el otro
+    with db.engine.begin() as conexion:
+        conexion.execute(
+            update(_tabla)
+            .where(
+                _tabla.c.id == tarea.id,
+                _tabla.c.estado == EN_CURSO,
+                _tabla.c.worker == worker
+            )
+            .values(
+                terminada_en=ahora,
+                vence_en=ahora + timedelta(hours=config["TAREAS_TTL_HORAS"]),
+                **valores
+            )
+        )
+
+
+def _limitar_sentencias(milisegundos):
+    # DB_STATEMENT_TIMEOUT_MS corta las consultas de los requests; los
+    # reportes en segundo plano pueden tardar más (SET LOCAL: solo esta
+    # transacción, la conexión vuelve al pool con el valor de siempre)
+    if milisegundos and db.engine.dialect.name == "postgresql":
+        db.session.execute(text(f"SET LOCAL statement_timeout = {int(milisegundos)}"))
+
+
+def mantener():
+    """Borra los resultados vencidos y reencola (o da por fallidas) las tareas abandonadas."""
+    config = current_app.config
+    ahora = _ahora()
+    colgadas = and_(
+        _tabla.c.estado == EN_CURSO,
+        _tabla.c.iniciada_en < ahora - timedelta(minutes=config["TAREAS_TIMEOUT_MINUTOS"])
+    )
+
+    with db.engine.begin() as conexion:
+        conexion.execute(delete(_tabla).where(_tabla.c.vence_en < ahora))
+
+        conexion.execute(
+            update(_tabla)
+            .where(colgadas, _tabla.c.intentos < config["TAREAS_MAX_INTENTOS"])
+            .values(estado=PENDIENTE, worker=None, iniciada_en=None)
+        )
+        conexion.execute(
+            update(_tabla)
+            .where(colgadas)
+            .values(
+                estado=FALLIDA,
+                error="Se interrumpió demasiadas veces",
+                terminada_en=ahora,
+                vence_en=ahora + timedelta(hours=config["TAREAS_TTL_HORAS"])
+            )
+        )
+
+
+# =========================
+# EJECUTOR
+# =========================
+class Ejecutor:
+    """Hilos de un proceso que reclaman y calculan tareas pendientes."""
+
+    def __init__(self, app, hilos):
+        self.app = app
+        self.hilos = hilos
+        self.nombre = f"{socket.gethostname()}:{os.getpid()}"
+        self._aviso = threading.Event()
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._hilos = []
+        self._ultimo_mantenimiento = 0.0
+
+    @property
+    def iniciado(self):
+        return bool(self._hilos)
+
+    def iniciar(self):
+        with self._lock:
+            if self._hilos:
+                return
+
+            # El pid cambia si la app se creó antes de un fork (--preload)
+            self.nombre = f"{socket.gethostname()}:{os.getpid()}"
+            for i in range(self.hilos):
+                hilo = threading.Thread(
+                    target=self._trabajar, name=f"tareas-{i}", daemon=True
+                )
+                hilo.start()
+                self._hilos.append(hilo)
+
+    def avisar(self):
+        self._aviso.set()
+
+    def detener(self):
+        self._parar.set()
+        self._aviso.set()
+        for hilo in self._hilos:
+            hilo.join()
+
+    def _trabajar(self):
+        worker = f"{self.nombre}/{threading.current_thread().name}"
+        intervalo = self.app.config["TAREAS_INTERVALO_SEGUNDOS"]
+        en_curso_por_usuario = self.app.config["TAREAS_EN_CURSO_POR_USUARIO"]
+
+        while not self._parar.is_set():
+            try:
+                with self.app.app_context():
+                    self._mantener_si_toca()
+
+                    tarea = reclamar(worker, en_curso_por_usuario)
+                    if tarea is not None:
+                        ejecutar(tarea, worker)
+                        continue
+            except Exception:
+                self.app.logger.exception("Error en el ejecutor de tareas")
+
+            self._aviso.wait(intervalo)
+            self._aviso.clear()
+
+    def _mantener_si_toca(self):
+        ahora = time.monotonic()
+        with self._lock:
+            if ahora - self._ultimo_mantenimiento < INTERVALO_MANTENIMIENTO:
+                return
+            self._ultimo_mantenimiento = ahora
+        mantener()
+
+
+def configurar_tareas(app):
+    """
+    Prepara el ejecutor de la app. Los hilos arrancan con el primer
+    request de cada proceso (después del fork de gunicorn), no al crear la
+    app: los comandos de flask y los scripts no los necesitan.
+    """
+    hilos = app.config["TAREAS_HILOS"]
+    if hilos <= 0:
+        return
+
+    ejecutor = app.extensions["tareas"] = Ejecutor(app, hilos)
+
+    @app.before_request
+    def _iniciar_ejecutor():
+        if not ejecutor.iniciado:
+            ejecutor.iniciar()
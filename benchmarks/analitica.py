@@ -0,0 +1,195 @@
+"""
+Compara los reportes de app.analitica (columnas de NumPy) con el enfoque
+anterior de recorrer objetos Pago/GastoTrabajo del ORM en Python:
+
+    python benchmarks/analitica.py [--filas 10000,100000,1000000]
+                                   [--repeticiones 3] [--semilla 1]
+
+Para cada tamaño crea un usuario con aproximadamente ese número de
+movimientos (datos.generar, 20 por trabajo en promedio) en una base
+SQLite temporal y mide la mediana de:
+
+    orm        cargar los objetos y calcular los reportes con loops
+    columnar   cargar el libro (una consulta) y calcular los reportes
+    cacheado   solo los reportes, con el libro ya en memoria
+
+Los reportes son totales mensuales, por tipo, por insumo, valor hora por
+trabajo y promedio móvil de 3 meses. Antes de medir se verifica que los
+totales mensuales de ambos enfoques coincidan.
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _crear_app():
+    carpeta = tempfile.mkdtemp(prefix="bench_analitica_")
+    os.environ.update(
+        DATABASE_URL="sqlite:///" + os.path.join(carpeta, "bench.db"),
+        INICIALIZAR_DB="1",
+        CACHE_BACKEND="ninguno",
+    )
+    sys.path.insert(0, RAIZ)
+
+    from app import create_app
+
+    return create_app()
+
+
+# =========================
+# ENFOQUES
+# =========================
+def reportes_orm(usuario_id):
+    """Los mismos reportes recorriendo objetos del ORM, como antes."""
+    from app.models import db, GastoTrabajo, Pago, Trabajo
+
+    pagos = Pago.query.filter_by(usuario_id=usuario_id).all()
+    gastos = GastoTrabajo.query.filter_by(usuario_id=usuario_id).all()
+    tipo_de = dict(
+        db.session.query(Trabajo.id, Trabajo.tipo_id)
+        .filter(Trabajo.usuario_id == usuario_id)
+        .all()
+    )
+
+    mensual = defaultdict(lambda: [0.0, 0.0, 0.0, 0])
+    por_tipo = defaultdict(lambda: [0.0, 0.0, 0.0])
+    por_insumo = defaultdict(lambda: [0.0, 0.0, 0])
+    por_trabajo = defaultdict(lambda: [0.0, 0.0, 0.0])
+
+    for p in pagos:
+        mes = mensual[(p.fecha.year, p.fecha.month)]
+        mes[0] += p.monto
+        mes[3] += 1
+        por_tipo[tipo_de[p.trabajo_id]][0] += p.monto
+        por_trabajo[p.trabajo_id][0] += p.monto
+
+    for g in gastos:
+        mes = mensual[(g.fecha.year, g.fecha.month)]
+        mes[1] += g.monto
+        mes[2] += g.tiempo
+        mes[3] += 1
+        tipo = por_tipo[tipo_de[g.trabajo_id]]
+        tipo[1] += g.monto
+        tipo[2] += g.tiempo
+        insumo = por_insumo[g.insumo_id]
+        insumo[0] += g.monto
+        insumo[1] += g.tiempo
+        insumo[2] += 1
+        trabajo = por_trabajo[g.trabajo_id]
+        trabajo[1] += g.monto
+        trabajo[2] += g.tiempo
+
+    valores_hora = sorted(
+        (bruto - gasto) / horas
+        for bruto, gasto, horas in por_trabajo.values()
+        if horas > 0
+    )
+
+    claves = sorted(mensual)
+    netos = [mensual[c][0] - mensual[c][1] for c in claves]
+    movil = [
+        sum(netos[max(0, i - 2):i + 1]) / len(netos[max(0, i - 2):i + 1])
+        for i in range(len(netos))
+    ]
+
+    return {
+        "mensual": {c: mensual[c] for c in claves},
+        "por_tipo": dict(por_tipo),
+        "por_insumo": dict(por_insumo),
+        "valores_hora": valores_hora,
+        "movil": movil
+    }
+
+
+def reportes_columnar(libro):
+    return {
+        "mensual": libro.totales_mensuales(),
+        "por_tipo": libro.por_tipo(),
+        "por_insumo": libro.por_insumo(),
+        "valor_hora": libro.distribucion_valor_hora(),
+        "movil": libro.promedio_movil(3)
+    }
+
+
+def verificar(orm, columnar):
+    mensual = {(f["anio"], f["mes"]): f for f in columnar["mensual"]}
+    assert set(mensual) == set(orm["mensual"]), "meses distintos"
+
+    for clave, (ingresos, gastos, horas, cantidad) in orm["mensual"].items():
+        fila = mensual[clave]
+        assert abs(fila["ingresos"] - ingresos) < 1e-3 * max(1, abs(ingresos)), clave
+        assert abs(fila["gastos"] - gastos) < 1e-3 * max(1, abs(gastos)), clave
+        assert fila["cantidad"] == cantidad, clave
+
+
+def _mediana(funcion, repeticiones):
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return round(statistics.median(tiempos) * 1000, 1)
+
+
+def correr(app, filas, repeticiones, semilla):
+    from app.analitica import cargar_libro
+    from app.models import db
+    from datos import generar
+
+    with app.app_context():
+        usuario_id = generar(
+            usuarios=1, trabajos=max(10, filas // 20), movimientos=20, semilla=semilla
+        )[0]
+
+        libro = cargar_libro(usuario_id)
+        verificar(reportes_orm(usuario_id), reportes_columnar(libro))
+
+        def orm():
+            reportes_orm(usuario_id)
+            db.session.expunge_all()
+
+        return {
+            "filas": len(libro),
+            "orm_ms": _mediana(orm, repeticiones),
+            "columnar_ms": _mediana(
+                lambda: reportes_columnar(cargar_libro(usuario_id)), repeticiones
+            ),
+            "cacheado_ms": _mediana(lambda: reportes_columnar(libro), repeticiones),
+            "libro_mb": round(libro.nbytes / 2**20, 1),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--filas", default="10000,100000,1000000",
+                        help="Tamaños a medir, separados por coma.")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    app = _crear_app()
+    resultados = [
+        correr(app, int(filas), args.repeticiones, args.semilla)
+        for filas in args.filas.split(",")
+    ]
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+
+    print(f"{'filas':>9}{'orm ms':>11}{'columnar ms':>13}{'cacheado ms':>13}{'libro MB':>10}")
+    for r in resultados:
+        print(f"{r['filas']:>9}{r['orm_ms']:>11}{r['columnar_ms']:>13}"
+              f"{r['cacheado_ms']:>13}{r['libro_mb']:>10}")
+
+
+if __name__ == "__main__":
+    main()
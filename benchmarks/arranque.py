@@ -0,0 +1,92 @@
+"""
+Mide el arranque de la aplicación en procesos nuevos (import en frío):
+
+    python benchmarks/arranque.py [--repeticiones 10] [--ruta /auth/login]
+                                  [--max-ms 800]
+
+Para cada repetición informa el tiempo de `import app`, de `create_app()`
+y del primer request, y al final la mediana y el máximo de cada uno. Con
+--max-ms sale con código 1 si la mediana hasta el primer request lo
+supera, para usarlo como control de regresiones.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Se ejecuta en un intérprete nuevo para que nada esté importado de antes
+_MEDICION = """
+import json, time
+inicio = time.perf_counter()
+
+import app as paquete
+importado = time.perf_counter()
+
+aplicacion = paquete.create_app()
+creada = time.perf_counter()
+
+respuesta = aplicacion.test_client().get({ruta!r})
+servido = time.perf_counter()
+
+print(json.dumps({{
+    "import_ms": (importado - inicio) * 1000,
+    "create_app_ms": (creada - importado) * 1000,
+    "primer_request_ms": (servido - creada) * 1000,
+    "total_ms": (servido - inicio) * 1000,
+    "status": respuesta.status_code,
+}}))
+"""
+
+
+def medir(ruta):
+    salida = subprocess.run(
+        [sys.executable, "-c", _MEDICION.format(ruta=ruta)],
+        cwd=RAIZ,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(salida.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeticiones", type=int, default=10)
+    parser.add_argument("--ruta", default="/auth/login")
+    parser.add_argument("--max-ms", type=float, default=None,
+                        help="Falla si la mediana total supera este valor.")
+    parser.add_argument("--json", action="store_true",
+                        help="Imprime el resultado como JSON.")
+    args = parser.parse_args()
+
+    medidas = [medir(args.ruta) for _ in range(args.repeticiones)]
+
+    resultado = {"ruta": args.ruta, "repeticiones": args.repeticiones}
+    for clave in ("import_ms", "create_app_ms", "primer_request_ms", "total_ms"):
+        valores = [m[clave] for m in medidas]
+        resultado[clave] = {
+            "mediana": round(statistics.median(valores), 1),
+            "max": round(max(valores), 1),
+        }
+
+    if args.json:
+        print(json.dumps(resultado, indent=2))
+    else:
+        print(f"{args.ruta} ({args.repeticiones} procesos)")
+        for clave in ("import_ms", "create_app_ms", "primer_request_ms", "total_ms"):
+            print(
+                f"  {clave:<18} mediana {resultado[clave]['mediana']:>7.1f}"
+                f"   max {resultado[clave]['max']:>7.1f}"
+            )
+
+    if args.max_ms is not None and resultado["total_ms"]["mediana"] > args.max_ms:
+        print(f"Arranque más lento que {args.max_ms} ms", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
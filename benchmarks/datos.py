@@ -0,0 +1,156 @@
+"""
+Generador determinístico de datos para los benchmarks: N usuarios con M
+trabajos cada uno y, en promedio, K pagos/gastos por trabajo, repartidos
+en los últimos `anios` años.
+
+    from datos import generar
+    with app.app_context():
+        usuario_ids = generar(usuarios=100, trabajos=50, movimientos=20)
+
+Las filas se insertan en lotes con INSERT ... executemany y los totales
+de cada trabajo y los resúmenes mensuales se actualizan con los mismos
+deltas que usa la importación (app.acumulados.aplicar_movimientos), así
+las vistas ven los datos como si se hubieran cargado desde la app.
+
+Distribuciones (misma semilla, mismos datos):
+    - ~10% de los trabajos sin tipo
+    - por trabajo, entre K/2 y 3K/2 movimientos, ~30% pagos
+    - montos log-normales: pagos alrededor de 40000, gastos de 2000
+    - horas: 40% de los gastos sin horas, el resto gamma(2, 1.5)
+    - pagos hasta 60 días después del trabajo, gastos de 15 días antes
+      a 30 después
+"""
+import math
+import random
+from datetime import date, timedelta
+
+FILAS_POR_LOTE = 50000
+
+TIPOS_POR_USUARIO = 6
+INSUMOS_POR_USUARIO = 15
+
+
+def _siguiente_id(conexion, tabla):
+    from sqlalchemy import func, select
+
+    return (conexion.execute(select(func.max(tabla.c.id))).scalar() or 0) + 1
+
+
+def generar(usuarios=1, trabajos=50, movimientos=20, semilla=1, anios=5, hasta=None):
+    """Inserta los datos y devuelve los ids de los usuarios creados."""
+    from sqlalchemy import insert
+
+    from app.acumulados import aplicar_movimientos
+    from app.models import db, GastoTrabajo, Insumo, Pago, TipoTrabajo, Trabajo, Usuario
+
+    azar = random.Random(semilla)
+    hasta = hasta or date.today()
+    desde = hasta - timedelta(days=365 * anios)
+    dias = (hasta - desde).days
+
+    conexion = db.session.connection()
+    ids = {
+        modelo: _siguiente_id(conexion, modelo.__table__)
+        for modelo in (Usuario, TipoTrabajo, Insumo, Trabajo)
+    }
+
+    def nuevo_id(modelo):
+        ids[modelo] += 1
+        return ids[modelo] - 1
+
+    pendientes = {Usuario: [], TipoTrabajo: [], Insumo: [], Trabajo: [], Pago: [], GastoTrabajo: []}
+
+    def confirmar():
+        # Primero las tablas referenciadas, después los movimientos
+        for modelo, filas in pendientes.items():
+            if filas:
+                db.session.execute(insert(modelo.__table__), filas)
+
+        aplicar_movimientos(
+            db.session.connection(),
+            [(1, True, p) for p in pendientes[Pago]]
+            + [(1, False, g) for g in pendientes[GastoTrabajo]]
+        )
+        db.session.commit()
+
+        for filas in pendientes.values():
+            filas.clear()
+
+    usuario_ids = []
+
+    for u in range(usuarios):
+        usuario_id = nuevo_id(Usuario)
+        usuario_ids.append(usuario_id)
+        pendientes[Usuario].append({
+            "id": usuario_id,
+            "email": f"bench-{semilla}-{usuario_id}@example.com",
+            "nombre": f"Usuario {u}"
+        })
+
+        tipo_ids = [nuevo_id(TipoTrabajo) for _ in range(TIPOS_POR_USUARIO)]
+        insumo_ids = [nuevo_id(Insumo) for _ in range(INSUMOS_POR_USUARIO)]
+
+        pendientes[TipoTrabajo].extend(
+            {"id": i, "nombre": f"tipo {n}", "usuario_id": usuario_id}
+            for n, i in enumerate(tipo_ids)
+        )
+        pendientes[Insumo].extend(
+            {"id": i, "nombre": f"insumo {n}", "usuario_id": usuario_id}
+            for n, i in enumerate(insumo_ids)
+        )
+
+        for t in range(trabajos):
+            trabajo_id = nuevo_id(Trabajo)
+            fecha_trabajo = desde + timedelta(days=azar.randrange(dias))
+
+            pendientes[Trabajo].append({
+                "id": trabajo_id,
+                "nombre": f"trabajo {t}",
+                "fecha": fecha_trabajo,
+                "tipo_id": azar.choice(tipo_ids) if azar.random() > 0.1 else None,
+                "usuario_id": usuario_id
+            })
+
+            cantidad = azar.randint(max(1, movimientos // 2), max(1, movimientos * 3 // 2))
+            cantidad_pagos = max(1, round(cantidad * 0.3))
+
+            for _ in range(cantidad_pagos):
+                pendientes[Pago].append({
+                    "fecha": min(hasta, fecha_trabajo + timedelta(days=azar.randint(0, 60))),
+                    "monto": round(azar.lognormvariate(math.log(40000), 0.6), 2),
+                    "trabajo_id": trabajo_id,
+                    "usuario_id": usuario_id
+                })
+
+            for _ in range(cantidad - cantidad_pagos):
+                pendientes[GastoTrabajo].append({
+                    "fecha": min(hasta, max(desde, fecha_trabajo + timedelta(days=azar.randint(-15, 30)))),
+                    "monto": round(azar.lognormvariate(math.log(2000), 0.9), 2),
+                    "tiempo": 0.0 if azar.random() < 0.4 else round(azar.gammavariate(2, 1.5), 1),
+                    "trabajo_id": trabajo_id,
+                    "insumo_id": azar.choice(insumo_ids),
+                    "usuario_id": usuario_id
+                })
+
+        if len(pendientes[Pago]) + len(pendientes[GastoTrabajo]) >= FILAS_POR_LOTE:
+            confirmar()
+
+    confirmar()
+    _ajustar_secuencias(db, (Usuario, TipoTrabajo, Insumo, Trabajo))
+    return usuario_ids
+
+
+def _ajustar_secuencias(db, modelos):
+    """En Postgres, los ids explícitos no avanzan la secuencia del SERIAL."""
+    from sqlalchemy import text
+
+    if db.session.get_bind().dialect.name != "postgresql":
+        return
+
+    for modelo in modelos:
+        tabla = modelo.__tablename__
+        db.session.execute(text(
+            f"SELECT setval(pg_get_serial_sequence('{tabla}', 'id'), "
+            f"(SELECT MAX(id) FROM {tabla}))"
+        ))
+    db.session.commit()
@@ -0,0 +1,275 @@
+"""
+Tiempos de cada ruta a distintas escalas de datos, con el test client de
+Flask:
+
+    python benchmarks/rutas.py [--escalas 1x50x20,1x500x40,1000x20x20]
+                               [--repeticiones 30] [--cache ninguno]
+                               [--salida resultados.json]
+                               [--comparar anterior.json]
+
+Cada escala es USUARIOSxTRABAJOSxMOVIMIENTOS (ver datos.generar) y corre
+en un proceso propio sobre una base SQLite nueva. Las rutas se piden como
+el primer usuario generado; de cada una se informa:
+
+    p50/p95     latencia en ms (después de un request de calentamiento)
+    consultas   sentencias SQL por request
+    memoria     pico de memoria de Python durante un request (tracemalloc)
+
+Por defecto la caché de reportes está apagada para medir el trabajo de
+cada vista. --salida guarda los resultados en JSON y --comparar muestra
+la relación de p50 contra un JSON guardado antes.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _crear_app(entorno):
+    os.environ.update(entorno)
+    sys.path.insert(0, RAIZ)
+    sys.path.insert(0, os.path.join(RAIZ, "benchmarks"))
+
+    from app import create_app
+
+    app = create_app()
+    logging.getLogger(app.name).setLevel(logging.CRITICAL)
+    return app
+
+
+def _cliente(app, usuario_id):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario_id)
+        sesion["_fresh"] = True
+    return cliente
+
+
+def rutas_de(usuario_id):
+    """(nombre, método, url, json) de cada ruta, con ids del usuario."""
+    from app.models import db, GastoTrabajo, ResumenMensual, Trabajo
+
+    ultimo = (
+        ResumenMensual.query
+        .filter(ResumenMensual.usuario_id == usuario_id, ResumenMensual.cantidad > 0)
+        .order_by(ResumenMensual.anio.desc(), ResumenMensual.mes.desc())
+        .first()
+    )
+    mes = f"{ultimo.mes:02d}-{ultimo.anio}"
+
+    # El trabajo con más ingresos y el insumo con más gastos
+    trabajo = (
+        Trabajo.query
+        .filter_by(usuario_id=usuario_id)
+        .order_by(Trabajo.ingreso_total_bruto.desc())
+        .first()
+    )
+    tipo_id = trabajo.tipo_id or 0
+    insumo_id = (
+        db.session.query(GastoTrabajo.insumo_id)
+        .filter(GastoTrabajo.usuario_id == usuario_id)
+        .group_by(GastoTrabajo.insumo_id)
+        .order_by(db.func.count().desc())
+        .limit(1)
+        .scalar()
+    )
+
+    return [
+        ("main.index", "GET", "/", None),
+        ("main.meses", "GET", f"/meses?before={ultimo.anio:04d}-{ultimo.mes:02d}", None),
+        ("trabajos.index", "GET", "/trabajos/", None),
+        ("trabajos.detalle", "GET", f"/trabajos/detalle/{trabajo.id}", None),
+        ("tipos_trabajo.resumen_por_mes", "GET", f"/tipos-trabajo/{tipo_id}/resumen", None),
+        ("tipos_trabajo.detalle_mes", "GET", f"/tipos-trabajo/{tipo_id}/detalle/{mes}", None),
+        ("insumos.resumen_por_mes", "GET", f"/insumos/{insumo_id}/resumen", None),
+        ("insumos.detalle_mes", "GET", f"/insumos/{insumo_id}/detalle/{mes}", None),
+        ("movimientos.resumen_anual", "GET", "/movimientos/resumen-anual", None),
+        ("recomendaciones.index", "GET", "/recomendaciones/", None),
+        ("analitica.mensual", "GET", "/analitica/mensual", None),
+        ("movimientos.nuevo", "GET", "/movimientos/nuevo", None),
+        ("movimientos.buscar", "GET", "/movimientos/buscar/trabajos?q=Trabajo%201", None),
+        ("movimientos.guardar", "POST", "/movimientos/guardar", {
+            "tipo": "ingreso",
+            "fecha": f"{ultimo.anio:04d}-{ultimo.mes:02d}-01",
+            "trabajo_id": str(trabajo.id),
+            "monto": "1000"
+        }),
+    ]
+
+
+def _percentil(valores, p):
+    if len(valores) < 2:
+        return valores[0]
+    return statistics.quantiles(valores, n=100, method="inclusive")[p - 1]
+
+
+def medir_ruta(cliente, consultas, metodo, url, cuerpo, repeticiones):
+    def pedir():
+        return cliente.open(url, method=metodo, json=cuerpo)
+
+    respuesta = pedir()  # calentamiento
+
+    latencias = []
+    por_request = []
+    for _ in range(repeticiones):
+        antes = consultas["n"]
+        inicio = time.perf_counter()
+        respuesta = pedir()
+        latencias.append((time.perf_counter() - inicio) * 1000)
+        por_request.append(consultas["n"] - antes)
+
+    tracemalloc.start()
+    pedir()
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "status": respuesta.status_code,
+        "p50_ms": round(statistics.median(latencias), 2),
+        "p95_ms": round(_percentil(latencias, 95), 2),
+        "max_ms": round(max(latencias), 2),
+        "consultas": round(statistics.mean(por_request), 1),
+        "memoria_pico_kb": round(pico / 1024, 1),
+    }
+
+
+def correr_escala(escala, repeticiones, cache, semilla):
+    """Se ejecuta en un proceso nuevo: genera los datos y mide las rutas."""
+    usuarios, trabajos, movimientos = escala
+    carpeta = tempfile.mkdtemp(prefix="bench_rutas_")
+    app = _crear_app({
+        "DATABASE_URL": "sqlite:///" + os.path.join(carpeta, "bench.db"),
+        "INICIALIZAR_DB": "1",
+        "CACHE_BACKEND": cache,
+        # sin los hilos de app.tareas, que consultan la cola periódicamente
+        "TAREAS_HILOS": "0",
+    })
+
+    from sqlalchemy import event
+
+    from app.models import db, GastoTrabajo, Pago
+    from datos import generar
+
+    with app.app_context():
+        inicio = time.perf_counter()
+        usuario_id = generar(usuarios, trabajos, movimientos, semilla=semilla)[0]
+        generacion = time.perf_counter() - inicio
+
+        filas = Pago.query.count() + GastoTrabajo.query.count()
+        filas_usuario = (
+            Pago.query.filter_by(usuario_id=usuario_id).count()
+            + GastoTrabajo.query.filter_by(usuario_id=usuario_id).count()
+        )
+        rutas = rutas_de(usuario_id)
+
+        consultas = {"n": 0}
+
+        def contar(*args):
+            consultas["n"] += 1
+
+        for motor in db.engines.values():
+            event.listen(motor, "before_cursor_execute", contar)
+
+    cliente = _cliente(app, usuario_id)
+    resultados = []
+    for nombre, metodo, url, cuerpo in rutas:
+        medicion = medir_ruta(cliente, consultas, metodo, url, cuerpo, repeticiones)
+        resultados.append(dict(ruta=nombre, url=url, **medicion))
+
+    return {
+        "escala": "x".join(map(str, escala)),
+        "filas": filas,
+        "filas_usuario": filas_usuario,
+        "generacion_s": round(generacion, 1),
+        "rutas": resultados,
+    }
+
+
+def _commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=RAIZ, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def _imprimir(escala, anterior):
+    print(f"\nescala {escala['escala']}: {escala['filas']} movimientos "
+          f"({escala['filas_usuario']} del usuario medido), "
+          f"generados en {escala['generacion_s']}s")
+    print(f"{'ruta':<32}{'status':>7}{'p50 ms':>9}{'p95 ms':>9}"
+          f"{'consultas':>11}{'mem KB':>9}" + (f"{'vs antes':>10}" if anterior else ""))
+
+    for r in escala["rutas"]:
+        linea = (f"{r['ruta']:<32}{r['status']:>7}{r['p50_ms']:>9}{r['p95_ms']:>9}"
+                 f"{r['consultas']:>11}{r['memoria_pico_kb']:>9}")
+        base = anterior.get((escala["escala"], r["ruta"])) if anterior else None
+        if base:
+            linea += f"{r['p50_ms'] / base['p50_ms']:>9.2f}x"
+        print(linea)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--escalas", default="1x50x20,1x500x40,1000x20x20",
+                        help="USUARIOSxTRABAJOSxMOVIMIENTOS, separadas por coma.")
+    parser.add_argument("--repeticiones", type=int, default=30)
+    parser.add_argument("--cache", default="ninguno",
+                        help="CACHE_BACKEND durante la medición.")
+    parser.add_argument("--semilla", type=int, default=1)
+    parser.add_argument("--salida", help="Guardar los resultados en este JSON.")
+    parser.add_argument("--comparar", help="JSON de una corrida anterior.")
+    args = parser.parse_args()
+
+    escalas = [
+        tuple(int(parte) for parte in escala.split("x"))
+        for escala in args.escalas.split(",")
+    ]
+
+    anterior = None
+    if args.comparar:
+        with open(args.comparar) as archivo:
+            anterior = {
+                (e["escala"], r["ruta"]): r
+                for e in json.load(archivo)["escalas"]
+                for r in e["rutas"]
+            }
+
+    # spawn: cada escala importa la app con su propia base
+    contexto = multiprocessing.get_context("spawn")
+    resultados = []
+    for escala in escalas:
+        with contexto.Pool(1) as pool:
+            resultado = pool.apply(
+                correr_escala, (escala, args.repeticiones, args.cache, args.semilla)
+            )
+        resultados.append(resultado)
+        _imprimir(resultado, anterior)
+
+    if args.salida:
+        with open(args.salida, "w") as archivo:
+            json.dump({
+                "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": _commit(),
+                "python": platform.python_version(),
+                "repeticiones": args.repeticiones,
+                "cache": args.cache,
+                "escalas": resultados,
+            }, archivo, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+Lecturas y escrituras concurrentes contra SQLite, como varios workers de
+gunicorn sobre el mismo archivo:
+
+    python benchmarks/sqlite_concurrencia.py [--escritores 4] [--lectores 4]
+                                             [--segundos 10]
+
+Cada worker es un proceso con su propia app que, durante --segundos,
+guarda ingresos (POST /movimientos/guardar) o lee /trabajos/. Se corre
+una vez por perfil, cada uno sobre una base nueva:
+
+    ninguno     valores por defecto de SQLite (journal DELETE)
+    produccion  perfil de config.SQLITE_PRAGMAS (WAL, busy_timeout, ...)
+
+e informa operaciones por segundo, errores y latencia p95 de cada tipo.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+PERFILES = {
+    "ninguno": {"SQLITE_PERFIL": "ninguno"},
+    "produccion": {"SQLITE_PERFIL": "produccion"},
+}
+
+
+def _crear_app(entorno):
+    os.environ.update(entorno)
+    sys.path.insert(0, RAIZ)
+
+    from app import create_app
+
+    app = create_app()
+    logging.getLogger(app.name).setLevel(logging.CRITICAL)
+    return app
+
+
+def _cliente(app, usuario_id):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario_id)
+        sesion["_fresh"] = True
+    return cliente
+
+
+def _worker(tipo, entorno, usuario_id, trabajo_id, inicio, segundos, cola):
+    app = _crear_app(entorno)
+    cliente = _cliente(app, usuario_id)
+
+    ok = errores = 0
+    latencias = []
+
+    # Todos los workers arrancan juntos
+    time.sleep(max(0, inicio - time.time()))
+    fin = inicio + segundos
+
+    while time.time() < fin:
+        t0 = time.perf_counter()
+        if tipo == "escritor":
+            respuesta = cliente.post("/movimientos/guardar", json={
+                "tipo": "ingreso",
+                "fecha": "2024-06-01",
+                "trabajo_id": str(trabajo_id),
+                "monto": "1"
+            })
+        else:
+            respuesta = cliente.get("/trabajos/")
+        latencias.append(time.perf_counter() - t0)
+
+        if respuesta.status_code == 200:
+            ok += 1
+        else:
+            errores += 1
+
+    cola.put({"tipo": tipo, "ok": ok, "errores": errores, "latencias": latencias})
+
+
+def _preparar(entorno):
+    """Crea la base con los datos de ejemplo y devuelve (usuario, trabajo)."""
+    app = _crear_app(entorno)
+
+    from app.models import Trabajo
+
+    with app.app_context():
+        trabajo = Trabajo.query.first()
+        return trabajo.usuario_id, trabajo.id
+
+
+def correr(perfil, escritores, lectores, segundos):
+    carpeta = tempfile.mkdtemp(prefix="bench_sqlite_")
+    entorno = dict(
+        PERFILES[perfil],
+        DATABASE_URL="sqlite:///" + os.path.join(carpeta, "bench.db"),
+        INICIALIZAR_DB="1",
+        CACHE_BACKEND="ninguno",
+    )
+
+    # spawn: cada worker importa la app con su propio entorno
+    contexto = multiprocessing.get_context("spawn")
+
+    with contexto.Pool(1) as pool:
+        usuario_id, trabajo_id = pool.apply(_preparar, (entorno,))
+
+    cola = contexto.Queue()
+    inicio = time.time() + 3
+    procesos = [
+        contexto.Process(
+            target=_worker,
+            args=(tipo, entorno, usuario_id, trabajo_id, inicio, segundos, cola)
+        )
+        for tipo in ["escritor"] * escritores + ["lector"] * lectores
+    ]
+
+    for proceso in procesos:
+        proceso.start()
+    resultados = [cola.get() for _ in procesos]
+    for proceso in procesos:
+        proceso.join()
+
+    resumen = {"perfil": perfil}
+    for tipo in ("escritor", "lector"):
+        propios = [r for r in resultados if r["tipo"] == tipo]
+        latencias = sorted(l for r in propios for l in r["latencias"])
+        resumen[tipo] = {
+            "ops_por_segundo": round(sum(r["ok"] for r in propios) / segundos, 1),
+            "errores": sum(r["errores"] for r in propios),
+            "p95_ms": round(
+                statistics.quantiles(latencias, n=20)[-1] * 1000, 1
+            ) if len(latencias) > 1 else None,
+        }
+    return resumen
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--escritores", type=int, default=4)
+    parser.add_argument("--lectores", type=int, default=4)
+    parser.add_argument("--segundos", type=float, default=10)
+    parser.add_argument("--perfiles", default=",".join(PERFILES),
+                        help="Perfiles a comparar, separados por coma.")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    resultados = [
+        correr(perfil, args.escritores, args.lectores, args.segundos)
+        for perfil in args.perfiles.split(",")
+    ]
+
+    if args.json:
+        print(json.dumps(resultados, indent=2))
+        return
+
+    print(f"{args.escritores} escritores, {args.lectores} lectores, {args.segundos:g}s")
+    print(f"{'perfil':<12}{'escr/s':>9}{'errores':>9}{'p95 ms':>9}"
+          f"{'lect/s':>10}{'errores':>9}{'p95 ms':>9}")
+    for r in resultados:
+        e, l = r["escritor"], r["lector"]
+        print(f"{r['perfil']:<12}{e['ops_por_segundo']:>9}{e['errores']:>9}{e['p95_ms']!s:>9}"
+              f"{l['ops_por_segundo']:>10}{l['errores']:>9}{l['p95_ms']!s:>9}")
+
+
+if __name__ == "__main__":
+    main()
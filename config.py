@@ -1,17 +1,147 @@
 import os
+import tempfile
 
 BASE_DIR = os.path.abspath(os.path.dirname(__file__))
 
+
+def _version_templates():
+    # Cambia con cada deploy que toca templates o estáticos, así los ETag
+    # viejos no validan HTML de la versión anterior.
+    ultima = 0
+    for carpeta in ("templates", "static"):
+        for raiz, _, archivos in os.walk(os.path.join(BASE_DIR, "app", carpeta)):
+            for archivo in archivos:
+                ultima = max(ultima, os.path.getmtime(os.path.join(raiz, archivo)))
+    return str(int(ultima))
+
+
+def _url_base_datos(url):
+    # postgres:// (el que dan los PaaS) y postgresql:// sin driver van con
+    # psycopg2, que es el que está en requirements.txt (SQLAlchemy 2.1
+    # usaría psycopg 3 por defecto)
+    for prefijo in ("postgres://", "postgresql://"):
+        if url.startswith(prefijo):
+            return "postgresql+psycopg2://" + url[len(prefijo):]
+    return url
+
+
+def _entero_o_none(variable):
+    valor = os.environ.get(variable)
+    return int(valor) if valor else None
+
+
 class Config:
     SECRET_KEY = os.environ.get("SECRET_KEY", "dev-key")
 
-    SQLALCHEMY_DATABASE_URI = (
+    SQLALCHEMY_DATABASE_URI = _url_base_datos(
         os.environ.get("DATABASE_URL")
         or "sqlite:///" + os.path.join(BASE_DIR, "gestion_ingresos.db")
     )
 
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
+    # Réplica de lectura opcional para los reportes (ver app.replica).
+    # Después de escribir, el usuario lee de la principal durante
+    # REPLICA_VENTANA_SEGUNDOS.
+    DATABASE_REPLICA_URL = (
+        _url_base_datos(os.environ["DATABASE_REPLICA_URL"])
+        if os.environ.get("DATABASE_REPLICA_URL") else None
+    )
+    REPLICA_VENTANA_SEGUNDOS = int(os.environ.get("REPLICA_VENTANA_SEGUNDOS", 15))
+
+    # Crear tablas y sembrar datos al arrancar (solo desarrollo). En
+    # producción: `flask db upgrade` y, si hace falta, `flask seed`.
+    INICIALIZAR_DB = os.environ.get("INICIALIZAR_DB", "0") == "1"
+
+    # Pool de conexiones (ver app.base_datos.opciones_motor). Por defecto
+    # se dimensiona con la cantidad de workers y de hilos de gunicorn;
+    # cualquier DB_* definido en el entorno tiene prioridad.
+    WEB_CONCURRENCY = int(os.environ.get("WEB_CONCURRENCY", 1))
+    GUNICORN_THREADS = int(os.environ.get("GUNICORN_THREADS", 1))
+    DB_MAX_CONEXIONES = int(os.environ.get("DB_MAX_CONEXIONES", 90))
+    DB_POOL_SIZE = _entero_o_none("DB_POOL_SIZE")
+    DB_MAX_OVERFLOW = _entero_o_none("DB_MAX_OVERFLOW")
+    DB_POOL_TIMEOUT = int(os.environ.get("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "1") == "1"
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 15000))
+
+    # Perfil de SQLite (app.base_datos), aplicado a cada conexión nueva.
+    # SQLITE_PERFIL=ninguno deja los valores por defecto de SQLite.
+    SQLITE_PRAGMAS = {} if os.environ.get("SQLITE_PERFIL") == "ninguno" else {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.environ.get("SQLITE_BUSY_TIMEOUT", 5000)),
+        "cache_size": -int(os.environ.get("SQLITE_CACHE_KB", 20000)),
+        "mmap_size": int(os.environ.get("SQLITE_MMAP_BYTES", 256 * 1024 * 1024)),
+        "temp_store": "MEMORY",
+        "foreign_keys": "ON",
+    }
+
+    # Sentencias, tiempo en la base y posibles N+1 por request, en
+    # Server-Timing y en el log (app.instrumentacion). Apagada no agrega
+    # ningún costo.
+    SQL_INSTRUMENTACION = os.environ.get("SQL_INSTRUMENTACION", "0") == "1"
+    SQL_N_MAS_1_UMBRAL = int(os.environ.get("SQL_N_MAS_1_UMBRAL", 5))
+
+    # /metrics para Prometheus (app.metricas). Con varios workers, definir
+    # también PROMETHEUS_MULTIPROC_DIR (ver gunicorn.conf.py). /metrics,
+    # /cache/estadisticas y /db/estadisticas solo existen con METRICAS_TOKEN
+    # y el scrape tiene que mandar "Authorization: Bearer <token>".
+    METRICAS = os.environ.get("METRICAS", "1") == "1"
+    METRICAS_TOKEN = os.environ.get("METRICAS_TOKEN")
+
+    # Perfiles de requests puntuales (app.perfilador): con el header
+    # "X-Perfilar: <PERFILADOR_TOKEN>" o `flask perfilador activar`. El
+    # token también protege /perfiles/.
+    PERFILADOR = os.environ.get("PERFILADOR", "0") == "1"
+    PERFILADOR_TOKEN = os.environ.get("PERFILADOR_TOKEN")
+    PERFILADOR_DIR = os.environ.get(
+        "PERFILADOR_DIR",
+        os.path.join(tempfile.gettempdir(), "gestion_ingresos_perfiles")
+    )
+    PERFILADOR_MAX_ARCHIVOS = int(os.environ.get("PERFILADOR_MAX_ARCHIVOS", 50))
+    PERFILADOR_INTERVALO_MS = float(os.environ.get("PERFILADOR_INTERVALO_MS", 5))
+
+    # Reportes pesados en segundo plano (app.tareas, POST /jobs/). Cada
+    # proceso web corre TAREAS_HILOS hilos que los calculan; con 0, solo
+    # los calcula `flask tareas procesar`.
+    TAREAS_HILOS = int(os.environ.get("TAREAS_HILOS", 1))
+    TAREAS_ACTIVAS_POR_USUARIO = int(os.environ.get("TAREAS_ACTIVAS_POR_USUARIO", 5))
+    TAREAS_EN_CURSO_POR_USUARIO = int(os.environ.get("TAREAS_EN_CURSO_POR_USUARIO", 1))
+    TAREAS_TTL_HORAS = float(os.environ.get("TAREAS_TTL_HORAS", 24))
+    TAREAS_TIMEOUT_MINUTOS = float(os.environ.get("TAREAS_TIMEOUT_MINUTOS", 30))
+    TAREAS_MAX_INTENTOS = int(os.environ.get("TAREAS_MAX_INTENTOS", 2))
+    TAREAS_INTERVALO_SEGUNDOS = float(os.environ.get("TAREAS_INTERVALO_SEGUNDOS", 2))
+    TAREAS_STATEMENT_TIMEOUT_MS = int(os.environ.get("TAREAS_STATEMENT_TIMEOUT_MS", 600000))
+
+    # Meses que muestra el inicio por página (el resto se carga al scrollear)
+    DASHBOARD_MESES_POR_PAGINA = int(os.environ.get("DASHBOARD_MESES_POR_PAGINA", 3))
+
+    # Trabajos, insumos y tipos que trae el formulario de movimientos al
+    # abrirse (los más usados últimamente); el resto se busca al escribir
+    FORMULARIO_RECIENTES = int(os.environ.get("FORMULARIO_RECIENTES", 15))
+
+    # Meses que abarca /recomendaciones por defecto (?meses=N, hasta 24)
+    RECOMENDACIONES_MESES = int(os.environ.get("RECOMENDACIONES_MESES", 12))
+
+    # Caché de reportes: "memoria" (por proceso), "sqlite" (archivo
+    # compartido por los workers de la máquina) o "ninguno"
+    CACHE_BACKEND = os.environ.get("CACHE_BACKEND", "memoria")
+    CACHE_TTL = int(os.environ.get("CACHE_TTL", 300))
+    CACHE_MAX_ENTRADAS = int(os.environ.get("CACHE_MAX_ENTRADAS", 1000))
+    CACHE_RUTA = os.environ.get(
+        "CACHE_RUTA",
+        os.path.join(BASE_DIR, "cache_reportes.db")
+    )
+
+    # Usuarios cuyo historial en columnas (app.analitica) se mantiene en
+    # memoria por proceso
+    ANALITICA_MAX_LIBROS = int(os.environ.get("ANALITICA_MAX_LIBROS", 32))
+
+    # Se mezcla en los ETag de las vistas
+    APP_VERSION = os.environ.get("APP_VERSION") or _version_templates()
+
     # 🔐 Google OAuth
     GOOGLE_CLIENT_ID = os.environ.get("GOOGLE_CLIENT_ID")
     GOOGLE_CLIENT_SECRET = os.environ.get("GOOGLE_CLIENT_SECRET")
@@ -0,0 +1,28 @@
+import os
+import shutil
+
+# `gunicorn run:app` lee este archivo desde el directorio actual.
+# Workers e hilos salen de las mismas variables que dimensionan el pool
+# de conexiones (config.WEB_CONCURRENCY / GUNICORN_THREADS).
+workers = int(os.environ.get("WEB_CONCURRENCY", 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 1))
+bind = "0.0.0.0:" + os.environ.get("PORT", "8000")
+
+# Métricas de Prometheus compartidas entre workers (ver app.metricas)
+if workers > 1 and os.environ.get("METRICAS", "1") == "1":
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/gestion_ingresos_metricas")
+
+
+def on_starting(server):
+    # Valores de una corrida anterior falsearían los contadores
+    directorio = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directorio:
+        shutil.rmtree(directorio, ignore_errors=True)
+        os.makedirs(directorio, exist_ok=True)
+
+
+def child_exit(server, worker):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,96 @@
+"""esquema inicial
+
+Refleja las tablas que hasta ahora creaba db.create_all(). En una base
+existente alcanza con `flask db stamp 0001_esquema_inicial` antes del
+primer `flask db upgrade`.
+
+Revision ID: 0001_esquema_inicial
+Revises: 
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_esquema_inicial'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'usuarios',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('email', sa.String(length=150), nullable=False),
+        sa.Column('nombre', sa.String(length=150), nullable=False),
+        sa.Column('foto_url', sa.String(length=300), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('email')
+    )
+    op.create_table(
+        'insumos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=150), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('usuario_id', 'nombre', name='uq_insumo_usuario')
+    )
+    op.create_table(
+        'tipos_trabajo',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=100), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('usuario_id', 'nombre', name='uq_tipo_trabajo_usuario')
+    )
+    op.create_table(
+        'trabajos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('nombre', sa.String(length=150), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=True),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('tipo_id', sa.Integer(), nullable=True),
+        sa.ForeignKeyConstraint(['tipo_id'], ['tipos_trabajo.id']),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('usuario_id', 'nombre', name='uq_trabajo_usuario')
+    )
+    op.create_table(
+        'pagos',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=True),
+        sa.Column('monto', sa.Float(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('trabajo_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['trabajo_id'], ['trabajos.id']),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'gastos_trabajo',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('fecha', sa.Date(), nullable=True),
+        sa.Column('monto', sa.Float(), nullable=False),
+        sa.Column('tiempo', sa.Float(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('trabajo_id', sa.Integer(), nullable=False),
+        sa.Column('insumo_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['insumo_id'], ['insumos.id']),
+        sa.ForeignKeyConstraint(['trabajo_id'], ['trabajos.id']),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('gastos_trabajo')
+    op.drop_table('pagos')
+    op.drop_table('trabajos')
+    op.drop_table('tipos_trabajo')
+    op.drop_table('insumos')
+    op.drop_table('usuarios')
@@ -0,0 +1,42 @@
+"""indices de los reportes
+
+Índices compuestos para las consultas de main.index,
+movimientos.resumen_anual, recomendaciones y los resúmenes mensuales
+de insumos y tipos de trabajo.
+
+Revision ID: 0002_indices_reportes
+Revises: 0001_esquema_inicial
+Create Date: 2026-10-18 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_indices_reportes'
+down_revision = '0001_esquema_inicial'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index('ix_pagos_usuario_fecha', 'pagos', ['usuario_id', 'fecha'])
+    op.create_index('ix_pagos_trabajo', 'pagos', ['trabajo_id'])
+
+    op.create_index('ix_gastos_usuario_fecha', 'gastos_trabajo', ['usuario_id', 'fecha'])
+    op.create_index('ix_gastos_insumo_fecha', 'gastos_trabajo', ['insumo_id', 'fecha'])
+    op.create_index('ix_gastos_trabajo', 'gastos_trabajo', ['trabajo_id'])
+
+    op.create_index('ix_trabajos_usuario_tipo', 'trabajos', ['usuario_id', 'tipo_id'])
+
+
+def downgrade():
+    op.drop_index('ix_trabajos_usuario_tipo', table_name='trabajos')
+
+    op.drop_index('ix_gastos_trabajo', table_name='gastos_trabajo')
+    op.drop_index('ix_gastos_insumo_fecha', table_name='gastos_trabajo')
+    op.drop_index('ix_gastos_usuario_fecha', table_name='gastos_trabajo')
+
+    op.drop_index('ix_pagos_trabajo', table_name='pagos')
+    op.drop_index('ix_pagos_usuario_fecha', table_name='pagos')
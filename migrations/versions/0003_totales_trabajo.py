@@ -0,0 +1,49 @@
+"""totales guardados en trabajos
+
+Agrega ingreso_total_bruto, gasto_total y horas_totales a trabajos y los
+calcula a partir de los pagos y gastos existentes.
+
+Revision ID: 0003_totales_trabajo
+Revises: 0002_indices_reportes
+Create Date: 2026-10-18 11:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_totales_trabajo'
+down_revision = '0002_indices_reportes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('trabajos') as batch_op:
+        batch_op.add_column(sa.Column('ingreso_total_bruto', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('gasto_total', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('horas_totales', sa.Float(), nullable=False, server_default='0'))
+
+    op.execute("""
+        UPDATE trabajos SET
+            ingreso_total_bruto = (
+                SELECT COALESCE(SUM(monto), 0) FROM pagos
+                WHERE pagos.trabajo_id = trabajos.id
+            ),
+            gasto_total = (
+                SELECT COALESCE(SUM(monto), 0) FROM gastos_trabajo
+                WHERE gastos_trabajo.trabajo_id = trabajos.id
+            ),
+            horas_totales = (
+                SELECT COALESCE(SUM(tiempo), 0) FROM gastos_trabajo
+                WHERE gastos_trabajo.trabajo_id = trabajos.id
+            )
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('trabajos') as batch_op:
+        batch_op.drop_column('horas_totales')
+        batch_op.drop_column('gasto_total')
+        batch_op.drop_column('ingreso_total_bruto')
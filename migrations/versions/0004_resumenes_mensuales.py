@@ -0,0 +1,62 @@
+"""resumenes mensuales por usuario
+
+Crea resumenes_mensuales y la llena agrupando los pagos y gastos
+existentes por usuario, año y mes.
+
+Revision ID: 0004_resumenes_mensuales
+Revises: 0003_totales_trabajo
+Create Date: 2026-10-18 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_resumenes_mensuales'
+down_revision = '0003_totales_trabajo'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'resumenes_mensuales',
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('anio', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('mes', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('ingresos', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('gastos', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('horas', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('cantidad', sa.Integer(), nullable=False, server_default='0'),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('usuario_id', 'anio', 'mes')
+    )
+
+    if op.get_bind().dialect.name == 'sqlite':
+        anio = "CAST(strftime('%Y', fecha) AS INTEGER)"
+        mes = "CAST(strftime('%m', fecha) AS INTEGER)"
+    else:
+        anio = "CAST(EXTRACT(YEAR FROM fecha) AS INTEGER)"
+        mes = "CAST(EXTRACT(MONTH FROM fecha) AS INTEGER)"
+
+    op.execute(f"""
+        INSERT INTO resumenes_mensuales
+            (usuario_id, anio, mes, ingresos, gastos, horas, cantidad)
+        SELECT usuario_id, anio, mes,
+               SUM(ingresos), SUM(gastos), SUM(horas), SUM(cantidad)
+        FROM (
+            SELECT usuario_id, {anio} AS anio, {mes} AS mes,
+                   monto AS ingresos, 0 AS gastos, 0 AS horas, 1 AS cantidad
+            FROM pagos WHERE fecha IS NOT NULL
+            UNION ALL
+            SELECT usuario_id, {anio} AS anio, {mes} AS mes,
+                   0 AS ingresos, monto AS gastos, tiempo AS horas, 1 AS cantidad
+            FROM gastos_trabajo WHERE fecha IS NOT NULL
+        ) movimientos
+        GROUP BY usuario_id, anio, mes
+    """)
+
+
+def downgrade():
+    op.drop_table('resumenes_mensuales')
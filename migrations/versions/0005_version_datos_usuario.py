@@ -0,0 +1,28 @@
+"""version de datos por usuario
+
+Agrega usuarios.datos_version, que invalida la caché de reportes.
+
+Revision ID: 0005_version_datos_usuario
+Revises: 0004_resumenes_mensuales
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_version_datos_usuario'
+down_revision = '0004_resumenes_mensuales'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.add_column(sa.Column('datos_version', sa.Integer(), nullable=False, server_default='0'))
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.drop_column('datos_version')
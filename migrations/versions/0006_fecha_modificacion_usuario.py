@@ -0,0 +1,28 @@
+"""fecha de modificacion de datos por usuario
+
+Agrega usuarios.datos_modificados_en para el header Last-Modified.
+
+Revision ID: 0006_fecha_modificacion_usuario
+Revises: 0005_version_datos_usuario
+Create Date: 2026-10-18 12:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_fecha_modificacion_usuario'
+down_revision = '0005_version_datos_usuario'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.add_column(sa.Column('datos_modificados_en', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('usuarios') as batch_op:
+        batch_op.drop_column('datos_modificados_en')
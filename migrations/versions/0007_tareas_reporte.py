@@ -0,0 +1,47 @@
+"""tareas de reporte en segundo plano
+
+Crea tareas_reporte, la cola de reportes pesados de app.tareas.
+
+Revision ID: 0007_tareas_reporte
+Revises: 0006_fecha_modificacion_usuario
+Create Date: 2026-10-18 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_tareas_reporte'
+down_revision = '0006_fecha_modificacion_usuario'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'tareas_reporte',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('usuario_id', sa.Integer(), nullable=False),
+        sa.Column('reporte', sa.String(length=50), nullable=False),
+        sa.Column('parametros', sa.Text(), nullable=False, server_default='{}'),
+        sa.Column('estado', sa.String(length=20), nullable=False, server_default='pendiente'),
+        sa.Column('intentos', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('worker', sa.String(length=100), nullable=True),
+        sa.Column('resultado', sa.Text(), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('creada_en', sa.DateTime(), nullable=False),
+        sa.Column('iniciada_en', sa.DateTime(), nullable=True),
+        sa.Column('terminada_en', sa.DateTime(), nullable=True),
+        sa.Column('vence_en', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['usuario_id'], ['usuarios.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_tareas_reporte_estado', 'tareas_reporte', ['estado', 'id'])
+    op.create_index('ix_tareas_reporte_usuario', 'tareas_reporte', ['usuario_id', 'estado'])
+
+
+def downgrade():
+    op.drop_index('ix_tareas_reporte_usuario', table_name='tareas_reporte')
+    op.drop_index('ix_tareas_reporte_estado', table_name='tareas_reporte')
+    op.drop_table('tareas_reporte')
@@ -0,0 +1,85 @@
+"""nombres normalizados para la busqueda por prefijo
+
+Agrega nombre_normalizado (sin acentos ni mayusculas) a trabajos,
+insumos y tipos_trabajo, lo calcula para las filas existentes y lo
+indexa junto con usuario_id.
+
+Revision ID: 0008_nombres_normalizados
+Revises: 0007_tareas_reporte
+Create Date: 2026-10-18 13:30:00.000000
+
+"""
+import re
+import unicodedata
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_nombres_normalizados'
+down_revision = '0007_tareas_reporte'
+branch_labels = None
+depends_on = None
+
+
+TABLAS = (
+    ('trabajos', 150, 'ix_trabajos_usuario_nombre'),
+    ('insumos', 150, 'ix_insumos_usuario_nombre'),
+    ('tipos_trabajo', 100, 'ix_tipos_trabajo_usuario_nombre'),
+)
+
+_NO_ALFANUMERICO = re.compile(r"[\W_]+")
+
+
+# Copia de app.models.normalizar_nombre al momento de la migración
+def _normalizar(texto):
+    if not texto:
+        return ""
+    descompuesto = unicodedata.normalize("NFKD", texto)
+    sin_acentos = "".join(c for c in descompuesto if not unicodedata.combining(c))
+    return _NO_ALFANUMERICO.sub(" ", sin_acentos.casefold()).strip()
+
+
+def upgrade():
+    conexion = op.get_bind()
+
+    for tabla, largo, indice in TABLAS:
+        op.add_column(tabla, sa.Column('nombre_normalizado', sa.String(length=largo), nullable=True))
+
+        t = sa.table(
+            tabla,
+            sa.column('id', sa.Integer),
+            sa.column('nombre', sa.String),
+            sa.column('nombre_normalizado', sa.String)
+        )
+        filas = [
+            {"_id": fila.id, "normalizado": _normalizar(fila.nombre)}
+            for fila in conexion.execute(sa.select(t.c.id, t.c.nombre))
+        ]
+        if filas:
+            conexion.execute(
+                t.update()
+                .where(t.c.id == sa.bindparam("_id"))
+                .values(nombre_normalizado=sa.bindparam("normalizado")),
+                filas
+            )
+
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.alter_column(
+                'nombre_normalizado',
+                existing_type=sa.String(length=largo),
+                nullable=False
+            )
+
+        op.create_index(
+            indice, tabla, ['usuario_id', 'nombre_normalizado'],
+            postgresql_ops={'nombre_normalizado': 'text_pattern_ops'}
+        )
+
+
+def downgrade():
+    for tabla, _, indice in TABLAS:
+        op.drop_index(indice, table_name=tabla)
+        with op.batch_alter_table(tabla) as batch_op:
+            batch_op.drop_column('nombre_normalizado')
@@ -0,0 +1,108 @@
+import os
+from datetime import date, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import create_app
+from app.models import db, GastoTrabajo, Insumo, Pago, TipoTrabajo, Trabajo, Usuario
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture
+def app(tmp_path):
+    """App sobre una base SQLite nueva armada con las migraciones (no create_all)."""
+    from flask_migrate import Migrate, upgrade
+
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / "test.db"),
+        "CACHE_BACKEND": "ninguno",
+        "TAREAS_HILOS": 0,
+    })
+    Migrate(app, db, directory=os.path.join(RAIZ, "migrations"))
+
+    with app.app_context():
+        upgrade()
+
+    yield app
+
+    with app.app_context():
+        db.engine.dispose()
+
+
+@pytest.fixture
+def usuario(app):
+    with app.app_context():
+        usuario = Usuario(email="test@example.com", nombre="Test")
+        db.session.add(usuario)
+        db.session.commit()
+        return usuario.id
+
+
+@pytest.fixture
+def cliente(app, usuario):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario)
+        sesion["_fresh"] = True
+    return cliente
+
+
+def sembrar(usuario_id, cantidad, pagos=3, gastos=3, desde=date(2024, 1, 1)):
+    """`cantidad` trabajos con sus pagos y gastos (con insumo), repartidos en varios meses."""
+    tipos = [TipoTrabajo(nombre=f"tipo {i}", usuario_id=usuario_id) for i in range(3)]
+    insumos = [Insumo(nombre=f"insumo {i}", usuario_id=usuario_id) for i in range(4)]
+    db.session.add_all(tipos + insumos)
+
+    for i in range(cantidad):
+        fecha = desde + timedelta(days=7 * i)
+        trabajo = Trabajo(
+            nombre=f"trabajo {i}",
+            fecha=fecha,
+            tipo=tipos[i % len(tipos)],
+            usuario_id=usuario_id
+        )
+        db.session.add(trabajo)
+
+        for j in range(pagos):
+            db.session.add(Pago(
+                fecha=fecha + timedelta(days=j),
+                monto=1000 + j,
+                trabajo=trabajo,
+                usuario_id=usuario_id
+            ))
+        for j in range(gastos):
+            db.session.add(GastoTrabajo(
+                fecha=fecha + timedelta(days=j),
+                monto=100 + j,
+                tiempo=1.5,
+                trabajo=trabajo,
+                insumo=insumos[(i + j) % len(insumos)],
+                usuario_id=usuario_id
+            ))
+
+    db.session.commit()
+    return tipos[0].id, insumos[0].id
+
+
+class Sentencias:
+    """Junta las sentencias (y sus parámetros) que ejecuta el motor mientras está activo."""
+
+    def __init__(self, motor):
+        self.motor = motor
+        self.ejecutadas = []
+
+    def _registrar(self, conexion, cursor, sentencia, parametros, contexto, executemany):
+        self.ejecutadas.append((sentencia, parametros))
+
+    def __enter__(self):
+        event.listen(self.motor, "before_cursor_execute", self._registrar)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.motor, "before_cursor_execute", self._registrar)
+
+    def __len__(self):
+        return len(self.ejecutadas)
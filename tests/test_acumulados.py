@@ -0,0 +1,123 @@
+from datetime import timedelta
+
+import pytest
+
+from app.acumulados import recalcular_resumenes_mensuales, recalcular_totales_trabajos
+from app.models import db, GastoTrabajo, Pago, ResumenMensual, Trabajo, Usuario
+from conftest import sembrar
+
+
+def _versiones():
+    return dict(db.session.query(Usuario.id, Usuario.datos_version))
+
+
+def test_recalcular_invalida_la_cache_de_los_usuarios(app, usuario):
+    with app.app_context():
+        otro = Usuario(email="otro@example.com", nombre="Otro")
+        db.session.add(otro)
+        db.session.commit()
+        otro = otro.id
+
+        antes = _versiones()
+        recalcular_totales_trabajos()
+        despues = _versiones()
+        assert despues == {u: v + 1 for u, v in antes.items()}
+
+        recalcular_resumenes_mensuales(usuario)
+        final = _versiones()
+        assert final[usuario] == despues[usuario] + 1
+        assert final[otro] == despues[otro]
+
+
+# ---------- mantenimiento en cada flush ----------
+# Cada paso modifica movimientos por el ORM y hace commit; después de
+# cada uno lo guardado tiene que coincidir con un recálculo desde cero.
+
+def _editar_monto_y_fecha_de_pago(usuario):
+    pago = Pago.query.filter_by(usuario_id=usuario).order_by(Pago.id).first()
+    pago.monto += 2500
+    pago.fecha = pago.fecha + timedelta(days=45)  # a otro mes
+
+
+def _editar_gasto(usuario):
+    gasto = GastoTrabajo.query.filter_by(usuario_id=usuario).order_by(GastoTrabajo.id).first()
+    gasto.monto = 0
+    gasto.tiempo = 7.25
+
+
+def _borrar_gasto(usuario):
+    gasto = GastoTrabajo.query.filter_by(usuario_id=usuario).order_by(GastoTrabajo.id.desc()).first()
+    db.session.delete(gasto)
+
+
+def _mover_pago_de_trabajo(usuario):
+    primero, ultimo = (
+        Trabajo.query.filter_by(usuario_id=usuario).order_by(Trabajo.id).first(),
+        Trabajo.query.filter_by(usuario_id=usuario).order_by(Trabajo.id.desc()).first()
+    )
+    pago = Pago.query.filter_by(trabajo_id=primero.id).order_by(Pago.id.desc()).first()
+    pago.trabajo = ultimo
+    pago.fecha = ultimo.fecha
+
+
+def _borrar_trabajo(usuario):
+    db.session.delete(Trabajo.query.filter_by(usuario_id=usuario).order_by(Trabajo.id).first())
+
+
+PASOS = [
+    _editar_monto_y_fecha_de_pago,
+    _editar_gasto,
+    _borrar_gasto,
+    _mover_pago_de_trabajo,
+    _borrar_trabajo,
+]
+
+
+def _totales(usuario):
+    return {
+        t.id: tuple(round(v, 6) for v in (t.ingreso_total_bruto, t.gasto_total, t.horas_totales))
+        for t in db.session.query(Trabajo).filter_by(usuario_id=usuario).populate_existing()
+    }
+
+
+@pytest.mark.parametrize("paso", PASOS, ids=lambda paso: paso.__name__.strip("_"))
+def test_totales_de_trabajos_siguen_a_los_movimientos(app, usuario, paso):
+    with app.app_context():
+        sembrar(usuario, 8)
+
+        paso(usuario)
+        db.session.commit()
+
+        guardados = _totales(usuario)
+        recalcular_totales_trabajos(usuario)
+        assert guardados == _totales(usuario)
+
+
+def _resumenes(usuario):
+    # El recálculo no guarda los meses que quedaron vacíos
+    return {
+        (r.anio, r.mes): tuple(round(v, 6) for v in (r.ingresos, r.gastos, r.horas)) + (r.cantidad,)
+        for r in db.session.query(ResumenMensual)
+        .filter(ResumenMensual.usuario_id == usuario, ResumenMensual.cantidad > 0)
+        .populate_existing()
+    }
+
+
+@pytest.mark.parametrize("paso", PASOS, ids=lambda paso: paso.__name__.strip("_"))
+def test_resumenes_mensuales_siguen_a_los_movimientos(app, usuario, paso):
+    with app.app_context():
+        sembrar(usuario, 8)
+
+        paso(usuario)
+        db.session.commit()
+
+        guardados = _resumenes(usuario)
+        vacios = (
+            ResumenMensual.query
+            .filter(ResumenMensual.usuario_id == usuario, ResumenMensual.cantidad == 0)
+            .all()
+        )
+        assert all(abs(r.ingresos) + abs(r.gastos) + abs(r.horas) < 1e-6 for r in vacios)
+
+        recalcular_resumenes_mensuales(usuario)
+        assert guardados == _resumenes(usuario)
@@ -0,0 +1,30 @@
+from sqlalchemy import insert
+
+from app.analitica import cargar_libro
+from app.models import db, Pago, ResumenMensual, Trabajo
+from conftest import sembrar
+
+
+def test_libro_ignora_movimientos_sin_fecha(app, usuario):
+    with app.app_context():
+        sembrar(usuario, 10)
+        trabajo = Trabajo.query.filter_by(usuario_id=usuario).first()
+        # El ORM completaría la fecha con el default: NULL explícito
+        db.session.execute(insert(Pago.__table__).values(
+            fecha=None, monto=999, trabajo_id=trabajo.id, usuario_id=usuario
+        ))
+        db.session.commit()
+
+        libro = cargar_libro(usuario)
+
+        assert Pago.query.filter(Pago.fecha.is_(None)).count() == 1
+        assert len(libro) == 10 * 6
+
+        meses = libro.totales_mensuales()
+        assert all(m["anio"] >= 2024 for m in meses)
+        assert [(m["anio"], m["mes"], m["cantidad"]) for m in meses] == [
+            (r.anio, r.mes, r.cantidad)
+            for r in ResumenMensual.query
+            .filter(ResumenMensual.usuario_id == usuario, ResumenMensual.cantidad > 0)
+            .order_by(ResumenMensual.anio, ResumenMensual.mes)
+        ]
@@ -0,0 +1,18 @@
+from app.extensions import cache
+
+
+def test_un_deploy_no_sirve_respuestas_de_la_version_anterior(app, cliente):
+    app.config["CACHE_BACKEND"] = "memoria"
+    cache.init_app(app)
+
+    def contadores():
+        return cache.aciertos, cache.fallos
+
+    aciertos, fallos = contadores()
+    cliente.get("/movimientos/resumen-anual")
+    cliente.get("/movimientos/resumen-anual")
+    assert contadores() == (aciertos + 1, fallos + 1)
+
+    app.config["APP_VERSION"] = "otro-deploy"
+    cliente.get("/movimientos/resumen-anual")
+    assert contadores() == (aciertos + 1, fallos + 2)
@@ -0,0 +1,41 @@
+import threading
+
+import pytest
+
+from app.cache import CacheReportes
+
+TOKEN = "secreto"
+
+
+@pytest.mark.parametrize("url", ["/metrics", "/cache/estadisticas", "/db/estadisticas"])
+def test_sin_token_configurado_no_existen(app, cliente, url):
+    assert cliente.get(url).status_code == 404
+
+
+@pytest.mark.parametrize("url", ["/metrics", "/cache/estadisticas", "/db/estadisticas"])
+def test_piden_el_token_de_metricas(app, cliente, url):
+    app.config["METRICAS_TOKEN"] = TOKEN
+
+    assert cliente.get(url).status_code == 401
+    assert cliente.get(url, headers={"Authorization": "Bearer otro"}).status_code == 401
+
+    respuesta = app.test_client().get(url, headers={"Authorization": f"Bearer {TOKEN}"})
+    assert respuesta.status_code == 200
+
+
+def test_contadores_de_la_cache_no_pierden_incrementos():
+    cache = CacheReportes()
+    hilos, vueltas = 8, 20000
+
+    def contar():
+        for i in range(vueltas):
+            cache._contar(acierto=i % 2 == 0)
+
+    trabajadores = [threading.Thread(target=contar) for _ in range(hilos)]
+    for hilo in trabajadores:
+        hilo.start()
+    for hilo in trabajadores:
+        hilo.join()
+
+    estadisticas = cache.estadisticas()
+    assert estadisticas["aciertos"] == estadisticas["fallos"] == hilos * vueltas // 2
@@ -0,0 +1,103 @@
+from app.models import db, GastoTrabajo, Insumo, Pago, Trabajo
+from conftest import sembrar
+
+
+def _lote(cliente, movimientos):
+    return cliente.post("/movimientos/guardar-lote", json={"movimientos": movimientos})
+
+
+def _referencias(app, usuario):
+    with app.app_context():
+        sembrar(usuario, 2, pagos=0, gastos=0)
+        trabajo = Trabajo.query.filter_by(usuario_id=usuario).first()
+        insumo = Insumo.query.filter_by(usuario_id=usuario).first()
+        return trabajo.id, insumo.id
+
+
+def test_lote_mixto_guarda_los_validos_e_informa_los_invalidos(app, cliente, usuario):
+    trabajo, insumo = _referencias(app, usuario)
+
+    respuesta = _lote(cliente, [
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": "1500"},
+        {"tipo": "ingreso", "fecha": "01/05/2024", "trabajo_id": trabajo, "monto": "10"},
+        {"tipo": "gasto", "fecha": "2024-05-02", "trabajo_id": trabajo, "insumo_id": insumo,
+         "monto": 200, "tiempo": "1.5"},
+        {"tipo": "gasto", "fecha": "2024-05-02", "trabajo_id": 999999, "insumo_id": insumo},
+        "no es un objeto",
+    ])
+
+    assert respuesta.status_code == 200
+    cuerpo = respuesta.json
+    assert (cuerpo["guardados"], cuerpo["con_error"]) == (2, 3)
+    assert [r["ok"] for r in cuerpo["resultados"]] == [True, False, True, False, False]
+    assert cuerpo["resultados"][3]["status"] == 404
+
+    with app.app_context():
+        assert Pago.query.count() == 1
+        assert GastoTrabajo.query.count() == 1
+        assert db.session.get(Trabajo, trabajo).ingreso_total_bruto == 1500
+
+
+def test_lote_acepta_monto_cero(app, cliente, usuario):
+    trabajo, _ = _referencias(app, usuario)
+
+    respuesta = _lote(cliente, [
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": 0},
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": "0"},
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": ""},
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo},
+    ])
+
+    assert [r["ok"] for r in respuesta.json["resultados"]] == [True, True, False, False]
+
+
+def test_lote_con_mas_del_maximo_se_rechaza_entero(app, cliente, usuario, monkeypatch):
+    from app.routes import movimientos
+
+    trabajo, _ = _referencias(app, usuario)
+    monkeypatch.setattr(movimientos, "MAX_MOVIMIENTOS_LOTE", 3)
+    item = {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": 1}
+
+    assert _lote(cliente, [item] * 4).status_code == 413
+    assert _lote(cliente, [item] * 3).json["guardados"] == 3
+
+    with app.app_context():
+        assert Pago.query.count() == 3
+
+
+def test_lote_rechazado_por_la_base_no_guarda_nada(app, cliente, usuario, monkeypatch):
+    from app.routes import movimientos
+
+    trabajo, _ = _referencias(app, usuario)
+    cargar = movimientos._cargar_referencias
+
+    def cargar_y_crear_en_el_medio(data):
+        # Otro request crea el insumo después de que el lote buscó los nombres
+        referencias = cargar(data)
+        with db.engine.begin() as conexion:
+            conexion.execute(Insumo.__table__.insert().values(
+                nombre="pinceles", nombre_normalizado="pinceles", usuario_id=usuario
+            ))
+        return referencias
+
+    monkeypatch.setattr(movimientos, "_cargar_referencias", cargar_y_crear_en_el_medio)
+
+    respuesta = _lote(cliente, [
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": 100},
+        {"tipo": "gasto", "fecha": "2024-05-01", "trabajo_id": trabajo,
+         "insumo_id": "nuevo", "nuevo_insumo": "pinceles", "monto": 10},
+    ])
+
+    assert respuesta.status_code == 409
+    assert respuesta.json["guardados"] == 0
+
+    with app.app_context():
+        assert Pago.query.count() == 0
+        assert GastoTrabajo.query.count() == 0
+        assert db.session.get(Trabajo, trabajo).ingreso_total_bruto == 0
+
+    # La sesión quedó usable: el mismo lote sin el conflicto se guarda
+    monkeypatch.setattr(movimientos, "_cargar_referencias", cargar)
+    assert _lote(cliente, [
+        {"tipo": "ingreso", "fecha": "2024-05-01", "trabajo_id": trabajo, "monto": 100},
+    ]).json["guardados"] == 1
@@ -0,0 +1,120 @@
+import io
+
+from app.importacion import importar_archivo
+from app.models import db, GastoTrabajo, Insumo, Pago, TipoTrabajo, Trabajo
+
+
+def _csv(*filas):
+    encabezado = "tipo,fecha,trabajo,fecha_trabajo,tipo_trabajo,insumo,monto,tiempo"
+    return io.BytesIO("\n".join((encabezado,) + filas).encode("utf-8"))
+
+
+def _importar(usuario, archivo, formato="csv", **opciones):
+    return importar_archivo(archivo, formato, usuario, **opciones)
+
+
+def _nombres(modelo):
+    return sorted(nombre for (nombre,) in db.session.query(modelo.nombre))
+
+
+def test_importa_filas_validas_y_crea_los_nombres(app, usuario):
+    with app.app_context():
+        resumen = _importar(usuario, _csv(
+            "ingreso,2024-03-01,Mural Coco,2024-02-20,mural,,1500,",
+            "gasto,2024-03-02,Mural Coco,,,pinturas,200,2.5",
+            "gasto,2024-04-01,Cuadro,,,pinturas,0,1",
+        ), tamano_lote=2)
+
+        assert resumen == {"procesadas": 3, "insertadas": 3, "con_error": 0, "errores": []}
+
+        mural = Trabajo.query.filter_by(nombre="Mural Coco").one()
+        assert mural.fecha.isoformat() == "2024-02-20"
+        assert mural.tipo.nombre == "mural"
+        assert (mural.ingreso_total_bruto, mural.gasto_total, mural.horas_totales) == (1500, 200, 2.5)
+
+        assert _nombres(Insumo) == ["pinturas"]
+        assert Pago.query.count() == 1
+        assert GastoTrabajo.query.count() == 2
+
+
+def test_filas_invalidas_se_informan_con_su_numero(app, usuario):
+    with app.app_context():
+        resumen = _importar(usuario, _csv(
+            "ingreso,2024-03-01,Mural,,,,1500,",
+            "otro,2024-03-01,Mural,,,,1500,",
+            "ingreso,03/01/2024,Mural,,,,1500,",
+            "ingreso,2024-03-01,Mural,,,,mil,",
+            "gasto,2024-03-01,Mural,,,,100,",
+        ))
+
+        assert resumen["insertadas"] == 1
+        assert resumen["con_error"] == 4
+        assert [e["fila"] for e in resumen["errores"]] == [3, 4, 5, 6]
+        assert resumen["errores"][-1]["error"] == "Falta insumo"
+
+
+def test_una_fila_rechazada_no_deja_nombres_creados(app, usuario):
+    with app.app_context():
+        resumen = _importar(usuario, _csv(
+            # gasto con insumo nuevo pero sin trabajo
+            "gasto,2024-03-01,,,,insumo nuevo,100,",
+            # trabajo y tipo nuevos con fecha_trabajo inválida
+            "ingreso,2024-03-01,Trabajo nuevo,ayer,tipo nuevo,,100,",
+            # trabajo, tipo e insumo nuevos con monto inválido
+            "gasto,2024-03-01,Otro trabajo,,otro tipo,otro insumo,cien,",
+            "ingreso,2024-03-01,Válido,,,,100,",
+        ))
+
+        assert resumen["con_error"] == 3
+        assert resumen["insertadas"] == 1
+
+        assert _nombres(Insumo) == []
+        assert _nombres(TipoTrabajo) == []
+        assert _nombres(Trabajo) == ["Válido"]
+
+
+def test_archivo_que_no_es_utf8_corta_en_esa_fila(app, usuario):
+    with app.app_context():
+        archivo = _csv(
+            "ingreso,2024-03-01,Mural,,,,1500,",
+            "gasto,2024-03-01,Mural,,,pinturas,100,",
+        )
+        archivo = io.BytesIO(
+            archivo.getvalue()
+            + "\ngasto,2024-03-02,Mural,,,café,100,\ningreso,2024-03-03,Mural,,,,1,".encode("latin-1")
+        )
+
+        resumen = _importar(usuario, archivo, tamano_lote=1)
+
+        assert resumen["fila"] == 4
+        assert "UTF-8" in resumen["error"]
+        assert resumen["insertadas"] == 2
+        assert _nombres(Insumo) == ["pinturas"]
+
+
+def test_ndjson_que_no_es_utf8_corta_en_esa_linea(app, usuario):
+    with app.app_context():
+        archivo = io.BytesIO(
+            b'{"tipo": "ingreso", "fecha": "2024-03-01", "trabajo": "Mural", "monto": 10}\n'
+            + '{"tipo": "ingreso", "fecha": "2024-03-01", "trabajo": "Año", "monto": 10}\n'.encode("cp1252")
+        )
+
+        resumen = _importar(usuario, archivo, formato="ndjson")
+
+        assert (resumen["fila"], resumen["insertadas"]) == (2, 1)
+
+
+def test_importar_responde_400_con_la_fila_ilegible(app, cliente):
+    archivo = io.BytesIO(
+        _csv("ingreso,2024-03-01,Mural,,,,1500,").getvalue()
+        + "\ningreso,2024-03-01,Añil,,,,1,".encode("latin-1")
+    )
+
+    respuesta = cliente.post(
+        "/movimientos/importar",
+        data={"archivo": (archivo, "movimientos.csv")},
+        content_type="multipart/form-data"
+    )
+
+    assert respuesta.status_code == 400
+    assert (respuesta.json["fila"], respuesta.json["insertadas"]) == (3, 1)
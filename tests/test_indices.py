@@ -0,0 +1,61 @@
+import re
+
+import pytest
+
+from app.models import db
+from conftest import Sentencias, sembrar
+
+
+# El resumen mensual se lee por su clave primaria (usuario_id, anio, mes)
+PK_RESUMENES = "sqlite_autoindex_resumenes_mensuales_1"
+
+# vista -> (url, índices que tiene que usar su plan)
+REPORTES = {
+    "main.index": ("/", {PK_RESUMENES, "ix_pagos_usuario_fecha", "ix_gastos_usuario_fecha"}),
+    "main.meses": ("/meses?before=2025-06", {PK_RESUMENES, "ix_pagos_usuario_fecha", "ix_gastos_usuario_fecha"}),
+    "movimientos.resumen_anual": ("/movimientos/resumen-anual", {PK_RESUMENES}),
+    "recomendaciones.index": ("/recomendaciones/?meses=24", {PK_RESUMENES}),
+    "insumos.resumen_por_mes": ("/insumos/{insumo}/resumen", {"ix_gastos_insumo_fecha"}),
+    "tipos_trabajo.resumen_por_mes": (
+        "/tipos-trabajo/{tipo}/resumen",
+        {"ix_pagos_usuario_fecha", "ix_gastos_usuario_fecha"}
+    ),
+}
+
+RECORRE_LIBRO = re.compile(r"\bSCAN (pagos|gastos_trabajo)\b")
+
+
+def planes(sentencias):
+    """Líneas de EXPLAIN QUERY PLAN de cada SELECT ejecutado."""
+    lineas = []
+    conexion = db.engine.raw_connection()
+    try:
+        for sentencia, parametros in sentencias.ejecutadas:
+            if not sentencia.lstrip().upper().startswith(("SELECT", "WITH")):
+                continue
+            cursor = conexion.cursor()
+            cursor.execute("EXPLAIN QUERY PLAN " + sentencia, parametros)
+            lineas += [fila[-1] for fila in cursor.fetchall()]
+    finally:
+        conexion.close()
+    return lineas
+
+
+@pytest.mark.parametrize("vista", REPORTES)
+def test_reporte_usa_indices(app, cliente, usuario, vista):
+    with app.app_context():
+        tipo, insumo = sembrar(usuario, 80)
+
+    url, esperados = REPORTES[vista]
+
+    with app.app_context():
+        with Sentencias(db.engine) as sentencias:
+            respuesta = cliente.get(url.format(tipo=tipo, insumo=insumo))
+        assert respuesta.status_code == 200
+
+        plan = planes(sentencias)
+
+    texto = "\n".join(plan)
+    for indice in esperados:
+        assert re.search(rf"USING (COVERING )?INDEX {indice}\b", texto), texto
+    assert not RECORRE_LIBRO.search(texto), texto
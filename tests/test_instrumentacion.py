@@ -0,0 +1,35 @@
+import time
+
+import pytest
+from flask import g
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app.instrumentacion import MedicionSQL
+from app.models import db
+
+
+def _guardado_en(conexion):
+    """Cuántos valores acumulan las listas de conexion.info."""
+    return sum(len(v) for v in conexion.info.values() if isinstance(v, list))
+
+
+def test_sentencias_que_fallan_no_dejan_estado_en_la_conexion(app):
+    with app.test_request_context():
+        g.medicion_sql = medicion = MedicionSQL()
+
+        with db.engine.connect() as conexion:
+            antes = _guardado_en(conexion)
+
+            for _ in range(50):
+                with pytest.raises(OperationalError):
+                    conexion.execute(text("SELECT * FROM no_existe"))
+                conexion.rollback()
+
+            assert _guardado_en(conexion) == antes
+
+            time.sleep(0.3)
+            conexion.execute(text("SELECT 1"))
+
+        assert medicion.consultas == 1
+        assert medicion.tiempo < 0.2
@@ -0,0 +1,45 @@
+import threading
+import time
+
+from prometheus_client import REGISTRY
+
+import app.metricas as modulo
+from app.extensions import cache
+
+
+def test_sincronizaciones_simultaneas_no_suman_dos_veces(monkeypatch):
+    monkeypatch.setattr(modulo, "estadisticas_pools", lambda: {})
+
+    medidas = modulo.metricas()
+    medidas.sincronizar()
+
+    # Ensancha la ventana entre calcular el delta y guardar lo copiado
+    sumar = medidas.cache_aciertos.inc
+
+    def sumar_lento(delta):
+        sumar(delta)
+        time.sleep(0.02)
+
+    monkeypatch.setattr(medidas.cache_aciertos, "inc", sumar_lento)
+
+    def aciertos():
+        return REGISTRY.get_sample_value("gestion_cache_hits_total")
+
+    antes = aciertos()
+    for _ in range(10):
+        cache._contar(acierto=True)
+
+    barrera = threading.Barrier(8)
+
+    def sincronizar():
+        barrera.wait()
+        medidas.sincronizar(esperar=False)
+
+    hilos = [threading.Thread(target=sincronizar) for _ in range(8)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    medidas.sincronizar()
+    assert aciertos() == antes + 10
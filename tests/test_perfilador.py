@@ -0,0 +1,44 @@
+import threading
+
+from app import create_app
+
+TOKEN = "secreto"
+
+
+def test_requests_perfilados_a_la_vez_no_fallan(tmp_path):
+    app = create_app({
+        "TESTING": True,
+        "SQLALCHEMY_DATABASE_URI": "sqlite:///" + str(tmp_path / "test.db"),
+        "CACHE_BACKEND": "ninguno",
+        "TAREAS_HILOS": 0,
+        "PERFILADOR": True,
+        "PERFILADOR_TOKEN": TOKEN,
+        "PERFILADOR_DIR": str(tmp_path / "perfiles"),
+    })
+
+    # Los dos requests quedan adentro de la vista al mismo tiempo
+    barrera = threading.Barrier(2)
+
+    @app.route("/lento")
+    def lento():
+        barrera.wait(timeout=5)
+        return "ok"
+
+    respuestas = []
+
+    def pedir():
+        respuestas.append(app.test_client().get("/lento", headers={"X-Perfilar": TOKEN}))
+
+    hilos = [threading.Thread(target=pedir) for _ in range(2)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+
+    assert [r.status_code for r in respuestas] == [200, 200]
+    # Solo uno se perfila; el otro se atiende igual
+    assert sum("X-Perfil" in r.headers for r in respuestas) == 1
+
+    # Terminado el primero, el perfilador queda libre para el siguiente
+    respuesta = app.test_client().get("/", headers={"X-Perfilar": TOKEN})
+    assert "X-Perfil" in respuesta.headers
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+from sqlalchemy import func, select
+
+from app.models import db, TareaReporte
+from app.tareas import EN_CURSO, LimiteTareas, encolar, reclamar
+
+HILOS = 12
+
+
+def _a_la_vez(app, funcion):
+    """Corre `funcion` en HILOS hilos que arrancan juntos; devuelve sus resultados."""
+    barrera = threading.Barrier(HILOS)
+    resultados = []
+
+    def correr():
+        with app.app_context():
+            barrera.wait()
+            try:
+                resultados.append(funcion())
+            except LimiteTareas as e:
+                resultados.append(e)
+
+    hilos = [threading.Thread(target=correr) for _ in range(HILOS)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    return resultados
+
+
+def _contar(*filtros):
+    with db.engine.connect() as conexion:
+        return conexion.execute(
+            select(func.count()).select_from(TareaReporte.__table__).where(*filtros)
+        ).scalar()
+
+
+@pytest.mark.parametrize("vuelta", range(3))
+def test_encolar_respeta_el_limite_con_requests_concurrentes(app, usuario, vuelta):
+    app.config["TAREAS_ACTIVAS_POR_USUARIO"] = 3
+
+    resultados = _a_la_vez(app, lambda: encolar(usuario, "resumen_anual", {}))
+
+    with app.app_context():
+        assert _contar(TareaReporte.usuario_id == usuario) == 3
+    assert sum(isinstance(r, LimiteTareas) for r in resultados) == HILOS - 3
+
+
+@pytest.mark.parametrize("vuelta", range(3))
+def test_reclamar_respeta_el_maximo_en_curso_por_usuario(app, usuario, vuelta):
+    app.config["TAREAS_ACTIVAS_POR_USUARIO"] = HILOS
+    with app.app_context():
+        for _ in range(HILOS):
+            encolar(usuario, "resumen_anual", {})
+
+    reclamadas = _a_la_vez(app, lambda: reclamar(f"w{threading.get_ident()}", 2))
+
+    assert sum(r is not None for r in reclamadas) == 2
+    with app.app_context():
+        assert _contar(TareaReporte.estado == EN_CURSO) == 2
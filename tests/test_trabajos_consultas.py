@@ -0,0 +1,51 @@
+import pytest
+
+from app.models import db, Trabajo, Usuario
+from conftest import Sentencias, sembrar
+
+
+# Sentencias por página, sin importar cuántos trabajos, pagos y gastos haya
+MAX_SENTENCIAS = {
+    "listado": 4,
+    "detalle": 5,
+}
+
+
+def _usuario_con_trabajos(app, cantidad):
+    with app.app_context():
+        usuario = Usuario(email=f"u{cantidad}@example.com", nombre=f"Usuario {cantidad}")
+        db.session.add(usuario)
+        db.session.commit()
+
+        sembrar(usuario.id, cantidad)
+        trabajo = Trabajo.query.filter_by(usuario_id=usuario.id).order_by(Trabajo.id.desc()).first()
+        return usuario.id, trabajo.id
+
+
+def _cliente(app, usuario_id):
+    cliente = app.test_client()
+    with cliente.session_transaction() as sesion:
+        sesion["_user_id"] = str(usuario_id)
+        sesion["_fresh"] = True
+    return cliente
+
+
+def _contar(app, cliente, url):
+    with app.app_context():
+        with Sentencias(db.engine) as sentencias:
+            respuesta = cliente.get(url)
+    assert respuesta.status_code == 200
+    return len(sentencias)
+
+
+@pytest.mark.parametrize("pagina", MAX_SENTENCIAS)
+def test_sentencias_no_crecen_con_los_trabajos(app, pagina):
+    cuentas = []
+
+    for cantidad in (5, 50):
+        usuario_id, trabajo_id = _usuario_con_trabajos(app, cantidad)
+        url = "/trabajos/" if pagina == "listado" else f"/trabajos/detalle/{trabajo_id}"
+        cuentas.append(_contar(app, _cliente(app, usuario_id), url))
+
+    assert cuentas[0] == cuentas[1], cuentas
+    assert cuentas[1] <= MAX_SENTENCIAS[pagina], cuentas